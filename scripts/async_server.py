@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Async Webhook Server
+Production server mode: a small asyncio HTTP/1.1 server that accepts
+Twilio-style form-encoded webhooks, acknowledges them immediately and sends
+the assistant's reply afterwards through a ReplySender. With WORKERS > 1 it
+pre-forks that many worker processes accepting on one listening socket.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import signal
+import socket
+import asyncio
+import functools
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from commands import parse
+from sessions import SenderQueue
+from idempotency import ClaimReleased
+
+EMPTY_TWIML = b'<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    503: 'Service Unavailable',
+}
+
+
+class ReplySender:
+    """Delivers an assistant reply back to a WhatsApp sender"""
+
+    async def send(self, to, body):
+        raise NotImplementedError
+
+
+class LogReplySender(ReplySender):
+    """Prints replies instead of sending them (local testing)"""
+
+    async def send(self, to, body):
+        print(f"📤 Reply to {to}:\n{body}")
+
+
+class TwilioReplySender(ReplySender):
+    """Sends replies through the Twilio Messages API, one new connection per
+    reply (outbound.OutboundSender pools connections and orders replies)"""
+
+    API_URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+
+    def __init__(self, account_sid, auth_token, from_number, executor=None):
+        self.url = self.API_URL.format(sid=account_sid)
+        credentials = base64.b64encode(f"{account_sid}:{auth_token}".encode()).decode()
+        self.authorization = f"Basic {credentials}"
+        self.from_number = from_number
+        self.executor = executor
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ['TWILIO_ACCOUNT_SID'], os.environ['TWILIO_AUTH_TOKEN'],
+                   os.environ['TWILIO_WHATSAPP_NUMBER'])
+
+    def _post(self, to, body):
+        data = urllib.parse.urlencode({'From': self.from_number, 'To': to, 'Body': body}).encode()
+        request = urllib.request.Request(self.url, data=data, method='POST')
+        request.add_header('Authorization', self.authorization)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+
+    async def send(self, to, body):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._post, to, body)
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(STATUS_TEXT.get(status, str(status)))
+        self.status = status
+
+
+class WebhookServer:
+    """Asyncio webhook endpoint in front of a WhatsAppDriveAssistant.
+
+    POST /webhook takes Twilio form fields (From, Body, MessageSid), returns an
+    empty TwiML 200 straight away and replies through reply_sender once the
+    command has run. Each sender's messages run in arrival order; at most
+    max_concurrency commands run at once across senders. When more than
+    max_pending are waiting the webhook answers 503 so Twilio retries.
+    A redelivered MessageSid is acknowledged but not run again: it waits for
+    the first delivery and re-sends the reply only if that send failed.
+    With jobs_path, long commands go to a durable job queue stored there and
+    their results are pushed through reply_sender when done. GET /metrics
+    serves the assistant's metrics in the Prometheus text format. With
+    webhook_log, every webhook is appended to that file as a JSON line that
+    bench_suite.py can replay. assistant may also be a zero-argument factory:
+    it is then called on a worker thread once the socket is listening, and
+    requests other than GET /health wait for it, so a cold start accepts
+    connections before the assistant and its backends are initialised.
+    sock is an already bound listening socket to accept on instead of
+    host:port (a pre-forked worker's share of the parent's socket).
+    """
+
+    def __init__(self, assistant, reply_sender=None, host='0.0.0.0', port=8080,
+                 max_concurrency=64, max_pending=10000, jobs_path=None, job_workers=2,
+                 webhook_log=None, sock=None):
+        self.assistant_factory = assistant if callable(assistant) else None
+        self.assistant = None if self.assistant_factory else assistant
+        self.ready = None
+        self.reply_sender = reply_sender or LogReplySender()
+        self.host = host
+        self.port = port
+        self.sock = sock
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.jobs_path = jobs_path
+        self.job_workers = job_workers
+        self.webhook_log = webhook_log
+        self._webhook_log_file = None
+        self.limiter = None
+        self.sender_queue = SenderQueue()
+        self.pending = 0
+        self.tasks = set()
+        self.server = None
+        self.loop = None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                           thread_name_prefix='assistant')
+        self.routes = {
+            ('POST', '/webhook'): self.handle_webhook,
+            ('POST', '/process'): self.handle_process,
+            ('GET', '/health'): self.handle_health,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('GET', '/traces'): self.handle_traces,
+        }
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.limiter = asyncio.Semaphore(self.max_concurrency)
+        if self.sock is not None:
+            self.server = await asyncio.start_server(self._handle_connection, sock=self.sock,
+                                                     limit=MAX_HEADER_BYTES, backlog=2048)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                     limit=MAX_HEADER_BYTES, backlog=2048)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready = self.loop.create_task(self._initialize())
+        if self.assistant_factory is None:
+            await self.ready
+        return self
+
+    async def _initialize(self):
+        if self.assistant_factory is not None:
+            try:
+                self.assistant = await self.loop.run_in_executor(None, self.assistant_factory)
+            except Exception as e:
+                print(f"❌ Error starting the assistant: {e}")
+                raise
+        metrics = getattr(self.assistant, 'metrics', None)
+        if metrics is not None and hasattr(self.reply_sender, 'collect_metrics'):
+            metrics.collectors.append(self.reply_sender.collect_metrics)
+        if self.webhook_log:
+            self._webhook_log_file = open(self.webhook_log, 'a', buffering=1, encoding='utf-8')
+        if self.jobs_path:
+            # Off the loop: starting re-sends undelivered results through push()
+            await self.loop.run_in_executor(None, functools.partial(
+                self.assistant.start_jobs, self.jobs_path, notify=self.push, workers=self.job_workers))
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.ready is not None:
+            await asyncio.gather(self.ready, return_exceptions=True)
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        close = getattr(self.assistant, 'close', None)
+        if close is not None:
+            # Finishes running jobs and flushes the audit log: off the loop
+            await self.loop.run_in_executor(None, close)
+        if self._webhook_log_file is not None:
+            self._webhook_log_file.close()
+        if hasattr(self.reply_sender, 'close'):
+            await self.reply_sender.close()
+        self.executor.shutdown(wait=False)
+
+    # -- HTTP --------------------------------------------------------------
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413)
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400)
+        if length < 0:
+            raise HTTPError(400)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413)
+        body = await reader.readexactly(length) if length else b''
+        return method, urllib.parse.urlsplit(target).path, headers, body
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    route = self.routes.get((method, path))
+                    if route is None:
+                        raise HTTPError(405 if any(p == path for _, p in self.routes) else 404)
+                    if not self.ready.done() and route != self.handle_health:
+                        # Shielded: a client hanging up must not cancel initialisation
+                        await asyncio.gather(asyncio.shield(self.ready), return_exceptions=True)
+                    if self.assistant is None and route != self.handle_health:
+                        raise HTTPError(503)
+                    status, content_type, payload = await route(headers, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                except HTTPError as e:
+                    status, content_type, payload = e.status, 'text/plain', str(e).encode()
+                    keep_alive = False
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # -- command execution -------------------------------------------------
+
+    def push(self, sender, body, timeout=30):
+        """Send an unsolicited message (e.g. a finished job) from any thread"""
+        future = asyncio.run_coroutine_threadsafe(self.reply_sender.send(sender, body), self.loop)
+        return future.result(timeout)
+
+    def _observe(self, stage, seconds):
+        metrics = getattr(self.assistant, 'metrics', None)
+        if metrics is not None:
+            metrics.observe('server_stage_seconds', (('stage', stage),), seconds,
+                            'Webhook server time outside the assistant, by stage')
+
+    async def run_command(self, sender, message):
+        """Run one message through the assistant, in order for its sender"""
+        return await self.sender_queue.run(sender, self._run_limited, sender, message, time.perf_counter())
+
+    async def _run_limited(self, sender, message, queued=None):
+        # Rate limits are checked when the sender's turn comes up, so deferred
+        # commands keep their order and wait here without holding a worker thread
+        command = parse(message)[0]
+        delay, rejection = self.assistant.admit(command, sender)
+        if rejection is not None:
+            metrics = getattr(self.assistant, 'metrics', None)
+            if metrics is not None:
+                metrics.inc('messages_total', (('command', self.assistant.command_label(command)),
+                                               ('outcome', 'rejected')))
+            return rejection
+        if delay:
+            await asyncio.sleep(delay)
+        # Taken after the sender's turn comes up, so a busy sender never holds a slot idle
+        async with self.limiter:
+            if queued is not None:
+                self._observe('queue_wait', time.perf_counter() - queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(
+                self.assistant.process_message, message, sender, admitted=True))
+
+    async def _run_and_reply(self, sender, message, entry=None):
+        idempotency = self.assistant.idempotency
+        try:
+            try:
+                response = await self.run_command(sender, message)
+            except Exception as e:
+                if entry is not None:
+                    idempotency.fail(entry, e)
+                raise
+            delivered = False
+            start = time.perf_counter()
+            try:
+                await self.reply_sender.send(sender, response)
+                delivered = True
+                self._observe('reply_send', time.perf_counter() - start)
+            finally:
+                if entry is not None:
+                    idempotency.complete(entry, response, delivered=delivered)
+        except Exception as e:
+            print(f"❌ Error handling message from {sender}: {e}")
+        finally:
+            self.pending -= 1
+
+    async def _replay(self, sender, message, entry):
+        """Duplicate delivery: wait for the original, re-send only if its reply was lost"""
+        idempotency = self.assistant.idempotency
+        try:
+            try:
+                response = await idempotency.wait_async(entry)
+            except ClaimReleased:
+                # The worker running it gave up or died: run it here unless another worker got there first
+                entry, owner = idempotency.begin(entry.key)
+                if owner:
+                    self.pending += 1
+                    await self._run_and_reply(sender, message, entry)
+                else:
+                    await self._replay(sender, message, entry)
+                return
+            # Runs on the event loop, so check-and-set cannot race another duplicate
+            if entry.delivered:
+                return
+            entry.delivered = True
+            try:
+                await self.reply_sender.send(sender, response)
+            except Exception:
+                entry.delivered = False
+                raise
+        except Exception as e:
+            print(f"❌ Error replaying message {entry.key} to {sender}: {e}")
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    # -- routes ------------------------------------------------------------
+
+    async def handle_webhook(self, headers, body):
+        """Twilio webhook: ack now, reply later"""
+        form = urllib.parse.parse_qs(body.decode('utf-8'), keep_blank_values=True)
+        sender = form.get('From', [''])[0]
+        message = form.get('Body', [''])[0]
+        message_sid = form.get('MessageSid', [''])[0]
+        if not sender:
+            raise HTTPError(400)
+        if self._webhook_log_file is not None:
+            self._webhook_log_file.write(json.dumps({'time': time.time(), 'From': sender, 'Body': message,
+                                                     'MessageSid': message_sid}) + '\n')
+        if self.pending >= self.max_pending:
+            raise HTTPError(503)
+        entry = None
+        if message_sid:
+            entry, owner = self.assistant.idempotency.begin(message_sid)
+            if not owner:
+                self._spawn(self._replay(sender, message, entry))
+                return 200, 'text/xml', EMPTY_TWIML
+        self.pending += 1
+        self._spawn(self._run_and_reply(sender, message, entry))
+        return 200, 'text/xml', EMPTY_TWIML
+
+    async def handle_process(self, headers, body):
+        """JSON endpoint used by the web test interface"""
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(400)
+        message = data.get('message', '')
+        message_sid = data.get('message_sid')
+        if not message:
+            response = '❌ Please enter a message'
+        elif message_sid:
+            response = await self._run_once(data.get('sender', 'web'), message, message_sid)
+        else:
+            response = await self.run_command(data.get('sender', 'web'), message)
+        return 200, 'application/json', json.dumps({'response': response}).encode()
+
+    async def _run_once(self, sender, message, message_sid):
+        idempotency = self.assistant.idempotency
+        while True:
+            entry, owner = idempotency.begin(message_sid)
+            if owner:
+                break
+            try:
+                return await idempotency.wait_async(entry)
+            except ClaimReleased:
+                continue
+        try:
+            response = await self.run_command(sender, message)
+        except Exception as e:
+            idempotency.fail(entry, e)
+            raise
+        idempotency.complete(entry, response)
+        return response
+
+    async def handle_health(self, headers, body):
+        status = {'status': 'ok' if self.assistant is not None else 'starting', 'pending': self.pending,
+                  'worker': os.environ.get('WORKER_ID'), 'pid': os.getpid()}
+        admission = getattr(self.assistant, 'admission', None)
+        if admission is not None:
+            status['rate_limits'] = admission.stats()
+        idempotency = getattr(self.assistant, 'idempotency', None)
+        if idempotency is not None:
+            status['dedup'] = idempotency.stats()
+        jobs = getattr(self.assistant, 'jobs', None)
+        if jobs is not None:
+            status['jobs'] = jobs.counts()
+        return 200, 'application/json', json.dumps(status).encode()
+
+    async def handle_metrics(self, headers, body):
+        """Prometheus scrape endpoint"""
+        metrics = getattr(self.assistant, 'metrics', None)
+        if metrics is None:
+            raise HTTPError(404)
+        # Collectors read SQLite-backed stores (jobs), so render off the loop
+        text = await self.loop.run_in_executor(None, metrics.render)
+        return 200, 'text/plain; version=0.0.4', text.encode()
+
+    async def handle_traces(self, headers, body):
+        """Per-stage timings of the most recent sampled messages"""
+        metrics = getattr(self.assistant, 'metrics', None)
+        if metrics is None:
+            raise HTTPError(404)
+        traces = [trace.to_dict() for trace in list(metrics.recent)]
+        return 200, 'application/json', json.dumps({'traces': traces}).encode()
+
+
+def make_server(assistant, host, port, max_concurrency, sock=None):
+    """WebhookServer configured from the environment"""
+    if os.environ.get('TWILIO_ACCOUNT_SID') and os.environ.get('TWILIO_AUTH_TOKEN'):
+        from outbound import OutboundSender
+        reply_sender = OutboundSender.from_env()
+    else:
+        reply_sender = LogReplySender()
+    return WebhookServer(assistant, reply_sender, host=host, port=port,
+                         max_concurrency=max_concurrency,
+                         jobs_path=os.environ.get('JOBS_DB_PATH', 'jobs.sqlite3'),
+                         webhook_log=os.environ.get('WEBHOOK_LOG_PATH') or None, sock=sock)
+
+
+def run_server(assistant, host=None, port=None, max_concurrency=None, workers=None):
+    """Run the webhook server until interrupted; assistant may be a factory (see WebhookServer).
+    With more than one worker (WORKERS) it must be a factory: see run_workers."""
+    host = host or os.environ.get('HOST', '0.0.0.0')
+    port = int(port or os.environ.get('PORT', 8080))
+    max_concurrency = int(max_concurrency or os.environ.get('MAX_CONCURRENCY', 64))
+    workers = int(workers or os.environ.get('WORKERS', 1))
+    if workers > 1:
+        return run_workers(assistant, host, port, max_concurrency, workers)
+    server = make_server(assistant, host, port, max_concurrency)
+
+    def started():
+        # After start so the port is the bound one (PORT=0 picks a free port)
+        print(f"🚀 Webhook server listening on http://{host}:{server.port}/webhook")
+        print("🛑 Press Ctrl+C to stop the server")
+
+    try:
+        asyncio.run(serve_until_stopped(server, started, lambda: print("\n🛑 Stopping server...")))
+    except KeyboardInterrupt:
+        pass
+
+
+async def serve_until_stopped(server, started=None, stopping=None):
+    """Serve until SIGINT or SIGTERM, then close the server and its assistant;
+    started() and stopping() are called around that if given"""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C raises KeyboardInterrupt instead and atexit closes the assistant
+            pass
+    await server.start()
+    if started is not None:
+        started()
+    serving = loop.create_task(server.serve_forever())
+    waiting = loop.create_task(stop.wait())
+    try:
+        await asyncio.wait((serving, waiting), return_when=asyncio.FIRST_COMPLETED)
+        if stopping is not None:
+            stopping()
+    finally:
+        waiting.cancel()
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        await server.close()
+
+
+def run_workers(assistant_factory, host, port, max_concurrency, workers):
+    """Pre-fork server: bind host:port here, then fork workers processes that
+    all accept on that socket, each building its own assistant from the
+    factory. Workers that die are restarted. State the workers must share
+    goes to SHARED_STATE, which defaults to an SQLite file here."""
+    if not callable(assistant_factory) or not hasattr(os, 'fork'):
+        print("❌ WORKERS > 1 needs an assistant factory and os.fork(); starting one worker")
+        return run_server(assistant_factory, host, port, max_concurrency, workers=1)
+    if not os.environ.get('SHARED_STATE'):
+        os.environ['SHARED_STATE'] = 'sqlite:///shared_state.sqlite3'
+    # Raise KeyboardInterrupt on SIGTERM too, here and (inherited) in the workers
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    sock = socket.create_server((host, port), backlog=2048)
+    port = sock.getsockname()[1]
+    children = {}
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid:
+            children[pid] = (worker_id, time.monotonic())
+            return
+        code = 0
+        try:
+            os.environ['WORKER_ID'] = str(worker_id)
+            server = make_server(assistant_factory, host, port, max_concurrency, sock=sock)
+            # Closes the server and the assistant (flushing its audit log) on SIGTERM/SIGINT
+            asyncio.run(serve_until_stopped(server))
+        except KeyboardInterrupt:
+            pass
+        except BaseException as e:
+            print(f"❌ Worker {worker_id} failed: {e}")
+            code = 1
+        finally:
+            # os._exit skips the interpreter's own clean-up, buffered output included
+            sys.stdout.flush()
+            os._exit(code)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+    print(f"🚀 Webhook server listening on http://{host}:{port}/webhook")
+    print(f"👷 {workers} worker processes, shared state in {os.environ['SHARED_STATE']}")
+    print("🛑 Press Ctrl+C to stop the server")
+    try:
+        while True:
+            pid, status = os.wait()
+            worker_id, started = children.pop(pid, (None, 0))
+            if worker_id is None:
+                continue
+            print(f"⚠️  Worker {worker_id} exited (status {status}); restarting it")
+            if time.monotonic() - started < 1:
+                # Failing at start-up: do not fork in a tight loop
+                time.sleep(1)
+            spawn(worker_id)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping server...")
+        # A second Ctrl+C (or a signal sent to the whole group) must not cut the wait short
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Audit Log
+Bounded in-memory ring buffer of recent operations plus an optional
+background flusher that persists them as rotating JSON-lines segments.
+"""
+
+import os
+import json
+import time
+import heapq
+import threading
+from collections import deque
+from datetime import datetime
+
+FSYNC_POLICIES = ('always', 'rotate', 'never')
+SEGMENT_PREFIX = 'audit-'
+SEGMENT_SUFFIX = '.jsonl'
+MAX_RETRY_DELAY = 30.0
+
+
+class AuditLog:
+    """Append-only audit log that never blocks the request path.
+
+    append() only touches two deques (atomic under the GIL). When a directory
+    is given, a daemon thread drains the pending queue every flush_interval
+    seconds and writes the batch to the current segment, rotating it when it
+    exceeds segment_max_bytes or segment_max_age seconds. fsync policy:
+    'always' fsyncs every batch, 'rotate' only when a segment is closed,
+    'never' leaves it to the OS. A failed write puts the batch back in the
+    queue and the flusher retries it with backoff. Sinks are called with
+    each flushed batch (e.g. to append rows to the audit spreadsheet in one
+    request).
+    Several processes can share a directory when each has its own writer
+    name: their segments are named apart, retention only removes a writer's
+    own segments, and query() merges all writers in timestamp order.
+    """
+
+    def __init__(self, directory=None, capacity=10000, max_pending=1_000_000,
+                 flush_interval=0.5, segment_max_bytes=8 * 1024 * 1024, segment_max_age=3600,
+                 max_segments=None, fsync='rotate', sinks=None, writer=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.directory = directory
+        self.writer = writer
+        self.recent = deque(maxlen=capacity)
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.max_segments = max_segments
+        self.fsync = fsync
+        self.sinks = list(sinks or [])
+        self.total = 0
+        self.dropped = 0
+        self.flushed = 0
+        self._segment = None
+        self._segment_bytes = 0
+        self._segment_opened = 0.0
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if directory or self.sinks:
+            self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+            self._thread.start()
+
+    # -- request path ------------------------------------------------------
+
+    def append(self, operation, details):
+        """Record an operation and return the log entry"""
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'operation': operation,
+            'details': details
+        }
+        self.recent.append(entry)
+        self.total += 1
+        if self.directory or self.sinks:
+            if len(self.pending) >= self.max_pending:
+                self.dropped += 1
+            else:
+                self.pending.append(entry)
+        return entry
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(list(self.recent))
+
+    # -- background flushing -----------------------------------------------
+
+    def _run(self):
+        delay = self.flush_interval
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # The batch is back in pending; retry it with backoff (e.g. a full disk)
+                delay = min(max(delay, self.flush_interval) * 2, MAX_RETRY_DELAY)
+                print(f"❌ Audit flush failed, retrying in {delay:.1f}s: {e}")
+            else:
+                delay = self.flush_interval
+
+    def _segment_name(self, first_timestamp):
+        # Named after its first entry, so segment i holds [start_i, start_i+1)
+        stamp = datetime.fromisoformat(first_timestamp).strftime('%Y%m%dT%H%M%S%f')
+        if self.writer is not None:
+            stamp = f"{stamp}-{self.writer}"
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{stamp}{SEGMENT_SUFFIX}")
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+        self._segment.flush()
+        if self.fsync != 'never':
+            os.fsync(self._segment.fileno())
+        self._segment.close()
+        self._segment = None
+
+    def _rotate_if_needed(self, first_timestamp):
+        now = time.monotonic()
+        if self._segment is not None and (self._segment_bytes >= self.segment_max_bytes
+                                          or now - self._segment_opened >= self.segment_max_age):
+            self._close_segment()
+        if self._segment is None:
+            self._segment = open(self._segment_name(first_timestamp), 'ab')
+            self._segment_bytes = 0
+            self._segment_opened = now
+            self._enforce_retention()
+
+    def _enforce_retention(self):
+        if not self.max_segments:
+            return
+        segments = [filename for filename in self.segments() if self._segment_writer(filename) == self.writer]
+        for filename in segments[:-self.max_segments]:
+            os.remove(filename)
+
+    def _write(self, batch):
+        self._rotate_if_needed(batch[0]['timestamp'])
+        data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch).encode('utf-8')
+        offset = self._segment.tell()
+        try:
+            self._segment.write(data)
+            self._segment.flush()
+            if self.fsync == 'always':
+                os.fsync(self._segment.fileno())
+        except BaseException:
+            # Cut off a partly written batch and reopen the segment on the retry
+            segment, self._segment = self._segment, None
+            try:
+                segment.truncate(offset)
+                segment.close()
+            except OSError:
+                pass
+            raise
+        self._segment_bytes += len(data)
+
+    def flush(self):
+        """Write everything pending to disk and hand it to the sinks"""
+        with self._flush_lock:
+            pending = self.pending
+            batch = []
+            while pending:
+                batch.append(pending.popleft())
+            if not batch:
+                return 0
+            if self.directory:
+                try:
+                    self._write(batch)
+                except BaseException:
+                    pending.extendleft(reversed(batch))
+                    raise
+            for sink in self.sinks:
+                try:
+                    sink(batch)
+                except Exception as e:
+                    print(f"❌ Audit sink failed: {e}")
+            self.flushed += len(batch)
+            return len(batch)
+
+    def close(self):
+        """Stop the flusher and persist anything still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._flush_lock:
+            self._close_segment()
+
+    # -- queries -----------------------------------------------------------
+
+    def segments(self):
+        """Return segment filenames, oldest first"""
+        if not self.directory:
+            return []
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    @staticmethod
+    def _segment_start(filename):
+        stamp = os.path.basename(filename)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].partition('-')[0]
+        return datetime.strptime(stamp, '%Y%m%dT%H%M%S%f').isoformat()
+
+    @staticmethod
+    def _segment_writer(filename):
+        _stamp, dash, writer = os.path.basename(filename)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].partition('-')
+        return writer if dash else None
+
+    def query(self, start=None, end=None, operation=None, limit=None):
+        """Return entries with start <= timestamp < end, optionally for one operation.
+
+        start/end are datetimes or ISO strings. Persisted segments are read
+        when a directory is configured, otherwise only the in-memory buffer.
+        """
+        start = start.isoformat() if isinstance(start, datetime) else start
+        end = end.isoformat() if isinstance(end, datetime) else end
+
+        def matches(entry):
+            timestamp = entry['timestamp']
+            return ((start is None or timestamp >= start)
+                    and (end is None or timestamp < end)
+                    and (operation is None or entry['operation'] == operation))
+
+        results = []
+        if not self.directory:
+            entries = self.recent
+        else:
+            self.flush()
+            entries = self._iter_segments(start, end)
+        for entry in entries:
+            if matches(entry):
+                results.append(entry)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def _iter_segments(self, start, end):
+        writers = {}
+        for filename in self.segments():
+            writers.setdefault(self._segment_writer(filename), []).append(filename)
+        if len(writers) == 1:
+            return self._iter_writer(next(iter(writers.values())), start, end)
+        return heapq.merge(*(self._iter_writer(segments, start, end) for segments in writers.values()),
+                           key=lambda entry: entry['timestamp'])
+
+    def _iter_writer(self, segments, start, end):
+        """Entries of one writer's segments (oldest first) that may fall in [start, end)"""
+        starts = [self._segment_start(filename) for filename in segments]
+        for i, filename in enumerate(segments):
+            # Segment i covers [starts[i], starts[i + 1]); skip ones outside the range
+            if end is not None and starts[i] >= end:
+                break
+            if start is not None and i + 1 < len(starts) and starts[i + 1] < start:
+                continue
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Audit Log Benchmark
+Appends operations at a target rate with the background flusher running and
+reports request-path latency, achieved throughput and what reached disk.
+
+Usage: python bench_audit.py [--ops 500000] [--rate 50000] [--fsync rotate]
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from audit import AuditLog, FSYNC_POLICIES
+from load_test import percentile
+
+OPERATIONS = ['LIST', 'DELETE', 'MOVE', 'SUMMARY']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ops', type=int, default=500_000)
+    parser.add_argument('--rate', type=int, default=50_000, help='target ops/sec (0 = unthrottled)')
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='rotate')
+    parser.add_argument('--segment-bytes', type=int, default=4 * 1024 * 1024)
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='audit-bench-')
+    audit_log = AuditLog(directory=directory, fsync=options.fsync,
+                         segment_max_bytes=options.segment_bytes)
+    latencies = []
+    interval = 1.0 / options.rate if options.rate else 0.0
+    clock = time.perf_counter
+    start = clock()
+    try:
+        for i in range(options.ops):
+            if interval:
+                # Pace to the target rate without sleeping per call
+                while clock() - start < i * interval:
+                    pass
+            before = clock()
+            audit_log.append(OPERATIONS[i & 3], f"/ProjectX/file{i}.pdf")
+            latencies.append(clock() - before)
+        elapsed = clock() - start
+        close_start = clock()
+        audit_log.close()
+        close_elapsed = clock() - close_start
+
+        print(f"⏱️  {options.ops} ops in {elapsed:.2f}s ({options.ops / elapsed:,.0f} ops/sec)")
+        print(f"📊 append p50={percentile(latencies, 50) * 1e6:.2f}µs "
+              f"p99={percentile(latencies, 99) * 1e6:.2f}µs max={max(latencies) * 1e6:.0f}µs")
+        print(f"💾 {audit_log.flushed} persisted in {len(audit_log.segments())} segments, "
+              f"{audit_log.dropped} dropped, final flush {close_elapsed * 1000:.1f}ms")
+        sample = audit_log.query(operation='DELETE', limit=3)
+        print(f"🔍 query(operation='DELETE', limit=3) -> {[entry['details'] for entry in sample]}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Backend Benchmark
+Generates (or loads) a JSON fixture of a large Drive tree and times the
+command layer against the in-memory backend.
+
+Usage: python bench_backend.py [--files 100000] [--fixture tree.json]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+from drive_backend import InMemoryDriveBackend, generate_fixture, split_path
+from rate_limit import AdmissionController
+from run_test import WhatsAppDriveAssistant
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed / repeat * 1e6:10.1f} µs/op  ({repeat} ops)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=100_000, help='files to generate')
+    parser.add_argument('--fixture', help='JSON fixture to load (generated if missing)')
+    parser.add_argument('--repeat', type=int, default=1000)
+    options = parser.parse_args()
+
+    if options.fixture and os.path.exists(options.fixture):
+        start = time.perf_counter()
+        backend = InMemoryDriveBackend.load_fixture(options.fixture)
+        print(f"📂 Loaded {options.fixture} in {time.perf_counter() - start:.2f}s")
+    else:
+        start = time.perf_counter()
+        backend = InMemoryDriveBackend.from_fixture(generate_fixture(options.files))
+        print(f"🏗️  Generated {options.files} files in {time.perf_counter() - start:.2f}s")
+        if options.fixture:
+            backend.save_fixture(options.fixture)
+            print(f"💾 Saved fixture to {options.fixture}")
+
+    assistant = WhatsAppDriveAssistant(backend=backend, admission=AdmissionController(limits={}))
+    rng = random.Random(0)
+    folders = [backend.path_of(n) for n in backend.nodes.values() if n.is_folder and n.parent]
+    files = [backend.path_of(n) for n in backend.nodes.values() if not n.is_folder]
+    print(f"📊 {len(files)} files in {len(folders)} folders")
+
+    timed('LIST (command layer)', lambda: assistant.process_message(f"LIST {rng.choice(folders)}"), options.repeat)
+    timed('backend.get (resolve)', lambda: backend.get(rng.choice(files)), options.repeat * 10)
+
+    def move_round_trip():
+        path = rng.choice(files)
+        source_folder = '/' + '/'.join(split_path(path)[:-1])
+        target = rng.choice(folders)
+        if target == source_folder:
+            return
+        node = backend.move(path, target)
+        backend.move(backend.path_of(node), source_folder)
+
+    timed('MOVE + move back', move_round_trip, options.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Chunked Summarization Benchmark
+Summarizes a generated long document (300 pages by default) with a
+deterministic local model that rejects inputs over its context window:
+directly (which fails), cold through ChunkedSummarizer, again after editing
+one page, and again after inserting a paragraph, counting model calls per
+run. Two cold runs must give the same summary.
+
+Usage: python bench_chunked_summary.py [--pages 300] [--chunk-tokens 3000] [--latency 0.05]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from chunked_summary import ChunkedSummarizer, estimate_tokens, split_chunks
+from summary_cache import SummaryCache
+from summary_pipeline import ExtractiveSummarizer
+
+WORDS = ('budget', 'report', 'roadmap', 'invoice', 'contract', 'minutes', 'forecast', 'design',
+         'review', 'plan', 'survey', 'launch', 'hiring', 'audit', 'pricing', 'security')
+
+
+def document(pages, seed=0, paragraphs_per_page=5):
+    """List of pages, each a few paragraphs of seeded sentences"""
+    rng = random.Random(seed)
+    result = []
+    for number in range(1, pages + 1):
+        paragraphs = []
+        for _ in range(paragraphs_per_page):
+            sentences = (' '.join(rng.choices(WORDS, k=12)).capitalize() + '.' for _ in range(6))
+            paragraphs.append(f"Page {number}. " + ' '.join(sentences))
+        result.append('\n'.join(paragraphs))
+    return result
+
+
+def timed(summarizer, text):
+    calls = summarizer.calls
+    start = time.perf_counter()
+    summary = summarizer.summarize(text)
+    return summary, summarizer.calls - calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--chunk-tokens', type=int, default=3000)
+    parser.add_argument('--context-tokens', type=int, default=4000, help="fake model's input limit")
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per model call')
+    parser.add_argument('--workers', type=int, default=8)
+    options = parser.parse_args()
+
+    pages = document(options.pages)
+    text = '\n'.join(pages)
+    model = ExtractiveSummarizer(latency=options.latency, max_input_tokens=options.context_tokens)
+    print(f"📊 {options.pages} pages, ~{estimate_tokens(text)} tokens, "
+          f"{len(split_chunks(text, options.chunk_tokens))} chunks of ≤{options.chunk_tokens} tokens")
+    try:
+        model.summarize(text)
+        print("❌ Direct call fit the context; raise --pages")
+        return 1
+    except ValueError as e:
+        print(f"   direct:          ❌ {e}")
+
+    failures = 0
+    summarizer = ChunkedSummarizer(model, cache=SummaryCache(), chunk_tokens=options.chunk_tokens,
+                                   map_workers=options.workers)
+    cold, calls, elapsed = timed(summarizer, text)
+    print(f"   cold:            {calls:>4} model calls {elapsed:>7.2f}s")
+
+    edited = list(pages)
+    middle = len(edited) // 2
+    edited[middle] = edited[middle].replace('budget', 'headcount')
+    _summary, calls, elapsed = timed(summarizer, '\n'.join(edited))
+    print(f"   one page edited: {calls:>4} model calls {elapsed:>7.2f}s")
+
+    inserted = list(pages)
+    inserted.insert(middle, 'An inserted paragraph about the new pricing plan.')
+    _summary, calls, elapsed = timed(summarizer, '\n'.join(inserted))
+    print(f"   paragraph added: {calls:>4} model calls {elapsed:>7.2f}s")
+
+    _summary, calls, elapsed = timed(summarizer, text)
+    failures += calls != 0
+    print(f"   unchanged:       {calls:>4} model calls {elapsed:>7.2f}s")
+
+    again = ChunkedSummarizer(model, cache=SummaryCache(), chunk_tokens=options.chunk_tokens,
+                              map_workers=options.workers).summarize(text)
+    failures += again != cold
+    print("✅ Cold runs are deterministic" if again == cold else "❌ Cold runs differ")
+    summarizer.pool.shutdown()
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
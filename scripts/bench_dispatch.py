@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Parse + Dispatch Benchmark
+Measures messages/sec through the tokenizer and command registry on a
+synthetic corpus. Handlers are no-ops so only parse + dispatch is timed.
+
+Usage: python bench_dispatch.py [--messages 1000000]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from commands import CommandRegistry, parse
+
+TEMPLATES = [
+    "HELP",
+    "LIST /ProjectX",
+    "list /Clients/{name}/Reports",
+    "DELETE /ProjectX/{name}.pdf",
+    "DELETE /ProjectX/{name}.pdf CONFIRM",
+    "MOVE /ProjectX/{name}.pdf /Archive",
+    'MOVE "/Shared Drive/{name} notes.docx" "/Archive/Old Notes"',
+    "SUMMARY /ProjectX",
+    "what is this",
+]
+
+
+def build_corpus(size, seed=0):
+    rng = random.Random(seed)
+    names = [f"Doc{i}" for i in range(1000)]
+    return [rng.choice(TEMPLATES).format(name=rng.choice(names)) for _ in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    options = parser.parse_args()
+
+    registry = CommandRegistry(unknown_handler=lambda args: None)
+    for verb in ('HELP', 'LIST', 'DELETE', 'MOVE', 'SUMMARY'):
+        registry.register(verb, lambda args: None)
+
+    print(f"🏗️  Building corpus of {options.messages} messages...")
+    corpus = build_corpus(options.messages)
+
+    dispatch = registry.dispatch
+    start = time.perf_counter()
+    for message in corpus:
+        command, args = parse(message)
+        dispatch(command, args)
+    elapsed = time.perf_counter() - start
+
+    print(f"⏱️  {options.messages} messages in {elapsed:.2f}s")
+    print(f"🚀 {options.messages / elapsed:,.0f} messages/sec ({elapsed / options.messages * 1e9:.0f} ns/message)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Text Extraction Benchmark
+Writes large txt/csv/docx/pptx/xlsx/pdf files to a temporary directory and
+extracts them with TextExtractor, once with the summarizer's token cap and
+once with only the memory budget limiting the text, reporting time, bytes
+read and the traced memory peak (with --whole, also for reading the file whole).
+
+Usage: python bench_extract.py [--size-mb 200] [--budget-mb 8] [--max-tokens 4000]
+"""
+
+import os
+import sys
+import time
+import zlib
+import random
+import argparse
+import zipfile
+import tempfile
+import tracemalloc
+
+from extract import TextExtractor
+
+WORDS = ('budget', 'report', 'roadmap', 'invoice', 'contract', 'minutes', 'forecast', 'design',
+         'review', 'plan', 'survey', 'launch', 'hiring', 'audit', 'pricing', 'security')
+FIRST = 'Quarterly revenue grew fifteen percent.'
+
+
+def sentences(rng, total_bytes):
+    """Yield sentences (the first one known) until about total_bytes of text"""
+    yield FIRST
+    produced = len(FIRST)
+    while produced < total_bytes:
+        sentence = ' '.join(rng.choices(WORDS, k=12)).capitalize() + '.'
+        produced += len(sentence) + 1
+        yield sentence
+
+
+def write_txt(path, size, rng):
+    with open(path, 'w', encoding='utf-8') as f:
+        for sentence in sentences(rng, size):
+            f.write(sentence + '\n')
+
+
+def write_csv(path, size, rng):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('id,description,amount\n')
+        for index, sentence in enumerate(sentences(rng, size)):
+            f.write(f'{index},"{sentence}",{rng.randint(1, 9999)}\n')
+
+
+def write_office(path, size, rng, parts):
+    """parts(rng, size) yields (member name, iterable of XML byte chunks)"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types/>')
+        for name, chunks in parts(rng, size):
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+
+
+def docx_parts(rng, size):
+    def chunks():
+        yield b'<?xml version="1.0"?><w:document xmlns:w="w"><w:body>'
+        for sentence in sentences(rng, size):
+            yield f'<w:p><w:r><w:t>{sentence}</w:t></w:r></w:p>'.encode()
+        yield b'</w:body></w:document>'
+    yield 'word/document.xml', chunks()
+
+
+def pptx_parts(rng, size):
+    slides = 200
+    for number in range(1, slides + 1):
+        def chunks(number=number):
+            yield b'<?xml version="1.0"?><p:sld xmlns:p="p" xmlns:a="a"><p:cSld><p:spTree>'
+            if number == 1:
+                yield f'<a:p><a:r><a:t>{FIRST}</a:t></a:r></a:p>'.encode()
+            for sentence in sentences(rng, size // slides):
+                yield f'<a:p><a:r><a:t>{sentence}</a:t></a:r></a:p>'.encode()
+            yield b'</p:spTree></p:cSld></p:sld>'
+        yield f'ppt/slides/slide{number}.xml', chunks()
+
+
+def xlsx_parts(rng, size):
+    def chunks():
+        yield b'<?xml version="1.0"?><sst xmlns="s">'
+        for sentence in sentences(rng, size):
+            yield f'<si><t>{sentence}</t></si>'.encode()
+        yield b'</sst>'
+    yield 'xl/sharedStrings.xml', chunks()
+
+
+def write_pdf(path, size, rng):
+    """Pages of Flate-compressed text with an uncompressible picture every tenth page"""
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        number = 1
+        text = sentences(rng, size)
+        written = 0
+        while written < size:
+            lines = [next(text, None) for _ in range(40)]
+            ops = b'BT /F1 11 Tf 72 760 Td ' + b' T* '.join(
+                b'(' + line.replace('(', r'\(').replace(')', r'\)').encode('latin-1') + b') Tj'
+                for line in lines if line) + b' ET'
+            data = zlib.compress(ops)
+            f.write(f'{number} 0 obj\n<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n'.encode())
+            f.write(data + b'\nendstream\nendobj\n')
+            written += len(ops)
+            number += 1
+            if number % 10 == 0:
+                picture = rng.randbytes(64 * 1024)
+                f.write(f'{number} 0 obj\n<< /Type /XObject /Subtype /Image /Length {len(picture)} '
+                        f'/Filter /DCTDecode >>\nstream\n'.encode())
+                f.write(picture + b'\nendstream\nendobj\n')
+                written += len(picture)
+                number += 1
+            if lines[-1] is None:
+                break
+        f.write(b'trailer\n<< >>\n%%EOF\n')
+
+
+FORMATS = {
+    'txt': write_txt,
+    'csv': write_csv,
+    'docx': lambda path, size, rng: write_office(path, size, rng, docx_parts),
+    'pptx': lambda path, size, rng: write_office(path, size, rng, pptx_parts),
+    'xlsx': lambda path, size, rng: write_office(path, size, rng, xlsx_parts),
+    'pdf': write_pdf,
+}
+
+
+def traced(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=200, help='uncompressed text per file')
+    parser.add_argument('--budget-mb', type=float, default=8, help='extraction memory budget')
+    parser.add_argument('--max-tokens', type=int, default=4000, help="summarizer's token cap")
+    parser.add_argument('--formats', default=','.join(FORMATS))
+    parser.add_argument('--whole', action='store_true', help='also time reading each file whole')
+    options = parser.parse_args()
+
+    size = int(options.size_mb * 1024 * 1024)
+    budget = int(options.budget_mb * 1024 * 1024)
+    rng = random.Random(0)
+    capped = TextExtractor(options.max_tokens, budget)
+    # No token cap: the text held is then limited by the budget alone
+    uncapped = TextExtractor(10 ** 9, budget)
+    print(f"📊 {options.size_mb:.0f}MB of text per file, {options.budget_mb:.0f}MB budget")
+    print(f"{'format':>6} {'file MB':>8} {'run':>7} {'read MB':>8} {'chars':>9} {'seconds':>8} "
+          f"{'peak MB':>8}")
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in options.formats.split(','):
+            path = os.path.join(directory, f"big.{extension}")
+            FORMATS[extension](path, size, rng)
+            file_mb = os.path.getsize(path) / 1024 / 1024
+            for label, extractor in (('tokens', capped), ('budget', uncapped)):
+                with open(path, 'rb') as f:
+                    result, elapsed, peak = traced(lambda: extractor.extract(f, path))
+                ok = peak <= budget and FIRST in result.text
+                failures += not ok
+                print(f"{extension:>6} {file_mb:>8.1f} {label:>7} {result.bytes_read / 1024 / 1024:>8.1f} "
+                      f"{len(result.text):>9} {elapsed:>8.2f} {peak / 1024 / 1024:>8.2f} "
+                      f"{'✅' if ok else '❌'}")
+            if options.whole:
+                def whole():
+                    with open(path, 'rb') as f:
+                        return f.read().decode('utf-8', errors='replace')
+                _text, elapsed, peak = traced(whole)
+                print(f"{extension:>6} {file_mb:>8.1f} {'whole':>7} {file_mb:>8.1f} {'':>9} {elapsed:>8.2f} "
+                      f"{peak / 1024 / 1024:>8.2f}")
+            os.remove(path)
+    print("✅ Every extraction stayed within the budget" if not failures
+          else f"❌ {failures} extraction(s) over budget or missing text")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Metrics Overhead Benchmark
+Measures what instrumentation costs: a timing span with sampling off and
+on, a whole message through process_message at sample rates 0 and 1, and
+rendering /metrics. Also checks the histogram's p50/p95/p99 estimates
+against exact percentiles of the same samples.
+
+Usage: python bench_metrics.py [--spans 1000000] [--messages 20000]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from drive_backend import InMemoryDriveBackend
+from load_test import percentile
+from metrics import Histogram, Metrics
+from rate_limit import AdmissionController
+from run_test import WhatsAppDriveAssistant
+
+
+def span_cost(metrics, count):
+    """Seconds per 'with metrics.span(...)' on top of an empty loop"""
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    baseline = time.perf_counter() - start
+    span = metrics.span
+    start = time.perf_counter()
+    for _ in range(count):
+        with span('drive.get'):
+            pass
+    return (time.perf_counter() - start - baseline) / count
+
+
+def message_cost(sample_rate, messages):
+    backend = InMemoryDriveBackend()
+    for i in range(50):
+        backend.add_file(f"/Reports/report-{i}.pdf", size=1024)
+    assistant = WhatsAppDriveAssistant(backend=backend, admission=AdmissionController(limits={}),
+                                       metrics=Metrics(sample_rate=sample_rate))
+    commands = ["HELP", "LIST /Reports", "LIST /Missing"]
+    for command in commands:
+        assistant.process_message(command, 'warmup')
+    start = time.perf_counter()
+    for i in range(messages):
+        assistant.process_message(commands[i % len(commands)], f"user{i % 100}")
+    return (time.perf_counter() - start) / messages, assistant.metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spans', type=int, default=1_000_000, help='spans per timing run')
+    parser.add_argument('--messages', type=int, default=20_000, help='messages per sample rate')
+    options = parser.parse_args()
+
+    metrics = Metrics(sample_rate=0.0)
+    metrics.begin('LIST')
+    off = span_cost(metrics, options.spans)
+    print(f"⚡ Span, sampling off: {off * 1e9:.0f}ns {'✅' if off < 1e-6 else '❌ over 1µs'}")
+    metrics = Metrics(sample_rate=1.0)
+    trace = metrics.begin('LIST')
+    on = span_cost(metrics, min(options.spans, 200_000))
+    trace.spans.clear()
+    print(f"⏱️  Span, sampling on: {on * 1e9:.0f}ns")
+
+    for rate in (0.0, 1.0):
+        cost, metrics = message_cost(rate, options.messages)
+        print(f"📨 process_message at sample rate {rate:.0f}: {cost * 1e6:.1f}µs per message")
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"📄 /metrics render: {(time.perf_counter() - start) * 1000:.2f}ms, "
+          f"{len(text.splitlines())} lines")
+
+    rng = random.Random(0)
+    samples = [rng.lognormvariate(-5, 1.2) for _ in range(100_000)]
+    histogram = Histogram()
+    for sample in samples:
+        histogram.observe(sample)
+    print(f"{'quantile':>9} {'exact ms':>9} {'estimate ms':>12}")
+    for q in (0.5, 0.95, 0.99):
+        print(f"{'p' + str(round(q * 100)):>9} {percentile(samples, q * 100) * 1000:>9.3f} "
+              f"{histogram.quantile(q) * 1000:>12.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
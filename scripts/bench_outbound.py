@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Outbound Sender Benchmark
+Starts a local HTTP stand-in for the Twilio Messages API (keep-alive, a
+fixed answer latency and a share of 503s) and sends replies to it at a
+fixed open-loop rate, mixing short replies with long multi-part LIST
+output: once through TwilioReplySender (a new connection per reply) and
+once through OutboundSender. Reports throughput, send latency p50/p99,
+requests and connections, and checks every recipient got their messages
+in order.
+
+Usage: python bench_outbound.py [--rate 500] [--duration 10] [--recipients 200] [--error-rate 0.02]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from async_server import TwilioReplySender
+from load_test import percentile
+from outbound import MESSAGES_PATH, ConnectionPool, OutboundSender
+
+TAG = re.compile(r'#(\d+)\b')
+
+
+class MessagesStandIn:
+    """Twilio Messages API stand-in recording (To, Body) per request"""
+
+    def __init__(self, latency, error_rate, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.received = []
+        self.requests = 0
+        self.connections = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=4096)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                headers = dict(line.split(': ', 1) for line in head.decode('latin-1').split('\r\n')[1:] if ': ' in line)
+                headers = {name.lower(): value for name, value in headers.items()}
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                if self.rng.random() < self.error_rate:
+                    status, payload = '503 Service Unavailable', b'{"message": "try again"}'
+                else:
+                    form = urllib.parse.parse_qs(body.decode())
+                    self.received.append((form['To'][0], form['Body'][0]))
+                    status, payload = '201 Created', json.dumps({'sid': f"SM{self.requests}"}).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def reply(rng, recipient, number, long_share):
+    """A short reply, or a LIST-style listing long enough to need several messages"""
+    if rng.random() < long_share:
+        rows = '\n'.join(f"📄 document_{index:04d}.pdf (2.3 MB, 2024-01-15)" for index in range(120))
+        return f"#{number} 📁 Files in /Clients/{recipient}:\n{rows}"
+    return f"#{number} ✅ Successfully moved /ProjectX/report{number}.pdf to /Archive"
+
+
+async def run(label, sender, stand_in, options):
+    rng = random.Random(1)
+    stand_in.received.clear()
+    requests, connections = stand_in.requests, stand_in.connections
+    recipients = [f"whatsapp:+1555{index:07d}" for index in range(options.recipients)]
+    sent = {recipient: [] for recipient in recipients}
+    latencies = []
+    failures = []
+
+    async def one(recipient, body):
+        start = time.perf_counter()
+        try:
+            await sender.send(recipient, body)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            failures.append(e)
+
+    tasks = []
+    total = int(options.rate * options.duration)
+    start = time.perf_counter()
+    for number in range(total):
+        delay = start + number / options.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        recipient = rng.choice(recipients)
+        sent[recipient].append(number)
+        tasks.append(asyncio.create_task(one(recipient, reply(rng, recipient, number, options.long_share))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    got = {recipient: [] for recipient in recipients}
+    for to, body in stand_in.received:
+        got[to].extend(int(tag) for tag in TAG.findall(body))
+    ordered = all(got[recipient] == sent[recipient] for recipient in recipients)
+    print(f"   {label:<22} {total / elapsed:>6.0f}/s  p50={percentile(latencies, 50) * 1000:>7.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:>8.1f}ms  requests={stand_in.requests - requests:>5} "
+          f"connections={stand_in.connections - connections:>5} failures={len(failures)} "
+          f"{'in order ✅' if ordered else 'out of order ❌'}")
+    return total / elapsed, percentile(latencies, 99), failures, ordered
+
+
+async def bench(options):
+    stand_in = MessagesStandIn(options.server_latency, options.error_rate)
+    port = await stand_in.start()
+    url = f"http://127.0.0.1:{port}"
+    print(f"📊 {options.rate} replies/s for {options.duration}s to {options.recipients} recipients, "
+          f"{options.long_share:.0%} multi-part, stand-in {options.server_latency * 1000:.0f}ms "
+          f"with {options.error_rate:.0%} 503s")
+
+    if not options.skip_baseline:
+        baseline = TwilioReplySender('AC0', 'token', 'whatsapp:+14155238886',
+                                     executor=ThreadPoolExecutor(max_workers=64))
+        baseline.url = url + MESSAGES_PATH.format(sid='AC0')
+        await run('new connection each', baseline, stand_in, options)
+        baseline.executor.shutdown()
+
+    sender = OutboundSender(ConnectionPool(url, max_connections=options.connections),
+                            MESSAGES_PATH.format(sid='AC0'), 'whatsapp:+14155238886', backoff=0.05)
+    throughput, p99, failures, ordered = await run('pooled + ordered', sender, stand_in, options)
+    print(f"   coalesced={sender.coalesced} retries={sender.retries} pool connections={sender.pool.opened}")
+    await sender.close()
+    # Let the stand-in's handlers see the closed connections before the loop ends
+    await asyncio.sleep(0.1)
+    stand_in.server.close()
+    await stand_in.server.wait_closed()
+    ok = throughput >= options.rate * 0.95 and not failures and ordered
+    print(f"{'✅' if ok else '❌'} OutboundSender kept up with {options.rate}/s (p99 {p99 * 1000:.0f}ms)")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=500, help='replies per second')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--recipients', type=int, default=200)
+    parser.add_argument('--long-share', type=float, default=0.1, help='share of multi-part replies')
+    parser.add_argument('--server-latency', type=float, default=0.02, help="stand-in's seconds per request")
+    parser.add_argument('--error-rate', type=float, default=0.02, help='share of requests answered 503')
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--skip-baseline', action='store_true')
+    options = parser.parse_args()
+    return asyncio.run(bench(options))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Path Index Benchmark
+Resolves N paths at depths 1-10 segment-by-segment (one Drive lookup per
+level) and through the PathIndex, and reports time and Drive lookups per
+resolution for each depth. Lookups are what cost ~50-100ms each on Drive.
+Then sends LIST and DELETE (the unconfirmed check) commands to the assistant
+for the same paths and reports the Drive calls each one made, against the
+calls a path walk would make (one lookup per segment plus the call itself).
+
+Usage: python bench_path_index.py [--resolves 1000000] [--paths 50000] [--commands 20000]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from drive_backend import InMemoryDriveBackend, LatencyDriveBackend, split_path
+from listing_cache import ListingCache
+from path_index import PathIndex
+from run_test import WhatsAppDriveAssistant
+
+
+def build_tree(n_paths, rng):
+    """Files spread over depths 1-10 with a branching factor of 4 per level"""
+    backend = InMemoryDriveBackend()
+    paths = {depth: [] for depth in range(1, 11)}
+    for i in range(n_paths):
+        depth = i % 10 + 1
+        folders = [f"d{depth}"] + [f"level{level}_{rng.randrange(4)}" for level in range(1, depth - 1)]
+        path = '/' + '/'.join(folders[:depth - 1] + [f"file{i}.pdf"])
+        backend.add_file(path, size=1024, modified='2024-01-15')
+        paths[depth].append(path)
+    return backend, paths
+
+
+class CountingLookup:
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+
+    def __call__(self, parent_id, name):
+        self.calls += 1
+        return self.backend.lookup_child(parent_id, name)
+
+
+def walk(lookup, path, root_id):
+    node_id = root_id
+    for name in split_path(path):
+        node_id = lookup(node_id, name)
+    return node_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resolves', type=int, default=1_000_000)
+    parser.add_argument('--paths', type=int, default=50_000, help='distinct paths in the tree')
+    parser.add_argument('--drive-latency', type=float, default=0.05, help='seconds per Drive lookup (for the estimate)')
+    parser.add_argument('--commands', type=int, default=20_000, help='LIST and DELETE commands each, over all depths')
+    options = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"🏗️  Building tree with {options.paths} files at depths 1-10...")
+    backend, paths = build_tree(options.paths, rng)
+    per_depth = options.resolves // 10
+    queries = {depth: [rng.choice(paths[depth]) for _ in range(per_depth)] for depth in paths}
+
+    print(f"📊 {per_depth} resolutions per depth ({per_depth * 10} total)")
+    print(f"{'depth':>5} {'walk µs':>9} {'walk lookups':>13} {'index µs':>9} {'index lookups':>14} {'est. Drive time saved':>22}")
+    totals = [0.0, 0, 0.0, 0]
+    for depth, batch in queries.items():
+        lookup = CountingLookup(backend)
+        start = time.perf_counter()
+        for path in batch:
+            walk(lookup, path, backend.ROOT_ID)
+        walk_time = time.perf_counter() - start
+        walk_lookups = lookup.calls
+
+        lookup = CountingLookup(backend)
+        index = PathIndex(lookup, root_id=backend.ROOT_ID)
+        start = time.perf_counter()
+        for path in batch:
+            index.resolve(path)
+        index_time = time.perf_counter() - start
+        index_lookups = lookup.calls
+
+        saved = (walk_lookups - index_lookups) * options.drive_latency
+        print(f"{depth:>5} {walk_time / len(batch) * 1e6:>9.2f} {walk_lookups / len(batch):>13.2f} "
+              f"{index_time / len(batch) * 1e6:>9.2f} {index_lookups / len(batch):>14.3f} {saved / 3600:>20.1f}h")
+        totals[0] += walk_time
+        totals[1] += walk_lookups
+        totals[2] += index_time
+        totals[3] += index_lookups
+
+    n = per_depth * 10
+    print(f"{'all':>5} {totals[0] / n * 1e6:>9.2f} {totals[1] / n:>13.2f} "
+          f"{totals[2] / n * 1e6:>9.2f} {totals[3] / n:>14.3f}")
+    return bench_commands(backend, queries, options.commands // 10)
+
+
+def bench_commands(backend, queries, per_depth):
+    """Drive calls per LIST / DELETE sent to the assistant (listing cache off)"""
+    counting = LatencyDriveBackend(backend, latency=0)
+    assistant = WhatsAppDriveAssistant(backend=counting, listing_cache=ListingCache(ttl=0))
+    print(f"\n📨 {per_depth} LIST and {per_depth} DELETE commands per depth through the assistant")
+    print(f"{'depth':>5} {'LIST calls':>11} {'walk':>6} {'DELETE calls':>13} {'walk':>6}")
+    failures = 0
+    for depth, batch in queries.items():
+        batch = batch[:per_depth]
+        counting.calls = 0
+        for path in batch:
+            reply = assistant.process_message(f"LIST {path.rsplit('/', 1)[0] or '/'}", 'bench', admitted=True)
+            failures += reply.startswith('❌')
+        list_calls = counting.calls / len(batch)
+        counting.calls = 0
+        for path in batch:
+            reply = assistant.process_message(f"DELETE {path}", 'bench', admitted=True)
+            failures += reply.startswith('❌')
+        delete_calls = counting.calls / len(batch)
+        print(f"{depth:>5} {list_calls:>11.3f} {depth:>6} {delete_calls:>13.3f} {depth + 1:>6}")
+    assistant.close()
+    if failures:
+        print(f"❌ {failures} command(s) failed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
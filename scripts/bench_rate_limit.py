@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Admission Control Benchmark
+Simulates a retry storm (one sender firing SUMMARY/LIST at a high rate)
+alongside ordinary senders on a virtual clock, and reports what each group
+got through, how much reached the backends, and the cost of admit() itself.
+
+Usage: python bench_rate_limit.py [--seconds 600] [--storm-rate 50] [--senders 200]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from rate_limit import AdmissionController
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=600, help='simulated duration')
+    parser.add_argument('--storm-rate', type=float, default=50, help='messages/s from the storming sender')
+    parser.add_argument('--senders', type=int, default=200, help='ordinary senders')
+    parser.add_argument('--admits', type=int, default=200_000, help='admit() calls for the timing run')
+    options = parser.parse_args()
+
+    rng = random.Random(0)
+    clock = VirtualClock()
+    controller = AdmissionController(clock=clock)
+    events = []
+    for i in range(int(options.seconds * options.storm_rate)):
+        events.append((i / options.storm_rate, 'storm', 'SUMMARY' if i % 2 else 'LIST'))
+    for sender in range(options.senders):
+        at = rng.uniform(0, 30)
+        while at < options.seconds:
+            events.append((at, f"user{sender}", rng.choice(['LIST', 'LIST', 'HELP', 'SEARCH', 'SUMMARY'])))
+            at += rng.expovariate(1 / 30)
+    events.sort(key=lambda event: event[0])
+
+    outcome = {}
+    for at, sender, verb in events:
+        clock.now = at
+        admission = controller.admit(sender, verb)
+        group = 'storm' if sender == 'storm' else 'others'
+        result = 'deferred' if admission.allowed and admission.delay else (
+            'admitted' if admission.allowed else 'rejected')
+        counts = outcome.setdefault((group, verb), {'admitted': 0, 'deferred': 0, 'rejected': 0})
+        counts[result] += 1
+
+    print(f"📊 {options.seconds}s simulated, storm at {options.storm_rate:.0f} msg/s, "
+          f"{options.senders} ordinary senders")
+    print(f"{'group':>7} {'command':>8} {'sent':>7} {'admitted':>9} {'deferred':>9} {'rejected':>9}")
+    for (group, verb), counts in sorted(outcome.items()):
+        print(f"{group:>7} {verb:>8} {sum(counts.values()):>7} {counts['admitted']:>9} "
+              f"{counts['deferred']:>9} {counts['rejected']:>9}")
+    storm_summaries = outcome.get(('storm', 'SUMMARY'), {})
+    reached = storm_summaries.get('admitted', 0) + storm_summaries.get('deferred', 0)
+    print(f"🛡️  Storm SUMMARY calls reaching the summarizer: {reached} "
+          f"(~{reached / options.seconds * 60:.1f}/min)")
+
+    controller = AdmissionController()
+    senders = [f"user{i}" for i in range(1000)]
+    start = time.perf_counter()
+    for i in range(options.admits):
+        controller.admit(senders[i % 1000], 'HELP')
+    elapsed = time.perf_counter() - start
+    print(f"⚡ admit(): {elapsed / options.admits * 1e6:.2f}µs per call")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Recursive SUMMARY Benchmark
+Runs SUMMARY /Clients RECURSIVE over a generated folder tree with slow
+stand-in Drive and model backends: cold, warm, after editing one deeply
+nested document (fed in as a Drive change), and after moving a file
+between branches, counting model calls and folders summarized per run and
+checking that no more than --concurrency folders were worked on at once.
+
+Usage: python bench_rollup.py [--fanout 4] [--depth 3] [--files 5] [--concurrency 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+from drive_backend import InMemoryDriveBackend, LatencyDriveBackend
+from rate_limit import AdmissionController
+from run_test import WhatsAppDriveAssistant
+from summary_pipeline import ExtractiveSummarizer
+
+
+class PeakPipeline:
+    """SummaryPipeline wrapper tracking how many folders run at once"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.runs = 0
+
+    def __getattr__(self, name):
+        return getattr(self.pipeline, name)
+
+    def run(self, folder_path, progress=None):
+        with self.lock:
+            self.active += 1
+            self.runs += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return self.pipeline.run(folder_path, progress)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def build_tree(fanout, depth, files):
+    """/Clients with fanout subfolders per level down to depth, files documents in
+    each, plus an empty /Clients/Archive"""
+    backend = InMemoryDriveBackend()
+    folders = ['/Clients']
+    frontier = ['/Clients']
+    for _ in range(depth):
+        frontier = [f"{path}/c{index}" for path in frontier for index in range(fanout)]
+        folders += frontier
+    backend.add_folder('/Clients/Archive')
+    for path in folders:
+        backend.add_folder(path)
+        for index in range(files):
+            backend.add_file(f"{path}/doc{index}.txt", size=64, modified='2024-01-15',
+                             content=f"Notes {index} for {path}. Further detail follows.")
+    return backend, folders + ['/Clients/Archive']
+
+
+def change(backend, path, old_path=None):
+    node = backend.get(path)
+    return {'file_id': node.id, 'old_path': old_path, 'path': path, 'is_folder': node.is_folder,
+            'removed': False, 'file': node.to_record()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fanout', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--files', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--drive-latency', type=float, default=0.005)
+    parser.add_argument('--summarizer-latency', type=float, default=0.02)
+    options = parser.parse_args()
+
+    memory, folders = build_tree(options.fanout, options.depth, options.files)
+    os.environ['ROLLUP_CONCURRENCY'] = str(options.concurrency)
+    assistant = WhatsAppDriveAssistant(
+        backend=LatencyDriveBackend(memory, options.drive_latency),
+        summarizer=ExtractiveSummarizer(latency=options.summarizer_latency),
+        admission=AdmissionController(limits={}))
+    pipeline = assistant.rollups.pipeline = PeakPipeline(assistant.rollups.pipeline)
+    print(f"📊 {len(folders)} folders, {(len(folders) - 1) * options.files} documents, "
+          f"concurrency {options.concurrency}")
+
+    def run(label):
+        calls, runs = assistant.summarizer.calls, pipeline.runs
+        start = time.perf_counter()
+        reply = assistant.process_message('SUMMARY /Clients RECURSIVE', 'bench')
+        elapsed = time.perf_counter() - start
+        print(f"   {label:<16} {elapsed:>7.2f}s {assistant.summarizer.calls - calls:>5} model calls "
+              f"{pipeline.runs - runs:>4} folders summarized   {reply.splitlines()[-1]}")
+        return pipeline.runs - runs
+
+    failures = 0
+    failures += run('cold') != len(folders)
+    failures += run('warm') != 0
+
+    deep = folders[-2]
+    memory.update_file(f"{deep}/doc0.txt", "Revised notes with new numbers. Further detail follows.")
+    assistant.apply_drive_changes([change(memory, f"{deep}/doc0.txt")])
+    failures += run('one doc edited') != options.depth + 1
+
+    assistant.process_message(f"MOVE {deep}/doc1.txt /Clients/Archive", 'bench')
+    failures += run('one doc moved') != options.depth + 2
+
+    ok = pipeline.peak <= options.concurrency
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} Peak {pipeline.peak} folders at once (cap {options.concurrency})")
+    print("✅ Only the changed branches were re-summarized" if not failures else f"❌ {failures} check(s) failed")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - SEARCH Benchmark
+Builds the search index over a synthetic corpus (file names drawn from a
+Zipf-distributed vocabulary, extracted text for a share of the documents),
+then times ranked queries with and without filters and incremental updates.
+
+Usage: python bench_search.py [--files 500000] [--queries 2000] [--text-share 0.1]
+"""
+
+import sys
+import time
+import random
+import argparse
+import itertools
+import resource
+
+from drive_backend import FILE_TYPES
+from load_test import percentile
+from search_index import SearchIndex, parse_query
+
+VOCABULARY_SIZE = 5000
+
+
+def build_corpus(n_files, text_share, rng):
+    """Yield (record, text or None) for a three-level folder tree of n_files"""
+    words = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY_SIZE)))
+    extensions = list(FILE_TYPES)
+    folders = ['root']
+    yield {'id': 'root', 'name': '/', 'parent': None, 'is_folder': True}, None
+    for level in range(3):
+        next_level = []
+        for parent in folders:
+            for i in range(10):
+                folder_id = f"{parent}.{i}"
+                next_level.append(folder_id)
+                yield {'id': folder_id, 'name': f"folder{level}_{i}", 'parent': parent, 'is_folder': True}, None
+        folders = next_level
+    for i in range(n_files):
+        name = '_'.join(rng.choices(words, cum_weights=cumulative, k=3))
+        record = {
+            'id': f"f{i}",
+            'name': f"{name}_{i}.{extensions[i % len(extensions)]}",
+            'parent': rng.choice(folders),
+            'is_folder': False,
+            'size': rng.randint(1024, 50 * 1024 * 1024),
+            'modified': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'checksum': f"{i:032x}",
+        }
+        text = ' '.join(rng.choices(words, cum_weights=cumulative, k=60)) if rng.random() < text_share else None
+        yield record, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=500_000)
+    parser.add_argument('--queries', type=int, default=2000, help='queries per query shape')
+    parser.add_argument('--text-share', type=float, default=0.1,
+                        help='share of documents with extracted text (summarized before)')
+    parser.add_argument('--updates', type=int, default=10_000)
+    options = parser.parse_args()
+
+    rng = random.Random(0)
+    index = SearchIndex()
+    texts = []
+    print(f"🏗️  Generating {options.files} files ({options.text_share:.0%} with text)...")
+    records = []
+    for record, text in build_corpus(options.files, options.text_share, rng):
+        records.append(record)
+        if text:
+            texts.append((record['id'], text))
+    start = time.perf_counter()
+    index.build(records)
+    for file_id, text in texts:
+        index.add_text(file_id, text)
+    build_time = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"✅ Built in {build_time:.1f}s: {len(index)} documents, {len(index.postings)} terms, "
+          f"peak RSS {peak_mb:.0f}MB including the generated corpus")
+
+    def word():
+        # Skew towards the common words, which have the longest posting lists
+        return f"w{int(rng.paretovariate(1.0)) % VOCABULARY_SIZE}"
+
+    shapes = {
+        'one term': lambda: [word()],
+        'two terms': lambda: [word(), word()],
+        'term + type': lambda: [word(), 'type:pdf'],
+        'term in /folder': lambda: [word(), 'in', f"/folder0_{rng.randrange(10)}"],
+        'term + modified': lambda: [word(), 'modified:>2024-06-01'],
+        'type only': lambda: ['type:excel', 'modified:2024-03'],
+    }
+    folder_ids = {f"/folder0_{i}": f"root.{i}" for i in range(10)}
+    print(f"{'query':>16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'avg hits':>9}")
+    worst_p99 = 0.0
+    for shape, make in shapes.items():
+        timings = []
+        hits = 0
+        for _ in range(options.queries):
+            args = make()
+            started = time.perf_counter()
+            terms, folder, types, modified = parse_query(args)
+            results = index.search(terms, folder_id=folder_ids.get(folder), types=types, modified=modified)
+            timings.append(time.perf_counter() - started)
+            hits += len(results)
+        timings.sort()
+        p99 = percentile(timings, 99) * 1000
+        worst_p99 = max(worst_p99, p99)
+        print(f"{shape:>16} {percentile(timings, 50) * 1000:>8.3f} {percentile(timings, 95) * 1000:>8.3f} "
+              f"{p99:>8.3f} {timings[-1] * 1000:>8.3f} {hits / options.queries:>9.1f}")
+
+    start = time.perf_counter()
+    for i in range(options.updates):
+        record = dict(records[rng.randrange(1111, len(records))])
+        if i % 2:
+            record['name'] = f"renamed_{i}_{record['name']}"
+            index.apply_changes([{'file_id': record['id'], 'removed': False, 'file': record}])
+        else:
+            index.apply_changes([{'file_id': record['id'], 'removed': True, 'file': None}])
+    update_time = time.perf_counter() - start
+    print(f"🔄 {options.updates} incremental updates: {update_time / options.updates * 1e6:.1f}µs each")
+    print(f"{'✅' if worst_p99 < 10 else '⚠️ '} Worst p99 {worst_p99:.2f}ms (target < 10ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
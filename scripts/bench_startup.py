@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Cold Start Benchmark
+Starts fresh interpreters and measures how long `import run_test` takes,
+which optional or mode-specific modules that import pulls in (it should
+pull in none), and the time from process start to the first reply in
+terminal mode and in server mode (`run_test.py --mode ...`). Medians of
+--runs runs are written as JSON; --compare fails on a regression so CI can
+track cold start.
+
+Usage: python bench_startup.py [--runs 7] [--output startup.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Modules only some modes need; importing run_test must not load them
+LAZY_MODULES = ('flask', 'tkinter', 'asyncio', 'zipfile', 'xml.parsers.expat', 'async_server', 'outbound')
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import run_test
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+"""
+
+COMPARED = (
+    ('import_ms', 'import'),
+    ('terminal_first_reply_ms', 'terminal reply'),
+    ('server_listening_ms', 'server listen'),
+    ('server_first_reply_ms', 'server reply'),
+)
+
+
+def child_env(directory):
+    env = dict(os.environ, PYTHONUNBUFFERED='1', HOST='127.0.0.1', PORT='0',
+               JOBS_DB_PATH=os.path.join(directory, 'jobs.sqlite3'))
+    for name in ('RUN_MODE', 'SUMMARY_CACHE_PATH', 'DRIVE_SNAPSHOT_PATH', 'TWILIO_ACCOUNT_SID',
+                 'WEBHOOK_LOG_PATH', 'AUDIT_LOG_DIR'):
+        env.pop(name, None)
+    return env
+
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout.splitlines()
+    loaded = output[1].split(',') if len(output) > 1 and output[1] else []
+    return float(output[0]), loaded
+
+
+def wait_for_line(process, prefix, timeout=30):
+    deadline = time.monotonic() + timeout
+    for line in process.stdout:
+        if line.lstrip().startswith(prefix):
+            return line
+        if time.monotonic() > deadline:
+            break
+    raise RuntimeError(f"{prefix!r} not seen (exit code {process.poll()})")
+
+
+def measure_terminal(env):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'run_test.py', '--mode', 'terminal'], cwd=HERE, env=env,
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+    try:
+        wait_for_line(process, '📤 Response')
+        return (time.perf_counter() - start) * 1000
+    finally:
+        process.kill()
+        process.wait()
+
+
+def measure_server(env):
+    """(ms until listening, ms until the first /process reply)"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'run_test.py', '--mode', 'server'], cwd=HERE, env=env,
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+    try:
+        line = wait_for_line(process, '🚀 Webhook server listening')
+        listening = (time.perf_counter() - start) * 1000
+        url = line.split('listening on ', 1)[1].strip().replace('/webhook', '/process')
+        request = urllib.request.Request(url, data=json.dumps({'message': 'HELP'}).encode(),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=30) as response:
+            json.load(response)
+        return listening, (time.perf_counter() - start) * 1000
+    finally:
+        process.kill()
+        process.wait()
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline; returns the regressed metric names"""
+    regressions = []
+    print(f"{'metric':>15} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for key, label in COMPARED:
+        before, after = baseline['results'].get(key), results['results'].get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        flag = '❌' if change > tolerance else '✅'
+        if change > tolerance:
+            regressions.append(label)
+        print(f"{label:>15} {before:>10.1f} {after:>10.1f} {change:>+7.1%} {flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON to check against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown for --compare')
+    options = parser.parse_args()
+
+    samples = {key: [] for key, _label in COMPARED}
+    loaded = set()
+    with tempfile.TemporaryDirectory() as directory:
+        env = child_env(directory)
+        for _ in range(options.runs):
+            import_ms, modules = measure_import(env)
+            samples['import_ms'].append(import_ms)
+            loaded.update(modules)
+            samples['terminal_first_reply_ms'].append(measure_terminal(env))
+            listening, reply = measure_server(env)
+            samples['server_listening_ms'].append(listening)
+            samples['server_first_reply_ms'].append(reply)
+
+    results = {
+        'workload': {'runs': options.runs},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'results': {key: round(statistics.median(values), 1) for key, values in samples.items()},
+    }
+    results['results']['eager_imports'] = sorted(loaded)
+    for key, label in COMPARED:
+        print(f"📊 {label:>15}: {results['results'][key]:>7.1f}ms (median of {options.runs})", file=sys.stderr)
+    print(f"{'❌' if loaded else '✅'} import run_test loads "
+          f"{', '.join(sorted(loaded)) if loaded else 'none of ' + ', '.join(LAZY_MODULES)}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    failed = bool(loaded)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        if regressions:
+            print(f"❌ Slower beyond {options.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
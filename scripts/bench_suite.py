@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Benchmark Suite
+Runs a reproducible workload through WhatsAppDriveAssistant against stand-in
+Drive and summarizer backends with configurable latency, and reports
+throughput, tail latency and peak memory as JSON. The workload is either
+synthetic (seeded command mix, skewed folder sizes, N senders) or a replay
+of a webhook log recorded by the server (WEBHOOK_LOG_PATH). --compare
+checks the results against an earlier run and fails on a regression.
+
+Usage: python bench_suite.py [--messages 5000] [--senders 200] [--replay webhooks.jsonl]
+                             [--output results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import random
+import argparse
+import platform
+import itertools
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from commands import parse
+from drive_backend import InMemoryDriveBackend, LatencyDriveBackend
+from load_test import percentile
+from metrics import Metrics
+from rate_limit import AdmissionController
+from run_test import WhatsAppDriveAssistant
+from summary_pipeline import ExtractiveSummarizer
+
+SUITE_VERSION = 1
+
+# Relative weight of each command in synthetic traffic; DELETE is followed by CONFIRM
+DEFAULT_MIX = {'LIST': 35, 'MORE': 8, 'SEARCH': 15, 'SUMMARY': 8, 'DELETE': 8, 'MOVE': 8,
+               'HELP': 8, 'STATUS': 3, 'UNKNOWN': 7}
+
+WORDS = ('budget', 'report', 'roadmap', 'invoice', 'contract', 'minutes', 'forecast', 'design',
+         'review', 'plan', 'survey', 'launch', 'hiring', 'audit', 'pricing', 'security',
+         'quarterly', 'summary', 'proposal', 'metrics')
+EXTENSIONS = ('pdf', 'docx', 'txt', 'xlsx', 'pptx', 'csv', 'md', 'png')
+HOME_FILES = 20
+
+# (result key, label, higher is better, gates --compare). Peak RSS is the
+# whole process's high-water mark, so it only informs; the tracemalloc heap
+# peak is what gates memory.
+COMPARED = (('throughput_per_s', 'throughput', True, True), ('latency_ms.p50', 'p50 ms', False, True),
+            ('latency_ms.p95', 'p95 ms', False, True), ('latency_ms.p99', 'p99 ms', False, True),
+            ('peak_heap_mb', 'heap peak MB', False, True), ('peak_rss_mb', 'peak RSS MB', False, False))
+
+
+def parse_mix(spec):
+    """'LIST=50,SEARCH=20' over the default mix"""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = item.partition('=')
+        mix[name.strip().upper()] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def build_drive(folders, max_folder_size, senders, rng):
+    """Shared team folders with Pareto-distributed sizes, plus a home folder per sender
+    for the commands that change Drive. Returns (backend, folder paths by popularity)"""
+    backend = InMemoryDriveBackend()
+    paths = []
+    for i in range(folders):
+        folder = f"/Team{i % 20}/Project{i}"
+        paths.append(folder)
+        backend.add_folder(folder)
+        size = min(max_folder_size, int(rng.paretovariate(1.1) * 4))
+        for j in range(size):
+            extension = EXTENSIONS[j % len(EXTENSIONS)]
+            name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{j}.{extension}"
+            content = ' '.join(rng.choices(WORDS, k=40)).capitalize() + '. More text follows.'
+            backend.add_file(f"{folder}/{name}", size=rng.randint(1024, 20 * 1024 * 1024),
+                             modified=f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                             content=content if extension != 'png' else None)
+    for sender in range(senders):
+        for j in range(HOME_FILES):
+            backend.add_file(f"/Users/u{sender}/draft-{j}.txt", size=2048,
+                             content=f"Draft {j} of user {sender}. Notes.")
+        backend.add_folder(f"/Users/u{sender}/Archive")
+    return backend, paths
+
+
+def synthetic_traffic(folders, options, rng):
+    """Seeded (sender, message) sequence. Reads go to popular folders (Zipf);
+    DELETE and MOVE only touch the sender's own files, so every sender's
+    messages mean the same thing whatever order senders interleave in"""
+    mix = parse_mix(options.mix)
+    commands = list(mix)
+    cum_weights = list(itertools.accumulate(mix[name] for name in commands))
+    folder_weights = list(itertools.accumulate(1.0 / rank ** 0.9 for rank in range(1, len(folders) + 1)))
+    sender_weights = list(itertools.accumulate(1.0 / rank ** 0.5 for rank in range(1, options.senders + 1)))
+    homes = [[f"/Users/u{sender}/draft-{j}.txt" for j in range(HOME_FILES)] for sender in range(options.senders)]
+    traffic = []
+    while len(traffic) < options.messages:
+        sender = rng.choices(range(options.senders), cum_weights=sender_weights)[0]
+        command = rng.choices(commands, cum_weights=cum_weights)[0]
+        name = f"whatsapp:+1555{sender:07d}"
+        folder = rng.choices(folders, cum_weights=folder_weights)[0]
+        if command in ('DELETE', 'MOVE') and not homes[sender]:
+            command = 'LIST'
+        if command == 'LIST':
+            traffic.append((name, f"LIST {folder}"))
+        elif command == 'SEARCH':
+            query = ' '.join(rng.sample(WORDS, rng.choice((1, 1, 2))))
+            if rng.random() < 0.2:
+                query += f" type:{rng.choice(EXTENSIONS[:3])}"
+            traffic.append((name, f"SEARCH {query}"))
+        elif command == 'SUMMARY':
+            traffic.append((name, f"SUMMARY {folder}"))
+        elif command == 'DELETE':
+            path = homes[sender].pop(rng.randrange(len(homes[sender])))
+            traffic.append((name, f"DELETE {path}"))
+            traffic.append((name, 'CONFIRM'))
+        elif command == 'MOVE':
+            path = homes[sender].pop(rng.randrange(len(homes[sender])))
+            traffic.append((name, f"MOVE {path} /Users/u{sender}/Archive"))
+        elif command == 'UNKNOWN':
+            traffic.append((name, rng.choice(('hi', 'thanks!', 'LIST', 'SHOW /Team1'))))
+        else:
+            traffic.append((name, command))
+    traffic = traffic[:options.messages]
+    # Open loop: Poisson arrivals at options.rate messages/s
+    at = 0.0
+    timed = []
+    for sender, body in traffic:
+        timed.append((at, sender, body, None))
+        if options.rate:
+            at += rng.expovariate(options.rate)
+    return timed
+
+
+def load_webhook_log(path, limit=None):
+    """Webhook log lines ({"time", "From", "Body", "MessageSid"}) as
+    (offset seconds, sender, body, message_sid) tuples"""
+    traffic = []
+    start = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            at = float(record.get('time', 0))
+            start = at if start is None else start
+            traffic.append((at - start, record['From'], record.get('Body', ''), record.get('MessageSid') or None))
+            if limit and len(traffic) >= limit:
+                break
+    return traffic
+
+
+def write_webhook_log(path, traffic):
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, (at, sender, body, message_sid) in enumerate(traffic):
+            f.write(json.dumps({'time': at, 'From': sender, 'Body': body,
+                                'MessageSid': message_sid or f"SMbench{index:08d}"}) + '\n')
+
+
+def run(assistant, traffic, concurrency, speed):
+    """Play traffic on concurrency worker threads, each sender pinned to one
+    worker so its messages keep their order. With speed, messages are sent at
+    their recorded offsets (divided by speed) and latency counts from then,
+    queueing included; without it each worker sends as fast as it can.
+    Returns ([(message, seconds)], exceptions, elapsed)"""
+    inboxes = [queue.Queue() for _ in range(concurrency)]
+    for message in traffic:
+        inboxes[zlib.crc32(message[1].encode()) % concurrency].put(message)
+    samples = []
+    failures = []
+    lock = threading.Lock()
+    start = time.perf_counter() + 0.05
+
+    def work(inbox):
+        local = []
+        while True:
+            try:
+                message = inbox.get_nowait()
+            except queue.Empty:
+                break
+            at, sender, body, message_sid = message
+            if speed:
+                due = start + at / speed
+                pause = due - time.perf_counter()
+                if pause > 0:
+                    time.sleep(pause)
+            else:
+                due = time.perf_counter()
+            try:
+                assistant.process_message(body, sender, message_id=message_sid)
+            except Exception as e:
+                with lock:
+                    failures.append(f"{body!r}: {e}")
+            local.append((body, time.perf_counter() - due))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=work, args=(inbox,), daemon=True) for inbox in inboxes]
+    while time.perf_counter() < start:
+        time.sleep(0.001)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, failures, time.perf_counter() - start
+
+
+def latency_summary(latencies):
+    return {
+        'p50': round(percentile(latencies, 50) * 1000, 3),
+        'p95': round(percentile(latencies, 95) * 1000, 3),
+        'p99': round(percentile(latencies, 99) * 1000, 3),
+        'max': round(max(latencies, default=0) * 1000, 3),
+        'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def lookup(results, dotted):
+    value = results
+    for key in dotted.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline; returns the regressed metric names"""
+    regressions = []
+    differing = sorted(key for key in set(results['workload']) | set(baseline.get('workload', {}))
+                       if results['workload'].get(key) != baseline.get('workload', {}).get(key))
+    if differing:
+        print(f"⚠️  Workloads differ in {', '.join(differing)}; the comparison may not be meaningful",
+              file=sys.stderr)
+    print(f"{'metric':>14} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for key, label, higher_is_better, gates in COMPARED:
+        before, after = lookup(baseline['results'], key), lookup(results['results'], key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = ('❌' if gates else '⚠️ ') if worse > tolerance else '✅'
+        if worse > tolerance and gates:
+            regressions.append(label)
+        print(f"{label:>14} {before:>10.2f} {after:>10.2f} {change:>+7.1%} {flag}", file=sys.stderr)
+    return regressions
+
+
+def prepare(options):
+    """Build the Drive stand-in and the traffic; returns (drive, folders, traffic, source)"""
+    rng = random.Random(options.seed)
+    if options.replay and options.fixture:
+        drive, folders = InMemoryDriveBackend.load_fixture(options.fixture), []
+    else:
+        drive, folders = build_drive(options.folders, options.max_folder_size, options.senders, rng)
+    if options.replay:
+        return drive, folders, load_webhook_log(options.replay, options.messages), 'replay'
+    return drive, folders, synthetic_traffic(folders, options, rng), 'synthetic'
+
+
+def measure(options, drive, traffic):
+    """One run on a fresh assistant; returns the results section"""
+    backend = LatencyDriveBackend(drive, latency=options.drive_latency)
+    assistant = WhatsAppDriveAssistant(
+        backend=backend, summarizer=ExtractiveSummarizer(latency=options.summarizer_latency),
+        # Per-sender rate limits would measure the limiter, not the pipeline
+        admission=AdmissionController(limits={}), metrics=Metrics(sample_rate=0.0))
+    if options.tracemalloc:
+        tracemalloc.start()
+    samples, failures, elapsed = run(assistant, traffic, options.concurrency,
+                                     options.speed if options.replay else (1.0 if options.rate else 0))
+    heap_peak = tracemalloc.get_traced_memory()[1] if options.tracemalloc else None
+    tracemalloc.stop()
+    if assistant.sync is not None:
+        assistant.sync.stop()
+    for failure in failures[:5]:
+        print(f"⚠️  {failure}", file=sys.stderr)
+
+    by_command = {}
+    for body, seconds in samples:
+        by_command.setdefault(assistant.command_label(parse(body)[0]), []).append(seconds)
+    outcomes = {}
+    for (name, labels), count in assistant.metrics.counters.items():
+        if name == 'messages_total':
+            labels = dict(labels)
+            outcomes.setdefault(labels['command'], {})[labels['outcome']] = count
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': latency_summary([seconds for _body, seconds in samples]),
+        'exceptions': len(failures),
+        'errors': sum(counts.get('error', 0) + counts.get('exception', 0) for counts in outcomes.values()),
+        'drive_calls': backend.calls,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_heap_mb': round(heap_peak / 1024 / 1024, 1) if heap_peak is not None else None,
+        'commands': {
+            command: {'count': len(values), 'latency_ms': latency_summary(values),
+                      'outcomes': outcomes.get(command, {})}
+            for command, values in sorted(by_command.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000, help='synthetic messages (or replay limit)')
+    parser.add_argument('--senders', type=int, default=200, help='synthetic senders')
+    parser.add_argument('--folders', type=int, default=500, help='synthetic team folders')
+    parser.add_argument('--max-folder-size', type=int, default=2000, help='cap on files per folder')
+    parser.add_argument('--mix', default='', help="command weights over the default, e.g. 'LIST=50,SUMMARY=0'")
+    parser.add_argument('--rate', type=float, default=0, help='synthetic open-loop arrival rate (msg/s); 0 = closed loop')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', help='webhook log (JSON lines) to replay instead of synthetic traffic')
+    parser.add_argument('--fixture', help='Drive fixture for --replay (default: the synthetic Drive)')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='replay at recorded timing sped up by this factor; 0 = as fast as possible')
+    parser.add_argument('--record', help='write the synthetic traffic as a webhook log')
+    parser.add_argument('--concurrency', type=int, default=8, help='worker threads sending messages')
+    parser.add_argument('--drive-latency', type=float, default=0.0, help='seconds per Drive call')
+    parser.add_argument('--summarizer-latency', type=float, default=0.0, help='seconds per model call')
+    parser.add_argument('--repeat', type=int, default=3, help='runs; the one with the median throughput is reported')
+    parser.add_argument('--tracemalloc', action='store_true', help='also report the Python heap peak (slower)')
+    parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+    parser.add_argument('--compare', help='earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed regression for --compare')
+    options = parser.parse_args()
+
+    runs = []
+    for index in range(max(1, options.repeat)):
+        # Every run starts from the same Drive: the traffic deletes and moves files
+        start = time.perf_counter()
+        drive, folders, traffic, source = prepare(options)
+        if index == 0:
+            if options.record:
+                write_webhook_log(options.record, traffic)
+                print(f"💾 Recorded {len(traffic)} messages to {options.record}", file=sys.stderr)
+            print(f"🏗️  {drive.file_count()} files, {len(traffic)} {source} messages "
+                  f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        runs.append(measure(options, drive, traffic))
+        print(f"⏱️  Run {index + 1}: {runs[-1]['throughput_per_s']} msg/s, "
+              f"p99 {runs[-1]['latency_ms']['p99']}ms", file=sys.stderr)
+    median = sorted(runs, key=lambda run: run['throughput_per_s'])[len(runs) // 2]
+    median['runs'] = [{'throughput_per_s': run['throughput_per_s'], 'p99_ms': run['latency_ms']['p99']}
+                      for run in runs]
+
+    results = {
+        'suite': 'bench_suite',
+        'version': SUITE_VERSION,
+        'workload': {
+            'source': source,
+            'replay': options.replay,
+            'seed': options.seed,
+            'messages': len(traffic),
+            'senders': len({message[1] for message in traffic}),
+            'folders': len(folders),
+            'files': drive.file_count(),
+            'mix': parse_mix(options.mix) if source == 'synthetic' else None,
+            'concurrency': options.concurrency,
+            'rate': options.rate or None,
+            'speed': options.speed or None,
+            'drive_latency': options.drive_latency,
+            'summarizer_latency': options.summarizer_latency,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': median,
+    }
+
+    text = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"📊 {median['throughput_per_s']} msg/s, p99 {median['latency_ms']['p99']}ms "
+              f"-> {options.output}", file=sys.stderr)
+    else:
+        print(text)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        if regressions:
+            print(f"❌ Regressed beyond {options.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Snapshot Sync Benchmark
+Crawls a synthetic tree into an on-disk snapshot, applies a burst of Drive
+changes incrementally through the change feed, then reopens the snapshot as
+a restart would and times the first LIST. Drive calls are counted so the
+crawl and the incremental sync can be compared at real API latency.
+
+Usage: python bench_sync.py [--files 100000] [--changes 1000] [--snapshot drive_snapshot.db]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from drive_backend import InMemoryDriveBackend, LatencyDriveBackend, generate_fixture, parent_path
+from sync import DriveSnapshot, DriveSync, SyncedDriveBackend
+
+
+def mutate(backend, n_changes, rng):
+    """Apply a mix of edits, uploads, moves and deletes to random files"""
+    files = [node for node in backend.nodes.values() if not node.is_folder]
+    rng.shuffle(files)
+    for i, node in enumerate(files[:n_changes]):
+        path = backend.path_of(node)
+        kind = i % 4
+        if kind == 0:
+            backend.update_file(path, f"Edited content {i}.")
+        elif kind == 1:
+            backend.add_file(f"{parent_path(path)}/upload{i}.txt", size=1024, modified='2024-06-01')
+        elif kind == 2:
+            backend.move(path, f"{parent_path(path)}/renamed{i}_{node.name}")
+        else:
+            backend.delete(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=100_000)
+    parser.add_argument('--changes', type=int, default=1000)
+    parser.add_argument('--snapshot', help='snapshot file (default: a temporary file)')
+    parser.add_argument('--drive-latency', type=float, default=0.05, help='seconds per Drive call (for the estimate)')
+    options = parser.parse_args()
+
+    directory = None
+    if options.snapshot is None:
+        directory = tempfile.TemporaryDirectory()
+        options.snapshot = os.path.join(directory.name, 'drive_snapshot.db')
+
+    print(f"🏗️  Building tree with {options.files} files...")
+    backend = InMemoryDriveBackend.from_fixture(generate_fixture(options.files))
+    source = LatencyDriveBackend(backend, latency=0)
+
+    snapshot = DriveSnapshot(options.snapshot)
+    sync = DriveSync(source, snapshot)
+    start = time.perf_counter()
+    nodes = sync.full_sync()
+    crawl_time = time.perf_counter() - start
+    crawl_calls = source.calls
+    print(f"🕷️  Full crawl: {nodes} nodes in {crawl_time:.2f}s, {crawl_calls} Drive calls "
+          f"(~{crawl_calls * options.drive_latency:.0f}s at {options.drive_latency * 1000:.0f}ms/call)")
+
+    mutate(backend, options.changes, random.Random(0))
+    source.calls = 0
+    start = time.perf_counter()
+    applied = sync.sync_once()
+    sync_time = time.perf_counter() - start
+    print(f"🔄 Incremental sync: {applied} changes in {sync_time * 1000:.1f}ms, {source.calls} Drive calls "
+          f"(~{source.calls * options.drive_latency:.2f}s)")
+    if sorted(n.name for n in snapshot.list_folder('/folder0_0/folder1_0/folder2_0')) != \
+            sorted(n.name for n in backend.list_folder('/folder0_0/folder1_0/folder2_0')):
+        print("❌ Snapshot diverged from the source after the incremental sync")
+        return 1
+    snapshot.close()
+
+    print(f"💾 Snapshot size: {os.path.getsize(options.snapshot) / 1024 / 1024:.1f}MB")
+    start = time.perf_counter()
+    snapshot = DriveSnapshot(options.snapshot)
+    sync = DriveSync(source, snapshot)
+    source.calls = 0
+    sync.sync_once()
+    listing = SyncedDriveBackend(sync).list_folder('/folder0_3/folder1_7')
+    restart_time = time.perf_counter() - start
+    print(f"🚀 Warm restart: reopen + resume + first LIST ({len(listing)} entries) in "
+          f"{restart_time * 1000:.1f}ms, {source.calls} Drive calls")
+    snapshot.close()
+
+    if directory is not None:
+        directory.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Multi-Worker Benchmark
+Starts `run_test.py --mode server --workers N` for each N in --workers
+(fresh SQLite shared state and demo Drive each time) and drives it
+closed-loop from --clients load processes over keep-alive connections with
+a HELP / LIST / SEARCH / DELETE mix, reporting throughput, latency p50/p99
+and speedup over one worker. Speedup can only be judged up to the CPUs left
+for the server; past that the runs show overhead, not scaling. On the
+largest N it then checks the shared state across workers: a DELETE
+confirmed on another worker and gone from the first worker's LIST, a MOVE's
+cache invalidation reaching another worker (and how long it took) and that
+worker's LIST showing the file in its new folder, and a redelivered
+MessageSid answered from the first worker's result.
+
+Usage: python bench_workers.py [--workers 1,2,4,8] [--duration 10] [--connections 64] [--clients 2]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from load_test import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMANDS = (
+    (0.3, 'HELP'),
+    (0.3, 'LIST /ProjectX'),
+    (0.3, 'SEARCH report'),
+    (0.1, 'DELETE /ProjectX/report.pdf'),
+)
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection to the server"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        length = next(int(line.split(':', 1)[1]) for line in lines if line.lower().startswith('content-length'))
+        data = await self.reader.readexactly(length)
+        return int(lines[0].split(' ', 2)[1]), data
+
+    async def process(self, message, sender, message_sid=None):
+        payload = {'message': message, 'sender': sender}
+        if message_sid:
+            payload['message_sid'] = message_sid
+        _status, data = await self.request('POST', '/process', payload)
+        return json.loads(data)['response']
+
+    async def health(self):
+        _status, data = await self.request('GET', '/health')
+        return json.loads(data)
+
+    async def metric(self, name):
+        _status, data = await self.request('GET', '/metrics')
+        for line in data.decode().splitlines():
+            if line.startswith(name + ' '):
+                return float(line.split()[1])
+        return 0.0
+
+    def close(self):
+        self.writer.close()
+
+
+def load_process(port, connections, warmup, duration, seed):
+    """Closed-loop load from one process; returns (replies, latency sample)"""
+
+    async def run():
+        rng = random.Random(seed)
+        weights = [weight for weight, _command in COMMANDS]
+        commands = [command for _weight, command in COMMANDS]
+        counted = [0]
+        latencies = []
+        measuring = asyncio.Event()
+        deadline = time.perf_counter() + warmup + duration
+
+        async def client(index):
+            connection = await Connection.open(port)
+            sender = f"bench-{seed}-{index}"
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    await connection.process(rng.choices(commands, weights)[0], sender)
+                    if measuring.is_set():
+                        counted[0] += 1
+                        if len(latencies) < 20000:
+                            latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        tasks = [asyncio.create_task(client(index)) for index in range(connections)]
+        await asyncio.sleep(warmup)
+        measuring.set()
+        await asyncio.gather(*tasks)
+        return counted[0], latencies
+
+    return asyncio.run(run())
+
+
+class Server:
+    """run_test.py --mode server --workers N in a subprocess"""
+
+    def __init__(self, workers, directory, rate_limits):
+        env = dict(os.environ, PYTHONUNBUFFERED='1', HOST='127.0.0.1', PORT='0',
+                   JOBS_DB_PATH=os.path.join(directory, f'jobs-{workers}.sqlite3'),
+                   SHARED_STATE=f"sqlite:///{os.path.join(directory, f'state-{workers}.sqlite3')}",
+                   DRIVE_DEMO_PATH=os.path.join(directory, f'drive-{workers}.sqlite3'),
+                   RATE_LIMITS=rate_limits)
+        for name in ('RUN_MODE', 'WORKERS', 'WORKER_ID', 'SUMMARY_CACHE_PATH', 'DRIVE_SNAPSHOT_PATH',
+                     'TWILIO_ACCOUNT_SID', 'WEBHOOK_LOG_PATH', 'AUDIT_LOG_DIR'):
+            env.pop(name, None)
+        self.workers = workers
+        self.process = subprocess.Popen([sys.executable, 'run_test.py', '--mode', 'server', '--workers',
+                                         str(workers)], cwd=HERE, env=env, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, text=True)
+        self.port = None
+        for line in self.process.stdout:
+            if 'listening on' in line:
+                self.port = int(line.rsplit(':', 1)[1].split('/', 1)[0])
+                break
+        if self.port is None:
+            raise RuntimeError(f"server did not start (exit code {self.process.poll()})")
+        # Keep reading so a chatty worker never blocks on a full pipe
+        threading.Thread(target=self.process.stdout.read, daemon=True).start()
+
+    async def pinned(self, count, timeout=30):
+        """count connections that landed on count different ready workers: {worker: connection}"""
+        connections = {}
+        deadline = time.monotonic() + timeout
+        while len(connections) < count and time.monotonic() < deadline:
+            connection = await Connection.open(self.port)
+            health = await connection.health()
+            if health['status'] == 'ok' and health['worker'] not in connections:
+                connections[health['worker']] = connection
+            else:
+                connection.close()
+                await asyncio.sleep(0.01)
+        return connections
+
+    async def wait_ready(self):
+        """Number of workers seen ready (all of them unless one is stuck)"""
+        connections = await self.pinned(self.workers)
+        for connection in connections.values():
+            connection.close()
+        return len(connections)
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+async def check_shared_state(server):
+    """Cross-worker checks on a running multi-worker server; returns the failures"""
+    connections = await server.pinned(2)
+    if len(connections) < 2:
+        print("❌ Could not reach two different workers")
+        return 1
+    (first_id, first), (second_id, second) = list(connections.items())[:2]
+    failures = 0
+
+    await first.process('DELETE /ProjectX/presentation.pptx', 'shared-check')
+    reply = await second.process('CONFIRM', 'shared-check')
+    ok = reply.startswith('✅')
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} DELETE on worker {first_id}, CONFIRM on worker {second_id}: {reply.splitlines()[0]}")
+    start = time.perf_counter()
+    while 'presentation.pptx' in await first.process('LIST /ProjectX', 'shared-check') \
+            and time.perf_counter() - start < 5:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    ok = elapsed < 5
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} LIST on worker {first_id} "
+          f"{f'stopped showing the deleted file {elapsed * 1000:.0f}ms later' if ok else 'still shows the deleted file'}")
+
+    await second.process('LIST /Archive', 'shared-check')
+    before = await second.metric('assistant_invalidations_received')
+    start = time.perf_counter()
+    await first.process('MOVE /ProjectX/data.xlsx /Archive', 'shared-check')
+    while await second.metric('assistant_invalidations_received') <= before and time.perf_counter() - start < 5:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    ok = elapsed < 5
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} MOVE on worker {first_id} invalidated worker {second_id}'s caches "
+          f"{elapsed * 1000:.0f}ms later")
+    archive = await second.process('LIST /Archive', 'shared-check')
+    project = await second.process('LIST /ProjectX', 'shared-check')
+    ok = 'data.xlsx' in archive and 'data.xlsx' not in project
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} LIST on worker {second_id} shows the moved file in /Archive only")
+
+    async def duplicates():
+        return (await first.metric('assistant_dedup_duplicates')
+                + await second.metric('assistant_dedup_duplicates'))
+    before = await duplicates()
+    replies = await asyncio.gather(first.process('LIST /ProjectX', 'shared-check', message_sid='SMbench1'),
+                                   second.process('LIST /ProjectX', 'shared-check', message_sid='SMbench1'))
+    ok = replies[0] == replies[1] and await duplicates() == before + 1
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} One MessageSid sent to workers {first_id} and {second_id} ran once")
+    for connection in connections.values():
+        connection.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated worker counts')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--connections', type=int, default=64, help='keep-alive connections in total')
+    parser.add_argument('--clients', type=int, default=2, help='load generator processes')
+    parser.add_argument('--rate-limits', default='cheap=100000/1,standard=100000/1,costly=100000/1',
+                        help='RATE_LIMITS for the server: high, so shared buckets are used but never refuse')
+    parser.add_argument('--efficiency', type=float, default=0.7,
+                        help='required share of linear speedup, over the cores left after the clients')
+    options = parser.parse_args()
+    counts = [int(count) for count in options.workers.split(',')]
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    server_cpus = max(1, cpus - options.clients)
+    print(f"📊 {options.connections} connections from {options.clients} load processes, "
+          f"{options.duration:.0f}s per run, {cpus} CPU(s) ({server_cpus} left for the server)")
+
+    failures = 0
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(options.clients) as pool:
+        for count in counts:
+            server = Server(count, directory, options.rate_limits)
+            try:
+                ready = asyncio.run(server.wait_ready())
+                share = options.connections // options.clients
+                results = list(pool.map(load_process, [server.port] * options.clients, [share] * options.clients,
+                                        [options.warmup] * options.clients, [options.duration] * options.clients,
+                                        range(options.clients)))
+                replies = sum(count for count, _latencies in results)
+                latencies = [latency for _count, sample in results for latency in sample]
+                throughput = replies / options.duration
+                baseline = baseline or throughput
+                speedup = throughput / baseline
+                expected = min(count, server_cpus) / min(counts[0], server_cpus)
+                ok = speedup >= expected * options.efficiency
+                failures += not ok
+                print(f"   {count:>2} worker(s) {throughput:>8.0f} msg/s  p50={percentile(latencies, 50) * 1000:>6.1f}ms "
+                      f"p99={percentile(latencies, 99) * 1000:>7.1f}ms  speedup {speedup:>4.2f}x "
+                      f"(expected ≥{expected * options.efficiency:.2f}x) {'✅' if ok else '❌'}"
+                      f"{'' if ready == count else f'  only {ready} workers answered'}")
+                if count == counts[-1] and count > 1:
+                    failures += asyncio.run(check_shared_state(server))
+            finally:
+                server.stop()
+    if server_cpus < counts[-1]:
+        print(f"ℹ️  Only {server_cpus} CPU(s) for the server: speedup not measured beyond {server_cpus} "
+              f"worker(s); run on {counts[-1] + options.clients}+ CPUs to see whether {counts[-1]} workers scale")
+    print("✅ Workers shared their state and throughput met its target" if not failures
+          else f"❌ {failures} check(s) failed")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
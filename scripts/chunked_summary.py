@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Map-Reduce Summarization
+Summarizes documents too long for one model call: the text is split into
+token-bounded chunks, the chunks are summarized in parallel (map) and the
+chunk summaries are summarized again, level by level, until one call can
+take them all (reduce). Chunk boundaries are chosen by content, so editing
+one page of a long document changes only the chunks around it, and every
+chunk summary is cached by the chunk's hash: re-summarizing the edited
+document only calls the model for the changed chunks and the reduce steps.
+"""
+
+import re
+import zlib
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from extract import CHARS_PER_TOKEN
+from summary_pipeline import Summarizer
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _units(text, max_chars):
+    """Paragraphs, with paragraphs over max_chars split into sentences and
+    sentences over max_chars cut into max_chars pieces"""
+    for paragraph in text.split('\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            for start in range(0, len(sentence), max_chars):
+                yield sentence[start:start + max_chars]
+
+
+def split_chunks(text, max_tokens=2000, min_tokens=None, boundary_every=4):
+    """Split text into chunks of at most max_tokens (estimated).
+
+    A chunk ends after a paragraph whose hash is a multiple of
+    boundary_every once the chunk has min_tokens (default max_tokens / 4),
+    or when the next paragraph would not fit. Because the cut depends on the
+    paragraphs themselves rather than on offsets, an edit moves at most the
+    boundaries next to it and the chunks after it come out the same.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    min_chars = (min_tokens if min_tokens is not None else max_tokens // 4) * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+    for unit in _units(text, max_chars):
+        if current and size + len(unit) > max_chars:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit) + 1
+        if size >= min_chars and zlib.crc32(unit.encode('utf-8')) % boundary_every == 0:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+class ChunkedSummarizer(Summarizer):
+    """Map-reduce wrapper around a summarizer whose input is limited to
+    about chunk_tokens.
+
+    Text that fits is passed straight through. Model calls (map and reduce)
+    run on a pool of map_workers threads shared by every document, which
+    also caps concurrent model calls. With a SummaryCache, each call's
+    result is stored under the SHA-256 of its input and the inner model.
+    """
+
+    def __init__(self, summarizer, cache=None, chunk_tokens=2000, map_workers=8, metrics=None):
+        self.summarizer = summarizer
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens
+        self.metrics = metrics
+        self.model = f"{summarizer.model}+mapreduce{chunk_tokens}"
+        self.pool = ThreadPoolExecutor(max_workers=map_workers, thread_name_prefix='summary-map')
+        self.calls = 0
+        self.chunk_hits = 0
+
+    def _summarize_part(self, text):
+        key = None
+        if self.cache is not None:
+            key = f"chunk:sha256:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+            summary = self.cache.get(key, self.summarizer.model)
+            if summary is not None:
+                self.chunk_hits += 1
+                return summary
+        self.calls += 1
+        summary = self.summarizer.summarize(text)
+        if key is not None:
+            self.cache.put(key, self.summarizer.model, summary)
+        return summary
+
+    def _map(self, parts):
+        if self.metrics is None:
+            return list(self.pool.map(self._summarize_part, parts))
+        trace = self.metrics.current()
+
+        def call(part):
+            # Attached even when unsampled and detached after, so a pool
+            # thread never carries another message's trace
+            self.metrics.attach(trace)
+            try:
+                return self._summarize_part(part)
+            finally:
+                self.metrics.attach(None)
+        return list(self.pool.map(call, parts))
+
+    def _group(self, summaries):
+        """Consecutive summaries joined into inputs of at most chunk_tokens,
+        at least two per input so every reduce level shrinks"""
+        max_chars = self.chunk_tokens * CHARS_PER_TOKEN
+        groups = []
+        current = []
+        size = 0
+        for summary in summaries:
+            if len(current) >= 2 and size + len(summary) > max_chars:
+                groups.append('\n'.join(current))
+                current, size = [], 0
+            current.append(summary)
+            size += len(summary) + 1
+        if current:
+            if len(current) == 1 and groups:
+                groups[-1] += '\n' + current[0]
+            else:
+                groups.append('\n'.join(current))
+        return groups
+
+    def summarize(self, text):
+        chunks = split_chunks(text, self.chunk_tokens)
+        if len(chunks) <= 1:
+            return self._summarize_part(chunks[0] if chunks else text)
+        summaries = self._map(chunks)
+        while estimate_tokens('\n'.join(summaries)) > self.chunk_tokens and len(summaries) > 2:
+            summaries = self._map(self._group(summaries))
+        return self._summarize_part('\n'.join(summaries))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Command Parsing and Dispatch
+Single-pass tokenizer for WhatsApp messages and a verb -> handler registry.
+"""
+
+import re
+
+# One pass over the message: "double", 'single' or “smart” quoted strings,
+# otherwise runs of non-whitespace. Phones often autocorrect to smart quotes.
+_TOKEN_RE = re.compile(r'"([^"]*)"|\'([^\']*)\'|“([^”]*)”|(\S+)')
+_QUOTE_RE = re.compile('["\'“]')
+
+
+def tokenize(message_body):
+    """Split a message into tokens, keeping case and quoted paths with spaces"""
+    if not _QUOTE_RE.search(message_body):
+        # Fast path: the common unquoted message
+        return message_body.split()
+    return [match.group(match.lastindex) for match in _TOKEN_RE.finditer(message_body)]
+
+
+def join(tokens):
+    """Inverse of tokenize: quote tokens that contain spaces or quotes"""
+    quoted = []
+    for token in tokens:
+        if token and not _QUOTE_RE.search(token) and not any(char.isspace() for char in token):
+            quoted.append(token)
+        else:
+            quote = "'" if '"' in token else '"'
+            quoted.append(f"{quote}{token}{quote}")
+    return ' '.join(quoted)
+
+
+def parse(message_body):
+    """Return (COMMAND, args); only the verb is uppercased"""
+    tokens = tokenize(message_body)
+    if not tokens:
+        return 'UNKNOWN', []
+    return tokens[0].upper(), tokens[1:]
+
+
+class CommandRegistry:
+    """Maps command verbs to handlers taking a list of args"""
+
+    def __init__(self, unknown_handler=None):
+        self.handlers = {}
+        self.help_texts = {}
+        self.unknown_handler = unknown_handler
+
+    def register(self, verb, handler=None, help_text=None):
+        """Register handler for verb; usable directly or as a decorator"""
+        verb = verb.upper()
+
+        def decorator(func):
+            self.handlers[verb] = func
+            if help_text:
+                self.help_texts[verb] = help_text
+            return func
+
+        if handler is not None:
+            return decorator(handler)
+        return decorator
+
+    def unregister(self, verb):
+        self.handlers.pop(verb.upper(), None)
+        self.help_texts.pop(verb.upper(), None)
+
+    def __contains__(self, verb):
+        return verb.upper() in self.handlers
+
+    def verbs(self):
+        return list(self.handlers)
+
+    def dispatch(self, command, args):
+        """Run the handler registered for command (or the unknown handler)"""
+        handler = self.handlers.get(command, self.unknown_handler)
+        if handler is None:
+            raise KeyError(command)
+        return handler(args)
@@ -0,0 +1,784 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Drive Backends
+Storage backend interface used by WhatsAppDriveAssistant, plus an in-memory
+stand-in for Google Drive that can be loaded from a JSON fixture.
+"""
+
+import io
+import json
+import base64
+import time
+import fnmatch
+import re
+import hashlib
+import random
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+FILE_TYPES = {
+    'pdf': 'PDF',
+    'pptx': 'PowerPoint',
+    'xlsx': 'Excel',
+    'docx': 'Word',
+    'txt': 'Text',
+    'csv': 'CSV',
+    'md': 'Markdown',
+}
+
+
+class DriveError(Exception):
+    """Base class for errors raised by a Drive backend"""
+
+
+class DriveNotFoundError(DriveError):
+    """Raised when a path does not exist"""
+
+    def __init__(self, path):
+        super().__init__(f"{path} not found")
+        self.path = path
+
+
+class DriveConflictError(DriveError):
+    """Raised when an operation would overwrite or orphan an item"""
+
+
+class DriveTokenError(DriveError):
+    """Raised when a change-feed page token is invalid or has expired"""
+
+
+def _as_bytes(content):
+    return content if isinstance(content, bytes) else content.encode('utf-8')
+
+
+def split_path(path):
+    """Split '/a/b/c' into ['a', 'b', 'c']"""
+    return [part for part in path.split('/') if part]
+
+
+def join_path(parent, name):
+    """Join a folder path and a child name"""
+    return parent.rstrip('/') + '/' + name
+
+
+def parent_path(path):
+    """Return the folder that contains path"""
+    parts = split_path(path)
+    return '/' + '/'.join(parts[:-1])
+
+
+def has_magic(path):
+    """True if path contains glob wildcards"""
+    return any(char in path for char in '*?[')
+
+
+def escape_glob(path):
+    """Quote wildcards so glob() matches path literally (a[1].pdf -> a[[]1].pdf)"""
+    return re.sub(r'([*?[])', r'[\1]', path)
+
+
+def format_size(size):
+    """Format a byte count the way LIST shows it (e.g. 2.3MB)"""
+    if size < 1024:
+        return f"{size}B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f}KB"
+    return f"{size / (1024 * 1024):.1f}MB"
+
+
+class DriveNode:
+    """A file or folder in the Drive tree"""
+
+    __slots__ = ('id', 'name', 'parent', 'is_folder', 'size', 'modified', 'mime_type', 'content',
+                 'checksum')
+
+    def __init__(self, node_id, name, parent, is_folder=False, size=0, modified=None,
+                 mime_type=None, content=None, checksum=None):
+        self.id = node_id
+        self.name = name
+        self.parent = parent
+        self.is_folder = is_folder
+        self.size = size
+        self.modified = modified
+        self.mime_type = mime_type
+        self.content = content
+        # Drive's md5Checksum; None for folders and Google-native documents
+        self.checksum = checksum
+
+    @property
+    def type(self):
+        if self.is_folder:
+            return 'Folder'
+        extension = self.name.rsplit('.', 1)[-1].lower() if '.' in self.name else ''
+        return FILE_TYPES.get(extension, extension.upper() or 'File')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'type': self.type,
+            'size': self.size,
+            'modified': self.modified,
+        }
+
+    def to_record(self):
+        """Metadata as carried by a change-feed entry or a snapshot row"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'parent': self.parent,
+            'is_folder': self.is_folder,
+            'size': self.size,
+            'modified': self.modified,
+            'mime_type': self.mime_type,
+            'checksum': self.checksum,
+        }
+
+    def __repr__(self):
+        return f"DriveNode({self.id!r}, {self.name!r}, folder={self.is_folder})"
+
+
+class DriveBackend:
+    """Interface for the storage that WhatsAppDriveAssistant commands operate on.
+
+    Paths are human paths such as '/ProjectX/report.pdf'. Implementations
+    raise DriveNotFoundError / DriveConflictError (both DriveError) on failure.
+    Drive itself is ID-based, so a path costs one lookup per segment; the
+    *_by_id variants take file IDs (e.g. from a PathIndex) and cost one call.
+    """
+
+    ROOT_ID = 'root'
+
+    def get(self, path):
+        """Return the DriveNode at path"""
+        raise NotImplementedError
+
+    def lookup_child(self, parent_id, name):
+        """Return the ID of parent_id's child called name, or None (one Drive query)"""
+        raise NotImplementedError
+
+    def list_child_names(self, parent_id):
+        """Return the names of parent_id's children"""
+        raise NotImplementedError
+
+    def list_folder(self, path):
+        """Return the direct children of the folder at path"""
+        raise NotImplementedError
+
+    def iter_folder(self, path, page_size=100):
+        """Yield the children of the folder at path, fetching page_size at a time"""
+        return iter(self.list_folder(path))
+
+    def delete(self, path):
+        """Delete the file or folder at path and return its node"""
+        raise NotImplementedError
+
+    def move(self, source, destination):
+        """Move source into the destination folder (or rename it to destination)"""
+        raise NotImplementedError
+
+    def get_by_id(self, node_id):
+        """Return the DriveNode with ID node_id (Drive files.get)"""
+        raise NotImplementedError
+
+    def list_folder_by_id(self, folder_id):
+        """Return the direct children of the folder with ID folder_id"""
+        raise NotImplementedError
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        """Yield the children of the folder with ID folder_id, page_size at a time"""
+        return iter(self.list_folder_by_id(folder_id))
+
+    def delete_by_id(self, node_id):
+        """Delete the file or folder with ID node_id and return its node"""
+        raise NotImplementedError
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        """Move node_id into the folder folder_id, renamed to new_name if given"""
+        raise NotImplementedError
+
+    def read_content(self, path):
+        """Return the text content of the file at path"""
+        raise NotImplementedError
+
+    def read_content_by_id(self, node_id):
+        """Return the text content of the file with ID node_id"""
+        raise NotImplementedError
+
+    def open_content(self, path):
+        """Return a binary file object streaming the raw bytes of the file at path.
+        Backends that can download in ranges should override this; the default
+        holds the whole file in memory."""
+        return io.BytesIO(self.read_content(path).encode('utf-8'))
+
+    def open_content_by_id(self, node_id):
+        """open_content for the file with ID node_id"""
+        return io.BytesIO(self.read_content_by_id(node_id).encode('utf-8'))
+
+    def path_of(self, node):
+        """Return the human path of a node"""
+        raise NotImplementedError
+
+    def get_start_page_token(self):
+        """Return the change-feed token for 'now' (Drive changes.getStartPageToken)"""
+        raise NotImplementedError
+
+    def list_changes(self, page_token, page_size=1000):
+        """Return (changes, next_token) since page_token (Drive changes.list).
+
+        Each change is {'token', 'file_id', 'removed', 'file'} where file is
+        the node's record (see DriveNode.to_record) or None when removed.
+        Raises DriveTokenError if the token is too old to be served (any
+        other DriveError is a transient failure worth retrying).
+        """
+        raise NotImplementedError
+
+    # Drive accepts up to 100 calls in one batch request
+    BATCH_SIZE = 100
+
+    def glob(self, pattern, limit=None):
+        """Return paths matching pattern, where * ? [..] match within one segment,
+        '**' matches any number of folders and a trailing '**' everything below.
+        Stops after limit matches."""
+        results = []
+        seen = set()
+
+        def walk(path, node, parts):
+            if limit is not None and len(results) >= limit:
+                return
+            if not parts:
+                if path not in seen:
+                    seen.add(path)
+                    results.append(path)
+                return
+            head, rest = parts[0], parts[1:]
+            if not node.is_folder:
+                return
+            if head == '**':
+                if rest:
+                    walk(path, node, rest)
+                for child in self.iter_folder(path):
+                    child_path = join_path(path, child.name)
+                    if not rest:
+                        walk(child_path, child, [])
+                    walk(child_path, child, parts)
+            elif not has_magic(head):
+                try:
+                    child = self.get(join_path(path, head))
+                except DriveNotFoundError:
+                    return
+                walk(join_path(path, head), child, rest)
+            else:
+                for child in self.iter_folder(path):
+                    if fnmatch.fnmatchcase(child.name, head):
+                        walk(join_path(path, child.name), child, rest)
+
+        walk('/', self.get('/'), split_path(pattern))
+        return results
+
+    def delete_many(self, paths):
+        """Delete paths in batches; returns (deleted nodes by path, {path: error})"""
+        deleted, failed = {}, {}
+        for start in range(0, len(paths), self.BATCH_SIZE):
+            self._run_batch(paths[start:start + self.BATCH_SIZE], self.delete, deleted, failed)
+        return deleted, failed
+
+    def move_many(self, sources, destination):
+        """Move sources into the destination folder in batches"""
+        moved, failed = {}, {}
+        target = self.get(destination)
+        if not target.is_folder:
+            raise DriveConflictError(f"{destination} is not a folder")
+        for start in range(0, len(sources), self.BATCH_SIZE):
+            self._run_batch(sources[start:start + self.BATCH_SIZE],
+                            lambda source: self.move(source, destination), moved, failed)
+        return moved, failed
+
+    def delete_many_by_id(self, node_ids):
+        """delete_many for file IDs; results are keyed by ID"""
+        deleted, failed = {}, {}
+        for start in range(0, len(node_ids), self.BATCH_SIZE):
+            self._run_batch(node_ids[start:start + self.BATCH_SIZE], self.delete_by_id, deleted, failed)
+        return deleted, failed
+
+    def move_many_by_id(self, node_ids, folder_id):
+        """move_many for file IDs into the folder folder_id; results are keyed by ID"""
+        moved, failed = {}, {}
+        target = self.get_by_id(folder_id)
+        if not target.is_folder:
+            raise DriveConflictError(f"{self.path_of(target)} is not a folder")
+        for start in range(0, len(node_ids), self.BATCH_SIZE):
+            self._run_batch(node_ids[start:start + self.BATCH_SIZE],
+                            lambda node_id: self.move_by_id(node_id, folder_id), moved, failed)
+        return moved, failed
+
+    def _run_batch(self, paths, operation, done, failed):
+        for path in paths:
+            try:
+                done[path] = operation(path)
+            except DriveError as e:
+                failed[path] = e
+
+
+class InMemoryDriveBackend(DriveBackend):
+    """In-memory Drive stand-in.
+
+    Nodes are stored by ID with a parent -> {name: child_id} index, so LIST is
+    O(children), path lookups are O(depth) and MOVE is an O(1) re-parenting.
+    Every mutation is appended to a bounded change log served by list_changes.
+    """
+
+    ROOT_ID = 'root'
+
+    def __init__(self, change_log_size=100_000):
+        self.lock = threading.RLock()
+        self.nodes = {self.ROOT_ID: DriveNode(self.ROOT_ID, '/', None, is_folder=True)}
+        self.children = {self.ROOT_ID: {}}
+        self._ids = itertools.count(1)
+        self.changes = deque(maxlen=change_log_size)
+        self.next_token = 1
+
+    def _record_change(self, node, removed=False):
+        self.changes.append({
+            'token': self.next_token,
+            'file_id': node.id,
+            'removed': removed,
+            'file': None if removed else node.to_record(),
+        })
+        self.next_token += 1
+
+    # -- tree construction -------------------------------------------------
+
+    def _new_id(self):
+        return f"f{next(self._ids)}"
+
+    def add_folder(self, path, modified=None):
+        """Create the folder at path (and any missing parents)"""
+        with self.lock:
+            folder_id = self.ROOT_ID
+            for name in split_path(path):
+                child_id = self.children[folder_id].get(name)
+                if child_id is None:
+                    child_id = self._new_id()
+                    self.nodes[child_id] = DriveNode(child_id, name, folder_id, is_folder=True,
+                                                     modified=modified)
+                    self.children[child_id] = {}
+                    self.children[folder_id][name] = child_id
+                    self._record_change(self.nodes[child_id])
+                elif not self.nodes[child_id].is_folder:
+                    raise DriveConflictError(f"{name} is a file, not a folder")
+                folder_id = child_id
+            return self.nodes[folder_id]
+
+    def add_file(self, path, size=0, modified=None, mime_type=None, content=None, checksum=None):
+        """Create the file at path, creating parent folders as needed"""
+        if checksum is None and content is not None:
+            checksum = hashlib.md5(_as_bytes(content)).hexdigest()
+        parts = split_path(path)
+        if not parts:
+            raise DriveConflictError("Cannot create a file at /")
+        with self.lock:
+            folder = self.add_folder('/' + '/'.join(parts[:-1]))
+            name = parts[-1]
+            if name in self.children[folder.id]:
+                raise DriveConflictError(f"{path} already exists")
+            node_id = self._new_id()
+            node = DriveNode(node_id, name, folder.id, size=size, modified=modified,
+                             mime_type=mime_type, content=content, checksum=checksum)
+            self.nodes[node_id] = node
+            self.children[folder.id][name] = node_id
+            self._record_change(node)
+            return node
+
+    def update_file(self, path, content, modified=None, size=None):
+        """Replace a file's content (an edit in Drive)"""
+        with self.lock:
+            node = self.nodes[self._resolve(path)]
+            if node.is_folder:
+                raise DriveConflictError(f"{path} is a folder")
+            node.content = content
+            node.checksum = hashlib.md5(_as_bytes(content)).hexdigest()
+            node.size = len(_as_bytes(content)) if size is None else size
+            node.modified = modified or datetime.now().isoformat(timespec='seconds')
+            self._record_change(node)
+            return node
+
+    # -- DriveBackend ------------------------------------------------------
+
+    def _resolve(self, path):
+        node_id = self.ROOT_ID
+        for name in split_path(path):
+            siblings = self.children.get(node_id)
+            node_id = siblings.get(name) if siblings is not None else None
+            if node_id is None:
+                raise DriveNotFoundError(path)
+        return node_id
+
+    def _node(self, node_id):
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise DriveNotFoundError(node_id)
+        return node
+
+    def _children(self, folder_id, path=None):
+        children = self.children.get(folder_id)
+        if children is None:
+            raise DriveConflictError(f"{path or self.path_of(self._node(folder_id))} is not a folder")
+        return children
+
+    def get(self, path):
+        with self.lock:
+            return self.nodes[self._resolve(path)]
+
+    def get_by_id(self, node_id):
+        with self.lock:
+            return self._node(node_id)
+
+    def lookup_child(self, parent_id, name):
+        with self.lock:
+            children = self.children.get(parent_id)
+            return children.get(name) if children is not None else None
+
+    def list_child_names(self, parent_id):
+        with self.lock:
+            return list(self.children.get(parent_id, ()))
+
+    def list_folder(self, path):
+        with self.lock:
+            return [self.nodes[child_id] for child_id in self._children(self._resolve(path), path).values()]
+
+    def list_folder_by_id(self, folder_id):
+        with self.lock:
+            return [self.nodes[child_id] for child_id in self._children(folder_id).values()]
+
+    def iter_folder(self, path, page_size=100):
+        with self.lock:
+            folder_id = self._resolve(path)
+            self._children(folder_id, path)
+        return self.iter_folder_by_id(folder_id, page_size)
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        # Like Drive's pageToken paging: the lock is only held per page, so a
+        # huge folder is never copied and writers are not blocked meanwhile
+        with self.lock:
+            child_ids = iter(self._children(folder_id).values())
+        offset = 0
+        while True:
+            with self.lock:
+                children = self.children.get(folder_id)
+                if children is None:
+                    return
+                try:
+                    page = [self.nodes[child_id] for child_id in itertools.islice(child_ids, page_size)]
+                except RuntimeError:
+                    # The folder changed between pages: resume by position
+                    child_ids = itertools.islice(children.values(), offset, None)
+                    page = [self.nodes[child_id] for child_id in itertools.islice(child_ids, page_size)]
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def delete(self, path):
+        with self.lock:
+            return self.delete_by_id(self._resolve(path))
+
+    def delete_by_id(self, node_id):
+        with self.lock:
+            if node_id == self.ROOT_ID:
+                raise DriveConflictError("Cannot delete the root folder")
+            node = self._node(node_id)
+            del self.children[node.parent][node.name]
+            stack = [node_id]
+            while stack:
+                current = stack.pop()
+                self._record_change(self.nodes.pop(current), removed=True)
+                stack.extend(self.children.pop(current, {}).values())
+            return node
+
+    def move(self, source, destination):
+        with self.lock:
+            node_id = self._resolve(source)
+            try:
+                target_id, new_name = self._resolve(destination), None
+            except DriveNotFoundError:
+                # Destination does not exist: treat it as a rename into its parent
+                target_id = self._resolve(parent_path(destination))
+                new_name = split_path(destination)[-1]
+            return self.move_by_id(node_id, target_id, new_name)
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        with self.lock:
+            if node_id == self.ROOT_ID:
+                raise DriveConflictError("Cannot move the root folder")
+            node = self._node(node_id)
+            target = self._node(folder_id)
+            new_name = new_name or node.name
+            if folder_id not in self.children:
+                raise DriveConflictError(f"{self.path_of(target)} is not a folder")
+            if new_name in self.children[folder_id]:
+                raise DriveConflictError(f"{join_path(self.path_of(target), new_name)} already exists")
+            ancestor = folder_id
+            while ancestor is not None:
+                if ancestor == node_id:
+                    raise DriveConflictError(f"Cannot move {self.path_of(node)} into itself")
+                ancestor = self.nodes[ancestor].parent
+            del self.children[node.parent][node.name]
+            self.children[folder_id][new_name] = node_id
+            node.parent = folder_id
+            node.name = new_name
+            self._record_change(node)
+            return node
+
+    def _run_batch(self, paths, operation, done, failed):
+        with self.lock:
+            super()._run_batch(paths, operation, done, failed)
+
+    def get_start_page_token(self):
+        with self.lock:
+            return self.next_token
+
+    def list_changes(self, page_token, page_size=1000):
+        with self.lock:
+            if page_token > self.next_token:
+                # Issued by a different tree (e.g. before a restart)
+                raise DriveTokenError(f"Change token {page_token} is not valid")
+            if not self.changes:
+                return [], self.next_token
+            first = self.changes[0]['token']
+            if page_token < first:
+                raise DriveTokenError(f"Change token {page_token} has expired")
+            start = page_token - first
+            page = list(itertools.islice(self.changes, start, start + page_size))
+            return page, page_token + len(page)
+
+    def _content_node(self, node):
+        if node.is_folder:
+            raise DriveConflictError(f"{self.path_of(node)} is a folder")
+        return node
+
+    @staticmethod
+    def _text(node):
+        content = node.content or ''
+        return content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+
+    def read_content(self, path):
+        return self._text(self._content_node(self.get(path)))
+
+    def read_content_by_id(self, node_id):
+        return self._text(self._content_node(self.get_by_id(node_id)))
+
+    def open_content(self, path):
+        return io.BytesIO(_as_bytes(self._content_node(self.get(path)).content or b''))
+
+    def open_content_by_id(self, node_id):
+        return io.BytesIO(_as_bytes(self._content_node(self.get_by_id(node_id)).content or b''))
+
+    def path_of(self, node):
+        with self.lock:
+            names = []
+            while node.parent is not None:
+                names.append(node.name)
+                node = self.nodes[node.parent]
+            return '/' + '/'.join(reversed(names))
+
+    # -- fixtures ----------------------------------------------------------
+
+    def file_count(self):
+        return sum(1 for node in self.nodes.values() if not node.is_folder)
+
+    def to_fixture(self):
+        """Serialize the tree into the JSON fixture format"""
+        folders = []
+        files = []
+        with self.lock:
+            for node in self.nodes.values():
+                if node.id == self.ROOT_ID:
+                    continue
+                path = self.path_of(node)
+                if node.is_folder:
+                    if not self.children[node.id]:
+                        folders.append(path)
+                    continue
+                entry = {'path': path, 'size': node.size, 'modified': node.modified}
+                if node.mime_type:
+                    entry['mime_type'] = node.mime_type
+                if isinstance(node.content, bytes):
+                    entry['content_base64'] = base64.b64encode(node.content).decode('ascii')
+                elif node.content:
+                    entry['content'] = node.content
+                if node.checksum:
+                    entry['md5Checksum'] = node.checksum
+                files.append(entry)
+        return {'folders': folders, 'files': files}
+
+    @classmethod
+    def from_fixture(cls, fixture):
+        """Build a backend from a fixture dict ({'folders': [...], 'files': [...]})"""
+        backend = cls()
+        for folder in fixture.get('folders', []):
+            backend.add_folder(folder)
+        for entry in fixture.get('files', []):
+            backend.add_file(entry['path'], size=entry.get('size', 0),
+                             modified=entry.get('modified'),
+                             mime_type=entry.get('mime_type'),
+                             content=(base64.b64decode(entry['content_base64']) if 'content_base64' in entry
+                                      else entry.get('content')),
+                             checksum=entry.get('md5Checksum'))
+        return backend
+
+    @classmethod
+    def load_fixture(cls, filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls.from_fixture(json.load(f))
+
+    def save_fixture(self, filename):
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_fixture(), f)
+
+
+class LatencyDriveBackend(DriveBackend):
+    """Wraps a backend and sleeps before each call to mimic Drive API latency"""
+
+    def __init__(self, backend, latency=0.05):
+        self.backend = backend
+        self.latency = latency
+        self.calls = 0
+
+    def _delay(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def ROOT_ID(self):
+        return self.backend.ROOT_ID
+
+    def get(self, path):
+        self._delay()
+        return self.backend.get(path)
+
+    def get_by_id(self, node_id):
+        self._delay()
+        return self.backend.get_by_id(node_id)
+
+    def lookup_child(self, parent_id, name):
+        self._delay()
+        return self.backend.lookup_child(parent_id, name)
+
+    def list_child_names(self, parent_id):
+        self._delay()
+        return self.backend.list_child_names(parent_id)
+
+    def list_folder(self, path):
+        self._delay()
+        return self.backend.list_folder(path)
+
+    def list_folder_by_id(self, folder_id):
+        self._delay()
+        return self.backend.list_folder_by_id(folder_id)
+
+    def _paged(self, nodes, page_size):
+        for index, node in enumerate(nodes):
+            if index % page_size == 0:
+                self._delay()
+            yield node
+
+    def iter_folder(self, path, page_size=100):
+        return self._paged(self.backend.iter_folder(path, page_size), page_size)
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        return self._paged(self.backend.iter_folder_by_id(folder_id, page_size), page_size)
+
+    def delete(self, path):
+        self._delay()
+        return self.backend.delete(path)
+
+    def delete_by_id(self, node_id):
+        self._delay()
+        return self.backend.delete_by_id(node_id)
+
+    def move(self, source, destination):
+        self._delay()
+        return self.backend.move(source, destination)
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        self._delay()
+        return self.backend.move_by_id(node_id, folder_id, new_name)
+
+    def read_content(self, path):
+        self._delay()
+        return self.backend.read_content(path)
+
+    def read_content_by_id(self, node_id):
+        self._delay()
+        return self.backend.read_content_by_id(node_id)
+
+    def open_content(self, path):
+        self._delay()
+        return self.backend.open_content(path)
+
+    def open_content_by_id(self, node_id):
+        self._delay()
+        return self.backend.open_content_by_id(node_id)
+
+    def path_of(self, node):
+        return self.backend.path_of(node)
+
+    def get_start_page_token(self):
+        return self.backend.get_start_page_token()
+
+    def list_changes(self, page_token, page_size=1000):
+        self._delay()
+        return self.backend.list_changes(page_token, page_size)
+
+
+DEMO_FILES = [
+    {"path": "/ProjectX/report.pdf", "size": 2411725, "modified": "2024-01-15",
+     "content": "Quarterly financial report showing 15% revenue growth and improved profit margins."},
+    {"path": "/ProjectX/presentation.pptx", "size": 5347738, "modified": "2024-01-14",
+     "content": "Sales presentation covering Q4 results and Q1 projections."},
+    {"path": "/ProjectX/data.xlsx", "size": 1258291, "modified": "2024-01-13",
+     "content": "Customer analytics data with key performance indicators."},
+    {"path": "/ProjectX/notes.txt", "size": 15360, "modified": "2024-01-12",
+     "content": "Meeting notes from the quarterly planning session."},
+]
+
+
+def crawl(backend, page_size=1000):
+    """Yield (path, node) for every node in the tree, breadth-first from the root"""
+    yield '/', backend.get('/')
+    folders = deque(['/'])
+    while folders:
+        path = folders.popleft()
+        for child in backend.iter_folder(path, page_size=page_size):
+            child_path = join_path(path, child.name)
+            yield child_path, child
+            if child.is_folder:
+                folders.append(child_path)
+
+
+def demo_backend():
+    """Return the small demo tree used by the test launcher"""
+    return InMemoryDriveBackend.from_fixture({'folders': ['/Archive'], 'files': DEMO_FILES})
+
+
+def generate_fixture(n_files=100_000, folders_per_level=10, depth=3, seed=0):
+    """Generate a synthetic fixture with n_files spread over a folder tree"""
+    rng = random.Random(seed)
+    folders = ['']
+    for level in range(depth):
+        folders = [f"{parent}/folder{level}_{i}" for parent in folders for i in range(folders_per_level)]
+    extensions = list(FILE_TYPES)
+    start = datetime(2024, 1, 1)
+    files = []
+    for i in range(n_files):
+        extension = extensions[i % len(extensions)]
+        files.append({
+            'path': f"{rng.choice(folders)}/file{i}.{extension}",
+            'size': rng.randint(1024, 50 * 1024 * 1024),
+            'modified': (start + timedelta(minutes=rng.randint(0, 525600))).strftime('%Y-%m-%d'),
+        })
+    return {'folders': [], 'files': files}
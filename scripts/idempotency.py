@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Idempotent Message Handling
+Twilio retries a webhook when the acknowledgement is slow, so the same
+MessageSid can arrive two or three times. The store remembers each message
+ID for a time window: the first delivery runs the command, duplicates wait
+for that result and get the same response instead of running it again.
+With a shared store the first delivery is claimed there, so a retry that
+lands on another worker process waits for the owner's result too. The
+claim is a lease the owner keeps renewing; if the owner dies, a waiting
+worker takes the message over once the lease runs out.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class ClaimReleased(RuntimeError):
+    """The worker that claimed a message gave it up (its command failed, or
+    it stopped renewing the lease): begin() again to take it over"""
+
+
+class _Entry:
+    __slots__ = ('key', 'created', 'done', 'response', 'error', 'delivered', 'event', 'waiters', 'remote')
+
+    def __init__(self, key, now):
+        self.key = key
+        self.created = now
+        self.done = False
+        self.response = None
+        self.error = None
+        self.delivered = False
+        self.event = threading.Event()
+        self.waiters = []
+        self.remote = False
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class IdempotencyStore:
+    """Message ID -> response, kept ttl seconds and capped at max_entries.
+
+    begin(key) returns (entry, owner): the owner runs the command and calls
+    complete() or fail(); everyone else waits on the entry (wait() from a
+    thread, wait_async() from the event loop). A failure is not cached, so a
+    later retry of that message runs again.
+
+    With store (a shared_state.Store), begin() also claims the key there
+    for lease seconds, renewed every lease / 3 seconds while the command
+    runs; if another worker holds it the entry is remote: a thread polls the
+    store every poll_interval seconds and finishes the entry with that
+    worker's response. A lost reply may then be re-sent once per worker. If
+    the claim disappears first (the owner failed or died), the entry fails
+    with ClaimReleased and run() begins again, taking the message over.
+    """
+
+    def __init__(self, ttl=3600, max_entries=100_000, clock=time.monotonic, store=None,
+                 poll_interval=0.05, lease=30.0):
+        self.ttl = ttl
+        self.store = store
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._owned = {}
+        self._renewer = None
+        self._lease_lock = threading.Lock()
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.duplicates = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _evict(self, now):
+        # Entries are in creation order, so expired ones are at the front
+        entries = self.entries
+        while entries:
+            key, oldest = next(iter(entries.items()))
+            if len(entries) <= self.max_entries and now - oldest.created <= self.ttl:
+                break
+            del entries[key]
+            self.evictions += 1
+
+    def begin(self, key):
+        now = self.clock()
+        with self.lock:
+            self._evict(now)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.duplicates += 1
+                return entry, False
+            entry = self.entries[key] = _Entry(key, now)
+            if self.store is None:
+                return entry, True
+            if self.store.add(f"dedup:{key}", {'done': False}, ttl=self.lease):
+                self._hold(entry)
+                return entry, True
+            # Another worker got this message first: follow its record
+            entry.remote = True
+            self.duplicates += 1
+        threading.Thread(target=self._follow, args=(entry,), daemon=True, name='dedup-follow').start()
+        return entry, False
+
+    def _hold(self, entry):
+        # Called with the lock held
+        self._owned[entry.key] = entry
+        if self._renewer is None:
+            self._renewer = threading.Thread(target=self._renew, daemon=True, name='dedup-lease')
+            self._renewer.start()
+
+    def _renew(self):
+        """Extend the lease on every claim this worker is still running"""
+        while True:
+            time.sleep(self.lease / 3)
+            with self.lock:
+                owned = list(self._owned.values())
+            for entry in owned:
+                # Under the lease lock so a renewal never overwrites complete()'s record
+                with self._lease_lock:
+                    if entry.done:
+                        continue
+                    try:
+                        self.store.set(f"dedup:{entry.key}", {'done': False}, ttl=self.lease)
+                    except Exception as e:
+                        print(f"⚠️  Could not renew the claim on message {entry.key}: {e}")
+
+    def _follow(self, entry):
+        """Poll the store until the worker owning entry finishes it"""
+        while True:
+            record = self.store.get(f"dedup:{entry.key}")
+            if record is None:
+                self.fail(entry, ClaimReleased(f"Message {entry.key} was given up by another worker"))
+                return
+            if record['done']:
+                self.complete(entry, record['response'], record['delivered'])
+                return
+            time.sleep(self.poll_interval)
+
+    def _finish(self, entry):
+        entry.done = True
+        entry.event.set()
+        waiters, entry.waiters = entry.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def complete(self, entry, response, delivered=True):
+        """Record the response; delivered=False lets a duplicate re-send it"""
+        with self._lease_lock:
+            with self.lock:
+                entry.response = response
+                entry.delivered = delivered
+                if self._owned.get(entry.key) is entry:
+                    del self._owned[entry.key]
+                self._finish(entry)
+            if self.store is not None and not entry.remote:
+                self.store.set(f"dedup:{entry.key}", {'done': True, 'response': response, 'delivered': delivered},
+                               ttl=self.ttl)
+
+    def fail(self, entry, error):
+        """Wake waiters with error and forget the key so a retry runs again"""
+        with self._lease_lock:
+            with self.lock:
+                entry.error = error
+                if self.entries.get(entry.key) is entry:
+                    del self.entries[entry.key]
+                if self._owned.get(entry.key) is entry:
+                    del self._owned[entry.key]
+                self._finish(entry)
+            if self.store is not None and not entry.remote:
+                self.store.delete(f"dedup:{entry.key}")
+
+    def wait(self, entry, timeout=None):
+        """Block until the owner finishes; returns its response or raises its error"""
+        if not entry.event.wait(timeout):
+            raise TimeoutError(f"Message {entry.key} is still being processed")
+        return entry.result()
+
+    async def wait_async(self, entry):
+        """wait() for coroutines: suspends instead of blocking a thread"""
+        # Only server mode awaits; importing asyncio at module load would slow every other mode
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            if not entry.done:
+                entry.waiters.append((loop, future))
+            else:
+                future.set_result(None)
+        await future
+        return entry.result()
+
+    def run(self, key, func, *args, **kwargs):
+        """Run func once per key; returns (response, replayed)"""
+        while True:
+            entry, owner = self.begin(key)
+            if owner:
+                break
+            try:
+                return self.wait(entry), True
+            except ClaimReleased:
+                continue
+        try:
+            response = func(*args, **kwargs)
+        except BaseException as e:
+            self.fail(entry, e)
+            raise
+        self.complete(entry, response)
+        return response, False
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'duplicates': self.duplicates,
+                    'evictions': self.evictions}
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
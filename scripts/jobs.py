@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Durable Job Queue
+SQLite-backed queue for commands that outlive the webhook response window
+(SUMMARY of a big folder, bulk MOVE / DELETE). Jobs are acknowledged at
+once, run on a small worker pool, report progress for STATUS, and push
+their result to the sender when done. Jobs interrupted by a restart are
+run again (up to a limit), and results that could not be delivered are
+re-sent. Delivered results are deleted after a retention period.
+"""
+
+import time
+import sqlite3
+import threading
+
+STATES = ('queued', 'running', 'done', 'failed')
+
+
+class Job:
+    """One queued command"""
+
+    __slots__ = ('id', 'sender', 'message', 'state', 'progress', 'result', 'error', 'created',
+                 'started', 'finished', 'attempts', 'delivered')
+
+    def __init__(self, row):
+        (self.id, self.sender, self.message, self.state, self.progress, self.result, self.error,
+         self.created, self.started, self.finished, self.attempts, self.delivered) = row
+
+    @property
+    def outcome(self):
+        """Message pushed to the sender when the job ends"""
+        if self.state == 'done':
+            return f"✅ Job #{self.id} finished:\n{self.result}"
+        return f"❌ Job #{self.id} ({self.message}) failed: {self.error}"
+
+
+_COLUMNS = ('id, sender, message, state, progress, result, error, created, started, finished, '
+            'attempts, delivered')
+
+
+class JobQueue:
+    """Jobs table plus worker threads.
+
+    runner(job, progress) executes a job and returns its reply text;
+    progress(text) records how far it got. notify(sender, text) pushes the
+    outcome; without it (or when it fails) the result is still available
+    through STATUS and delivery is retried on the next start.
+
+    A job interrupted by a restart runs again on the next start; one that
+    has been started max_attempts times already (it keeps killing the
+    process) fails instead. Finished jobs whose outcome was delivered are
+    deleted retention seconds after they finished, by a sweep the workers
+    run every purge_interval seconds.
+
+    Several processes may share one database file: a job is claimed in an
+    IMMEDIATE transaction so only one of them runs it, and each process
+    passes its own owner name so that on start it requeues and re-delivers
+    only the jobs its previous run left behind.
+
+    One sender's jobs run one at a time in submission order; the runner is
+    expected to order them against the sender's other commands (the
+    assistant runs a job under the sender's session lock).
+    """
+
+    def __init__(self, path=':memory:', runner=None, notify=None, workers=2, clock=time.time, owner=None,
+                 max_attempts=3, retention=7 * 86400, purge_interval=3600):
+        self.path = path
+        self.owner = owner
+        self.runner = runner
+        self.notify = notify
+        self.workers = workers
+        self.clock = clock
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._last_purge = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                               id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               sender TEXT NOT NULL,
+                               message TEXT NOT NULL,
+                               state TEXT NOT NULL,
+                               progress TEXT,
+                               result TEXT,
+                               error TEXT,
+                               created REAL NOT NULL,
+                               started REAL,
+                               finished REAL,
+                               attempts INTEGER NOT NULL DEFAULT 0,
+                               delivered INTEGER NOT NULL DEFAULT 0)''')
+        if 'owner' not in [row[1] for row in self.db.execute('PRAGMA table_info(jobs)')]:
+            # Added for multi-process workers; older databases get the column here
+            self.db.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_sender ON jobs (sender, id)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (delivered, finished)')
+        self._threads = []
+        self._stopping = False
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        """Requeue jobs interrupted by a restart, re-send lost results, start workers"""
+        with self.lock:
+            self.db.execute("UPDATE jobs SET state = 'queued', progress = 'Restarted' "
+                            "WHERE state = 'running' AND owner IS ?", (self.owner,))
+            undelivered = self._select("WHERE state IN ('done', 'failed') AND delivered = 0 AND owner IS ? "
+                                       "ORDER BY id", (self.owner,))
+            self._purge()
+        self._stopping = False
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True, name='job-worker')
+            thread.start()
+            self._threads.append(thread)
+        for job in undelivered:
+            self._deliver(job)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop after the running jobs finish (queued jobs stay queued)"""
+        with self.lock:
+            self._stopping = True
+            self.wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.db.close()
+
+    # -- queue -------------------------------------------------------------
+
+    def _select(self, where, params=()):
+        return [Job(row) for row in self.db.execute(f"SELECT {_COLUMNS} FROM jobs {where}", params)]
+
+    def submit(self, sender, message):
+        """Queue message for sender; returns the job number"""
+        with self.lock:
+            cursor = self.db.execute("INSERT INTO jobs (sender, message, state, created) VALUES (?, ?, 'queued', ?)",
+                                     (sender, message, self.clock()))
+            self.wakeup.notify()
+            return cursor.lastrowid
+
+    def get(self, job_id):
+        with self.lock:
+            jobs = self._select('WHERE id = ?', (job_id,))
+        return jobs[0] if jobs else None
+
+    def recent(self, sender, limit=5):
+        """sender's latest jobs, newest first"""
+        with self.lock:
+            return self._select('WHERE sender = ? ORDER BY id DESC LIMIT ?', (sender, limit))
+
+    def position(self, job):
+        """Number of queued jobs ahead of job"""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND id < ?",
+                                   (job.id,)).fetchone()[0]
+
+    def counts(self):
+        with self.lock:
+            counts = dict(self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def purge(self):
+        """Delete delivered jobs that finished more than retention seconds ago; returns how many"""
+        with self.lock:
+            return self._purge()
+
+    def _purge(self):
+        # Called with the lock held
+        self._last_purge = self.clock()
+        return self.db.execute("DELETE FROM jobs WHERE delivered = 1 AND finished < ? "
+                               "AND state IN ('done', 'failed')", (self._last_purge - self.retention,)).rowcount
+
+    def _claim(self):
+        # Called with the lock held. Checked first without the write lock, then
+        # claimed under it so another process cannot claim the same job
+        if not self.db.execute("SELECT 1 FROM jobs WHERE state = 'queued' LIMIT 1").fetchone():
+            return None
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            # A sender's jobs run one after another, in the order they were queued
+            jobs = self._select("WHERE state = 'queued' AND sender NOT IN "
+                                "(SELECT sender FROM jobs WHERE state = 'running') ORDER BY id LIMIT 1")
+            job = jobs[0] if jobs else None
+            if job is not None and job.attempts >= self.max_attempts:
+                # Every run so far died with its process: fail it rather than run it again
+                job.state, job.finished = 'failed', self.clock()
+                job.error = f"gave up after {job.attempts} attempts"
+                self.db.execute("UPDATE jobs SET state = 'failed', error = ?, finished = ?, owner = ? "
+                                "WHERE id = ?", (job.error, job.finished, self.owner, job.id))
+            elif job is not None:
+                job.state, job.started, job.attempts = 'running', self.clock(), job.attempts + 1
+                self.db.execute("UPDATE jobs SET state = 'running', started = ?, attempts = ?, owner = ? "
+                                "WHERE id = ?", (job.started, job.attempts, self.owner, job.id))
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+        return job
+
+    def _set_progress(self, job_id, text):
+        with self.lock:
+            self.db.execute('UPDATE jobs SET progress = ? WHERE id = ?', (text, job_id))
+
+    def _work(self):
+        while True:
+            with self.lock:
+                job = None
+                while not self._stopping:
+                    job = self._claim()
+                    if job is not None:
+                        break
+                    if self.clock() - self._last_purge >= self.purge_interval:
+                        self._purge()
+                    self.wakeup.wait(1.0)
+                if job is None:
+                    return
+            if job.state == 'failed':
+                self._deliver(job)
+            else:
+                self._run(job)
+
+    def _run(self, job):
+        try:
+            job.result = self.runner(job, lambda text: self._set_progress(job.id, text))
+            job.state = 'done'
+        except Exception as e:
+            job.state, job.error = 'failed', str(e) or type(e).__name__
+        job.finished = self.clock()
+        with self.lock:
+            self.db.execute('UPDATE jobs SET state = ?, result = ?, error = ?, finished = ? WHERE id = ?',
+                            (job.state, job.result, job.error, job.finished, job.id))
+            # The sender's next job may be waiting for this one
+            self.wakeup.notify_all()
+        self._deliver(job)
+
+    def _deliver(self, job):
+        if self.notify is None:
+            return
+        try:
+            self.notify(job.sender, job.outcome)
+        except Exception as e:
+            print(f"⚠️  Could not deliver job #{job.id} to {job.sender}: {e}")
+            return
+        with self.lock:
+            self.db.execute('UPDATE jobs SET delivered = 1 WHERE id = ?', (job.id,))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Folder Listing Cache
+LRU + TTL cache of folder listings with a memory budget and precise
+write-through invalidation for DELETE and MOVE.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+from drive_backend import split_path
+
+ENTRY_OVERHEAD = 200  # bytes for the cache slot, key and list object
+NODE_OVERHEAD = 120   # bytes per DriveNode (slots object, without strings)
+
+
+def normalize_path(path):
+    return '/' + '/'.join(split_path(path))
+
+
+def estimate_size(path, listing):
+    """Rough memory footprint of a cached listing, in bytes"""
+    size = ENTRY_OVERHEAD + sys.getsizeof(path) + 8 * len(listing)
+    for node in listing:
+        size += NODE_OVERHEAD + len(node.name)
+    return size
+
+
+class ListingCache:
+    """Folder path -> listing, evicted least-recently-used past max_entries or
+    max_bytes, and expired ttl seconds after it was stored."""
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=64 * 1024 * 1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Bumped on every invalidation so a listing fetched before a write is not stored after it
+        self.generation = 0
+
+    def get(self, path):
+        """Return the cached listing for path, or None"""
+        key = normalize_path(path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, size, listing = entry
+            if self.clock() >= expires:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return listing
+
+    def put(self, path, listing, generation=None):
+        """Store a listing; pass the generation read before fetching it to skip stale puts"""
+        key = normalize_path(path)
+        listing = list(listing)
+        size = estimate_size(key, listing)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (self.clock() + self.ttl, size, listing)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _expires, size, _listing = self.entries.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, path):
+        """Drop the listing of one folder"""
+        key = normalize_path(path)
+        with self.lock:
+            self.generation += 1
+            if key in self.entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tree(self, path):
+        """Drop the listings of a folder and everything below it"""
+        key = normalize_path(path)
+        prefix = key.rstrip('/') + '/'
+        with self.lock:
+            self.generation += 1
+            stale = [cached for cached in self.entries if cached == key or cached.startswith(prefix)]
+            for cached in stale:
+                self._remove(cached)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+        }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Webhook Load Test
+Starts the async webhook server against the in-memory Drive stand-in and a
+recording reply sender, then fires Twilio-style webhooks from N concurrent
+senders. Reports p50/p99 for the webhook ack and for the end-to-end reply.
+
+Usage: python load_test.py [--senders 1000] [--messages 5] [--handler-latency 0.02]
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+import urllib.parse
+
+from async_server import ReplySender, WebhookServer
+from rate_limit import AdmissionController
+from run_test import WhatsAppDriveAssistant
+
+COMMANDS = ["HELP", "LIST /ProjectX", "LIST /Archive", "SUMMARY /ProjectX",
+            "DELETE /ProjectX/report.pdf", "MOVE /ProjectX/missing.pdf /Archive"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class SlowAssistant(WhatsAppDriveAssistant):
+    """Adds a fixed delay per command to stand in for Drive/OpenAI latency"""
+
+    def __init__(self, latency):
+        # No per-sender rate limits: the load test measures the server itself
+        super().__init__(admission=AdmissionController(limits={}))
+        self.latency = latency
+
+    def process_message(self, message_body, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().process_message(message_body, *args, **kwargs)
+
+
+class RecordingReplySender(ReplySender):
+    """Records when each reply would have been sent"""
+
+    def __init__(self):
+        self.waiters = {}
+
+    def expect(self, sender):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[sender] = future
+        return future
+
+    async def send(self, to, body):
+        # One message is in flight per sender, so replies are matched by recipient
+        future = self.waiters.pop(to, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+
+async def post_webhook(host, port, form):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = urllib.parse.urlencode(form).encode()
+    writer.write(
+        b"POST /webhook HTTP/1.1\r\nHost: localhost\r\n"
+        b"Content-Type: application/x-www-form-urlencoded\r\n"
+        + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def sender_loop(index, options, server, replies, ack_latencies, reply_latencies, errors):
+    rng = random.Random(index)
+    sender = f"whatsapp:+1555{index:07d}"
+    for n in range(options.messages):
+        form = {'From': sender, 'Body': rng.choice(COMMANDS), 'MessageSid': f"SM{index:06d}{n:04d}"}
+        reply = replies.expect(sender)
+        start = time.perf_counter()
+        try:
+            status = await post_webhook('127.0.0.1', server.port, form)
+        except OSError:
+            errors.append('connect')
+            replies.waiters.pop(sender, None)
+            continue
+        ack_latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+            replies.waiters.pop(sender, None)
+            continue
+        try:
+            sent_at = await asyncio.wait_for(reply, options.timeout)
+            reply_latencies.append(sent_at - start)
+        except asyncio.TimeoutError:
+            errors.append('timeout')
+
+
+async def run(options):
+    replies = RecordingReplySender()
+    server = WebhookServer(SlowAssistant(options.handler_latency), replies, host='127.0.0.1',
+                           port=0, max_concurrency=options.concurrency)
+    await server.start()
+    ack_latencies, reply_latencies, errors = [], [], []
+    print(f"🚀 {options.senders} senders x {options.messages} messages against 127.0.0.1:{server.port}")
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        sender_loop(i, options, server, replies, ack_latencies, reply_latencies, errors)
+        for i in range(options.senders)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+
+    total = options.senders * options.messages
+    print(f"⏱️  {total} webhooks in {elapsed:.2f}s ({total / elapsed:,.0f}/s), {len(errors)} errors")
+    for label, samples in (('ack', ack_latencies), ('reply', reply_latencies)):
+        print(f"📊 {label:<5} p50={percentile(samples, 50) * 1000:7.1f}ms "
+              f"p99={percentile(samples, 99) * 1000:7.1f}ms  (n={len(samples)})")
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--senders', type=int, default=1000, help='concurrent senders')
+    parser.add_argument('--messages', type=int, default=5, help='messages per sender')
+    parser.add_argument('--concurrency', type=int, default=64, help='server concurrency limit')
+    parser.add_argument('--handler-latency', type=float, default=0.02,
+                        help='simulated backend latency per command (seconds)')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    options = parser.parse_args()
+    return asyncio.run(run(options))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Metrics
+Counters, latency histograms and per-stage timing spans, rendered in the
+Prometheus text format for a /metrics route. Stage spans belong to a
+per-message trace that is only kept for a sampled share of messages; an
+unsampled span is a shared no-op object, so instrumentation costs well
+under a microsecond when sampling is off.
+"""
+
+import time
+import random
+import bisect
+import threading
+from collections import deque
+
+from drive_backend import DriveBackend
+from summary_pipeline import Summarizer
+
+# Seconds; from a cached LIST up to a SUMMARY that runs into its deadline
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = 'assistant_'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with quantile estimates"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating inside its bucket"""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _NoSpan:
+    """Span returned when the current message is not sampled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'start')
+
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.trace.spans.append((self.stage, self.start - self.trace.start, end - self.start))
+        return False
+
+
+class Trace:
+    """Timing spans of one sampled message"""
+
+    __slots__ = ('command', 'sender', 'start', 'spans', 'outcome', 'duration')
+
+    def __init__(self, command, sender):
+        self.command = command
+        self.sender = sender
+        self.start = time.perf_counter()
+        self.spans = []
+        self.outcome = None
+        self.duration = None
+
+    def add(self, stage, duration):
+        """Record a stage that was timed by hand"""
+        self.spans.append((stage, 0.0, duration))
+
+    def to_dict(self):
+        return {
+            'command': self.command,
+            'outcome': self.outcome,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'spans': [{'stage': stage, 'offset_ms': round(offset * 1000, 3), 'duration_ms': round(duration * 1000, 3)}
+                      for stage, offset, duration in self.spans],
+        }
+
+
+class Metrics:
+    """Registry of counters and histograms keyed by (name, label values).
+
+    begin(command) starts a trace for a sampled share (sample_rate) of
+    messages; span(stage) times a stage of the current thread's trace.
+    Collectors are callables returning extra (name, type, help, labels,
+    value) samples, such as cache hit counts, gathered at render time.
+    """
+
+    def __init__(self, sample_rate=1.0, recent_traces=100):
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self.recent = deque(maxlen=recent_traces)
+        self.collectors = []
+        self._local = threading.local()
+
+    # -- primitives --------------------------------------------------------
+
+    def inc(self, name, labels=(), amount=1, help_text=None):
+        """labels is a tuple of (label, value) pairs"""
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if help_text:
+                self.help.setdefault(name, help_text)
+
+    def histogram(self, name, labels=(), help_text=None):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+                if help_text:
+                    self.help.setdefault(name, help_text)
+        return histogram
+
+    def observe(self, name, labels, value, help_text=None):
+        self.histogram(name, labels, help_text).observe(value)
+
+    # -- traces ------------------------------------------------------------
+
+    def begin(self, command, sender=None):
+        """Start the current thread's trace if this message is sampled; returns it or None"""
+        trace = Trace(command, sender) if self.sample_rate and random.random() < self.sample_rate else None
+        self._local.trace = trace
+        return trace
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def attach(self, trace):
+        """Continue trace on this thread (worker threads of a traced message)"""
+        self._local.trace = trace
+
+    def span(self, stage):
+        trace = getattr(self._local, 'trace', None)
+        if trace is None:
+            return NO_SPAN
+        return _Span(trace, stage)
+
+    def end(self, trace, outcome):
+        """Finish the current thread's trace and fold its spans into the stage histograms"""
+        self._local.trace = None
+        if trace is None:
+            return
+        trace.duration = time.perf_counter() - trace.start
+        trace.outcome = outcome
+        for stage, _offset, duration in trace.spans:
+            self.observe('stage_seconds', (('command', trace.command), ('stage', stage)), duration,
+                         'Time spent per stage of sampled commands')
+        self.recent.append(trace)
+
+    # -- export ------------------------------------------------------------
+
+    def quantiles(self, name, labels=()):
+        histogram = self.histograms.get((name, labels))
+        return {q: histogram.quantile(q) for q in QUANTILES} if histogram else {}
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {PREFIX}{name} {self.help[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram')
+            with histogram.lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+        # Precomputed p50/p95/p99 for dashboards without histogram_quantile
+        for (name, labels), histogram in histograms:
+            header(f"{name}_quantile", 'gauge')
+            for q in QUANTILES:
+                lines.append(f"{PREFIX}{name}_quantile{_labels(labels + (('quantile', str(q)),))} "
+                             f"{histogram.quantile(q):.6f}")
+        for collector in self.collectors:
+            for name, kind, help_text, labels, value in collector():
+                if name not in typed:
+                    self.help.setdefault(name, help_text)
+                header(name, kind)
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+class InstrumentedDriveBackend(DriveBackend):
+    """Times every Drive call as a 'drive.<call>' span of the current trace"""
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        # Anything outside the interface (lock, nodes, update_file, ...) passes through
+        return getattr(self.backend, name)
+
+    @property
+    def ROOT_ID(self):
+        return self.backend.ROOT_ID
+
+    def get(self, path):
+        with self.metrics.span('drive.get'):
+            return self.backend.get(path)
+
+    def get_by_id(self, node_id):
+        with self.metrics.span('drive.get'):
+            return self.backend.get_by_id(node_id)
+
+    def lookup_child(self, parent_id, name):
+        with self.metrics.span('drive.lookup'):
+            return self.backend.lookup_child(parent_id, name)
+
+    def list_child_names(self, parent_id):
+        with self.metrics.span('drive.list'):
+            return self.backend.list_child_names(parent_id)
+
+    def list_folder(self, path):
+        with self.metrics.span('drive.list'):
+            return self.backend.list_folder(path)
+
+    def list_folder_by_id(self, folder_id):
+        with self.metrics.span('drive.list'):
+            return self.backend.list_folder_by_id(folder_id)
+
+    def iter_folder(self, path, page_size=100):
+        return self._paged(self.backend.iter_folder(path, page_size), page_size)
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        return self._paged(self.backend.iter_folder_by_id(folder_id, page_size), page_size)
+
+    def _paged(self, iterator, page_size):
+        # Only the time spent fetching pages counts, not the consumer's work
+        iterator = iter(iterator)
+        while True:
+            with self.metrics.span('drive.list'):
+                page = [node for _, node in zip(range(page_size), iterator)]
+            yield from page
+            if len(page) < page_size:
+                return
+
+    def delete(self, path):
+        with self.metrics.span('drive.delete'):
+            return self.backend.delete(path)
+
+    def move(self, source, destination):
+        with self.metrics.span('drive.move'):
+            return self.backend.move(source, destination)
+
+    def delete_by_id(self, node_id):
+        with self.metrics.span('drive.delete'):
+            return self.backend.delete_by_id(node_id)
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        with self.metrics.span('drive.move'):
+            return self.backend.move_by_id(node_id, folder_id, new_name)
+
+    def delete_many(self, paths):
+        with self.metrics.span('drive.delete'):
+            return self.backend.delete_many(paths)
+
+    def move_many(self, sources, destination):
+        with self.metrics.span('drive.move'):
+            return self.backend.move_many(sources, destination)
+
+    def delete_many_by_id(self, node_ids):
+        with self.metrics.span('drive.delete'):
+            return self.backend.delete_many_by_id(node_ids)
+
+    def move_many_by_id(self, node_ids, folder_id):
+        with self.metrics.span('drive.move'):
+            return self.backend.move_many_by_id(node_ids, folder_id)
+
+    def read_content(self, path):
+        with self.metrics.span('drive.read'):
+            return self.backend.read_content(path)
+
+    def read_content_by_id(self, node_id):
+        with self.metrics.span('drive.read'):
+            return self.backend.read_content_by_id(node_id)
+
+    def open_content(self, path):
+        # Times opening the download; reading it is timed by the caller's stage
+        with self.metrics.span('drive.read'):
+            return self.backend.open_content(path)
+
+    def open_content_by_id(self, node_id):
+        with self.metrics.span('drive.read'):
+            return self.backend.open_content_by_id(node_id)
+
+    def path_of(self, node):
+        return self.backend.path_of(node)
+
+    def get_start_page_token(self):
+        return self.backend.get_start_page_token()
+
+    def list_changes(self, page_token, page_size=1000):
+        with self.metrics.span('drive.changes'):
+            return self.backend.list_changes(page_token, page_size)
+
+
+class InstrumentedSummarizer(Summarizer):
+    """Times every model call as an 'llm' span of the current trace"""
+
+    def __init__(self, summarizer, metrics):
+        self.summarizer = summarizer
+        self.metrics = metrics
+        self.model = summarizer.model
+
+    def summarize(self, text):
+        with self.metrics.span('llm'):
+            return self.summarizer.summarize(text)
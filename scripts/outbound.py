@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Outbound Message Sender
+Sends replies through the Twilio Messages API over a pool of keep-alive
+HTTP/1.1 connections instead of a fresh connection per message. Each
+recipient has an ordered queue: their messages are delivered one at a time
+in the order they were sent, adjacent queued messages that fit in one
+WhatsApp message are coalesced into a single request, long replies are
+split at line breaks, and failed requests are retried with jittered
+exponential backoff.
+"""
+
+import os
+import ssl
+import time
+import base64
+import random
+import asyncio
+import urllib.parse
+from collections import deque
+
+from async_server import ReplySender
+
+TWILIO_API_URL = "https://api.twilio.com"
+MESSAGES_PATH = "/2010-04-01/Accounts/{sid}/Messages.json"
+MAX_MESSAGE_LENGTH = 1600  # Twilio's limit for one WhatsApp message body
+MAX_RESPONSE_BYTES = 1024 * 1024
+
+
+def split_message(body, max_length=MAX_MESSAGE_LENGTH):
+    """Split a reply into parts of at most max_length characters, at line
+    breaks where possible"""
+    if len(body) <= max_length:
+        return [body]
+    parts = []
+    current = ''
+    for line in body.split('\n'):
+        while len(line) > max_length:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:max_length])
+            line = line[max_length:]
+        if current and len(current) + 1 + len(line) > max_length:
+            parts.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        parts.append(current)
+    return parts
+
+
+class SendError(Exception):
+    """The messages API answered with an error status"""
+
+    def __init__(self, status, detail=''):
+        super().__init__(f"HTTP {status}: {detail}" if detail else f"HTTP {status}")
+        self.status = status
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one origin (scheme://host[:port]).
+
+    At most max_connections requests are in flight; finished connections go
+    back to an idle list and are reused, unless idle for idle_timeout
+    seconds (servers drop idle connections, so stale ones are not tried).
+    timeout bounds one request, connecting included.
+    """
+
+    def __init__(self, url, max_connections=32, idle_timeout=30.0, timeout=10.0):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.host_header = parts.netloc
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.idle = []
+        self.slots = None
+        self.opened = 0
+        self.requests = 0
+
+    async def _connection(self):
+        now = time.monotonic()
+        while self.idle:
+            reader, writer, last_used = self.idle.pop()
+            if now - last_used < self.idle_timeout and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    @staticmethod
+    async def _read_response(reader):
+        """(status, headers, body, reusable) of one HTTP/1.1 response"""
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        reusable = headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+                if size == 0:
+                    await reader.readuntil(b'\r\n')
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read(MAX_RESPONSE_BYTES)
+            reusable = False
+        return status, headers, body, reusable
+
+    async def request(self, method, path, headers, body=b''):
+        """Send one request; returns (status, lowercased headers, body)"""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_connections)
+        async with self.slots:
+            self.requests += 1
+            reader = writer = None
+            try:
+                async with asyncio.timeout(self.timeout):
+                    reader, writer = await self._connection()
+                    head = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+                    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host_header}\r\n{head}"
+                                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+                    await writer.drain()
+                    status, response_headers, payload, reusable = await self._read_response(reader)
+            except BaseException:
+                if writer is not None:
+                    writer.close()
+                raise
+            if reusable:
+                self.idle.append((reader, writer, time.monotonic()))
+            else:
+                writer.close()
+            return status, response_headers, payload
+
+    def close(self):
+        for _reader, writer, _last_used in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+class OutboundSender(ReplySender):
+    """Twilio WhatsApp sender with per-recipient ordered queues.
+
+    send() resolves once every part of the reply is delivered, or raises the
+    last error. A request failing with a connection error, 429 or 5xx is
+    retried up to max_attempts times, sleeping a random time up to
+    backoff * 2**attempt (capped at max_backoff, and at least Retry-After);
+    other 4xx answers fail at once. Retried requests may deliver twice if
+    the first attempt reached Twilio but its answer was lost.
+    """
+
+    def __init__(self, pool, path, from_number, authorization=None, max_length=MAX_MESSAGE_LENGTH,
+                 max_attempts=5, backoff=0.25, max_backoff=8.0, rng=None):
+        self.pool = pool
+        self.path = path
+        self.from_number = from_number
+        self.headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        if authorization:
+            self.headers['Authorization'] = authorization
+        self.max_length = max_length
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rng = rng or random.Random()
+        self.queues = {}
+        self.tasks = set()
+        self.messages = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        account_sid = os.environ['TWILIO_ACCOUNT_SID']
+        credentials = base64.b64encode(f"{account_sid}:{os.environ['TWILIO_AUTH_TOKEN']}".encode()).decode()
+        pool = ConnectionPool(os.environ.get('TWILIO_API_URL') or TWILIO_API_URL,
+                              max_connections=int(os.environ.get('OUTBOUND_CONNECTIONS', 32)))
+        return cls(pool, MESSAGES_PATH.format(sid=account_sid), os.environ['TWILIO_WHATSAPP_NUMBER'],
+                   authorization=f"Basic {credentials}")
+
+    async def send(self, to, body):
+        loop = asyncio.get_running_loop()
+        futures = []
+        queue = self.queues.get(to)
+        if queue is None:
+            queue = self.queues[to] = deque()
+            task = asyncio.create_task(self._drain(to, queue))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        for part in split_message(body, self.max_length):
+            future = loop.create_future()
+            queue.append((part, future))
+            futures.append(future)
+            self.messages += 1
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _drain(self, to, queue):
+        """Deliver a recipient's queue in order; ends (and is dropped) when it is empty"""
+        try:
+            while queue:
+                body, future = queue.popleft()
+                futures = [future]
+                while queue and len(body) + 2 + len(queue[0][0]) <= self.max_length:
+                    more, future = queue.popleft()
+                    body = f"{body}\n\n{more}"
+                    futures.append(future)
+                    self.coalesced += 1
+                try:
+                    await self._deliver(to, body)
+                except Exception as e:
+                    self.failures += 1
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            del self.queues[to]
+
+    async def _deliver(self, to, body):
+        data = urllib.parse.urlencode({'From': self.from_number, 'To': to, 'Body': body}).encode()
+        for attempt in range(self.max_attempts):
+            retry_after = None
+            try:
+                status, headers, payload = await self.pool.request('POST', self.path, self.headers, data)
+            except (OSError, EOFError, TimeoutError) as e:
+                error = e
+            else:
+                if status < 300:
+                    return
+                error = SendError(status, payload[:200].decode('utf-8', 'replace'))
+                if status != 429 and status < 500:
+                    raise error
+                retry_after = headers.get('retry-after')
+            if attempt + 1 == self.max_attempts:
+                raise error
+            self.retries += 1
+            delay = self.rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    def collect_metrics(self):
+        """Outbound counters for the /metrics route"""
+        yield ('outbound_messages', 'counter', 'Reply parts queued for sending', (), self.messages)
+        yield ('outbound_coalesced', 'counter', 'Reply parts merged into a preceding request', (),
+               self.coalesced)
+        yield ('outbound_requests', 'counter', 'Messages API requests, retries included', (),
+               self.pool.requests)
+        yield ('outbound_retries', 'counter', 'Messages API requests retried', (), self.retries)
+        yield ('outbound_failures', 'counter', 'Messages given up on after retries', (), self.failures)
+        yield ('outbound_connections', 'counter', 'HTTP connections opened to the messages API', (),
+               self.pool.opened)
+        yield ('outbound_queued', 'gauge', 'Recipients with replies waiting', (), len(self.queues))
+
+    async def close(self):
+        """Wait for queued replies, then drop the idle connections"""
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.close()
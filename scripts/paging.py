@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Reply Paging
+Renders a stream of lines into pages that fit a WhatsApp message, and keeps
+a per-sender cursor so MORE / PAGE n continue where the last page stopped.
+"""
+
+# Twilio rejects WhatsApp bodies over 1600 characters; keep room for the footer
+WHATSAPP_MAX_CHARS = 1600
+FOOTER_RESERVE = 120
+
+
+def render_pages(header, lines, max_chars=WHATSAPP_MAX_CHARS - FOOTER_RESERVE):
+    """Yield pages (strings) of at most max_chars, each starting with header.
+
+    lines may be any iterable (typically a generator over a backend listing),
+    so only one page is held in memory at a time. Every page holds at least
+    one line, even if that line alone is longer than the budget.
+    """
+    page = [header]
+    size = len(header)
+    for line in lines:
+        if len(page) > 1 and size + 1 + len(line) > max_chars:
+            yield '\n'.join(page)
+            page = [header]
+            size = len(header)
+        page.append(line)
+        size += 1 + len(line)
+    if len(page) > 1:
+        yield '\n'.join(page)
+
+
+class PageCursor:
+    """Server-side position in a paged reply, stored on the sender's session"""
+
+    def __init__(self, command, pages):
+        self.command = command
+        self.pages = iter(pages)
+        self.returned = 0
+        self._peeked = None
+
+    def _pull(self):
+        if self._peeked is not None:
+            page, self._peeked = self._peeked, None
+            return page
+        return next(self.pages, None)
+
+    def has_more(self):
+        """True if another page follows (renders at most one page ahead)"""
+        if self._peeked is None:
+            self._peeked = next(self.pages, None)
+        return self._peeked is not None
+
+    def next_page(self):
+        """Return (page_number, text); text is None once the pages run out"""
+        page = self._pull()
+        if page is None:
+            return self.returned, None
+        self.returned += 1
+        return self.returned, page
+
+    def skip_to(self, page_number):
+        """Advance so that next_page returns page_number"""
+        while self.returned < page_number - 1:
+            if self._pull() is None:
+                break
+            self.returned += 1
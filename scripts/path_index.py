@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Path Index
+Caches human path -> Drive file ID resolution. Drive is ID-based, so a path
+like /Clients/Acme/2024/report.pdf costs one lookup per segment; the index
+keeps resolved prefixes in a trie so repeat resolutions cost no lookups and
+new paths only pay for the segments not seen before.
+"""
+
+import time
+import difflib
+import threading
+
+from drive_backend import DriveNotFoundError, split_path
+
+
+class _Entry:
+    __slots__ = ('id', 'name', 'parent', 'children', 'expires')
+
+    def __init__(self, node_id, name, parent, expires=None):
+        self.id = node_id
+        self.name = name
+        self.parent = parent
+        self.children = None
+        self.expires = expires
+
+
+class PathIndex:
+    """Trie of resolved path segments -> file IDs.
+
+    lookup_child(parent_id, name) is the per-level Drive lookup (returns the
+    child ID or None); list_children(parent_id) returns child names and is
+    only used for fuzzy suggestions. MOVE/DELETE call invalidate(path), which
+    drops that prefix and everything below it; change-feed entries call
+    invalidate_id(file_id). The index is cleared if it grows past max_entries.
+
+    Changes made outside the assistant only reach the index through a change
+    feed. Without one, pass max_age so entries are looked up again after
+    that many seconds, and get_node(file_id) (returning the node, or raising
+    DriveNotFoundError) so resolve(path, verify=True) can check a cached ID
+    still has that name and parent before a DELETE or MOVE acts on it.
+    """
+
+    def __init__(self, lookup_child, list_children=None, root_id='root', max_entries=1_000_000,
+                 max_age=None, get_node=None, clock=time.monotonic):
+        self.lookup_child = lookup_child
+        self.list_children = list_children
+        self.root_id = root_id
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.get_node = get_node
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.lookups = 0
+        self._reset()
+
+    def _reset(self):
+        self.root = _Entry(self.root_id, '', None)
+        self.by_id = {self.root_id: self.root}
+
+    def __len__(self):
+        return len(self.by_id) - 1
+
+    def resolve(self, path, verify=False):
+        """Return the file ID for path; raises DriveNotFoundError. With verify,
+        a cached ID is checked against Drive (see get_node) before it is returned."""
+        parts = split_path(path)
+        now = self.clock() if self.max_age is not None else None
+        with self.lock:
+            entry = self.root
+            depth = 0
+            for name in parts:
+                child = entry.children.get(name) if entry.children else None
+                if child is None or (now is not None and child.expires < now):
+                    break
+                entry = child
+                depth += 1
+            if depth == len(parts) and not (verify and parts and self.get_node is not None):
+                self.hits += 1
+                return entry.id
+            generation = self.generation
+        if depth == len(parts):
+            if self._current(entry):
+                with self.lock:
+                    self.hits += 1
+                return entry.id
+            # Renamed, moved or deleted behind our back: look the last segment up again
+            with self.lock:
+                self.generation += 1
+                self._detach(entry)
+                generation = self.generation
+            entry = entry.parent
+            depth -= 1
+        node_id = entry.id
+        for name in parts[depth:]:
+            child_id = self.lookup_child(node_id, name)
+            self.lookups += 1
+            if child_id is None:
+                raise DriveNotFoundError(path)
+            with self.lock:
+                if generation == self.generation:
+                    entry = self._add(entry, name, child_id)
+                    generation = self.generation
+            node_id = child_id
+        return node_id
+
+    def _current(self, entry):
+        """True if Drive still has entry's file under that name and parent"""
+        try:
+            node = self.get_node(entry.id)
+        except DriveNotFoundError:
+            return False
+        return node.name == entry.name and node.parent == entry.parent.id
+
+    def _add(self, parent, name, node_id):
+        if len(self.by_id) > self.max_entries:
+            self._reset()
+            self.generation += 1
+            return _Entry(node_id, name, None)
+        expires = self.clock() + self.max_age if self.max_age is not None else None
+        entry = _Entry(node_id, name, parent, expires)
+        if parent.children is None:
+            parent.children = {}
+        elif name in parent.children:
+            # An expired entry being refreshed: drop it and what was cached below it
+            self._detach(parent.children[name])
+        parent.children[name] = entry
+        self.by_id[node_id] = entry
+        return entry
+
+    def _detach(self, entry):
+        if entry.parent is not None and entry.parent.children:
+            entry.parent.children.pop(entry.name, None)
+        stack = [entry]
+        while stack:
+            current = stack.pop()
+            if self.by_id.get(current.id) is current:
+                del self.by_id[current.id]
+            if current.children:
+                stack.extend(current.children.values())
+
+    def invalidate(self, path):
+        """Forget path and every cached path below it"""
+        with self.lock:
+            self.generation += 1
+            entry = self.root
+            for name in split_path(path):
+                entry = entry.children.get(name) if entry.children else None
+                if entry is None:
+                    return
+            if entry is self.root:
+                self._reset()
+            else:
+                self._detach(entry)
+
+    def invalidate_id(self, file_id):
+        """Forget whatever path file_id was cached under (change-feed refresh)"""
+        with self.lock:
+            self.generation += 1
+            entry = self.by_id.get(file_id)
+            if entry is not None and entry is not self.root:
+                self._detach(entry)
+
+    def apply_changes(self, changes):
+        """Invalidate entries for a batch of change-feed records ({'file_id': ...})"""
+        for change in changes:
+            self.invalidate_id(change['file_id'])
+
+    def suggest(self, path, cutoff=0.75):
+        """Return the closest existing path, matching segments case-insensitively
+        and then by similarity; None if no segment can be matched"""
+        if self.list_children is None:
+            return None
+        node_id = self.root_id
+        corrected = []
+        for name in split_path(path):
+            child_id = self.lookup_child(node_id, name)
+            if child_id is None:
+                names = list(self.list_children(node_id))
+                folded = name.casefold()
+                matches = [candidate for candidate in names if candidate.casefold() == folded]
+                if not matches:
+                    matches = difflib.get_close_matches(name, names, n=1, cutoff=cutoff)
+                if not matches:
+                    return None
+                name = matches[0]
+                child_id = self.lookup_child(node_id, name)
+            corrected.append(name)
+            node_id = child_id
+        return '/' + '/'.join(corrected)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Rate Limiting
+Token-bucket admission control in front of process_message (per sender and
+command class, since SUMMARY costs far more than HELP) and token buckets that
+shape outbound calls to Drive and the summarizer so one chatty sender or a
+retry storm cannot use up the shared API quotas.
+"""
+
+import math
+import time
+import heapq
+import threading
+from collections import OrderedDict
+
+from drive_backend import LatencyDriveBackend
+from summary_pipeline import Summarizer
+
+# Command class -> (tokens per second, burst)
+DEFAULT_LIMITS = {
+    'cheap': (1.0, 20),
+    'standard': (0.5, 10),
+    'costly': (1 / 30, 3),
+}
+
+COMMAND_CLASSES = {
+    'HELP': 'cheap',
+    'MORE': 'cheap',
+    'LIST': 'standard',
+    'SEARCH': 'standard',
+    'DELETE': 'standard',
+    'MOVE': 'standard',
+    'SUMMARY': 'costly',
+}
+
+
+def command_class(verb):
+    """Admission class of a command verb; anything unlisted (CONFIRM, unknown
+    verbs) only costs a local reply"""
+    return COMMAND_CLASSES.get(verb, 'cheap')
+
+
+def parse_limits(spec, defaults=DEFAULT_LIMITS):
+    """Parse 'costly=2/60,standard=30/60' (requests per seconds, burst = requests)
+    over the defaults; raises ValueError on a malformed entry"""
+    limits = dict(defaults)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        count, _, period = value.partition('/')
+        try:
+            count, period = float(count), float(period or 1)
+        except ValueError:
+            raise ValueError(f"Cannot read rate limit {item!r} (e.g., costly=2/60)")
+        if count <= 0 or period <= 0:
+            raise ValueError(f"Rate limit {item!r} must be positive")
+        limits[name.strip().lower()] = (count / period, max(count, 1))
+    return limits
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to capacity.
+
+    reserve() may go into debt by up to max_wait seconds of refill: the
+    caller is then told how long to wait, which is how requests are deferred
+    in order instead of retrying in a loop.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens=1, max_wait=0.0):
+        """Return (granted, wait): wait is the delay before a granted call may run,
+        or the retry-after of a refused one"""
+        with self.lock:
+            self._refill(self.clock())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True, 0.0
+            wait = (tokens - self.tokens) / self.rate
+            if wait > max_wait:
+                return False, wait
+            self.tokens -= tokens
+            return True, wait
+
+    def take(self, tokens=1, timeout=None):
+        """Block until tokens are available; False if that would exceed timeout"""
+        granted, wait = self.reserve(tokens, math.inf if timeout is None else timeout)
+        if granted and wait:
+            time.sleep(wait)
+        return granted
+
+
+class StoreTokenBucket:
+    """TokenBucket whose state lives under key in a shared_state.Store, so
+    every worker process draws from the same bucket. The key expires once
+    the bucket would be full again anyway."""
+
+    def __init__(self, store, key, rate, capacity, clock=time.time):
+        self.store = store
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+
+    def reserve(self, tokens=1, max_wait=0.0):
+        """TokenBucket.reserve, as one atomic update of the stored (tokens, updated)"""
+        now = self.clock()
+        outcome = []
+
+        def reserve(state):
+            level = self.capacity if state is None else min(
+                self.capacity, state[0] + max(0.0, now - state[1]) * self.rate)
+            if level >= tokens:
+                outcome.append((True, 0.0))
+                return [level - tokens, now]
+            wait = (tokens - level) / self.rate
+            if wait > max_wait:
+                outcome.append((False, wait))
+                return [level, now]
+            outcome.append((True, wait))
+            return [level - tokens, now]
+        self.store.update(self.key, reserve, ttl=self.capacity / self.rate + max_wait + 1)
+        # update() may retry func (Redis WATCH); the last call is the one stored
+        return outcome[-1]
+
+
+class Admission:
+    """Outcome of AdmissionController.admit"""
+
+    __slots__ = ('command_class', 'allowed', 'delay', 'retry_after')
+
+    def __init__(self, command_class, allowed, delay=0.0, retry_after=0.0):
+        self.command_class = command_class
+        self.allowed = allowed
+        self.delay = delay
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per (sender, command class) token buckets.
+
+    A request over its sender's limit is deferred (admitted with a delay)
+    when its turn comes within max_defer seconds and fewer than max_deferred
+    requests are already waiting; otherwise it is rejected with a
+    retry-after. Buckets are kept for the max_buckets most recent senders.
+    With store (a shared_state.Store) the buckets live there, so a sender's
+    limit holds across worker processes; the deferred-request cap stays per
+    worker.
+    """
+
+    def __init__(self, limits=None, max_defer=5.0, max_deferred=1000, max_buckets=100_000,
+                 clock=time.monotonic, store=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.store = store
+        self.max_defer = max_defer
+        self.max_deferred = max_deferred
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self._deferred = []  # heap of times at which deferred requests run
+        self.counters = {name: {'admitted': 0, 'deferred': 0, 'rejected': 0} for name in self.limits}
+
+    def _bucket(self, key, limit):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if self.store is not None:
+                bucket = StoreTokenBucket(self.store, f"bucket:{key[0]}:{key[1]}", *limit)
+            else:
+                bucket = TokenBucket(*limit, clock=self.clock)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, sender, verb):
+        name = command_class(verb)
+        limit = self.limits.get(name)
+        if limit is None:
+            return Admission(name, True)
+        now = self.clock()
+        with self.lock:
+            bucket = self._bucket((sender, name), limit)
+            while self._deferred and self._deferred[0] <= now:
+                heapq.heappop(self._deferred)
+            max_wait = self.max_defer if len(self._deferred) < self.max_deferred else 0.0
+            granted, wait = bucket.reserve(1, max_wait)
+            counters = self.counters[name]
+            if not granted:
+                counters['rejected'] += 1
+                return Admission(name, False, retry_after=wait)
+            if wait:
+                heapq.heappush(self._deferred, now + wait)
+                counters['deferred'] += 1
+            else:
+                counters['admitted'] += 1
+            return Admission(name, True, delay=wait)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'classes': {name: dict(counters) for name, counters in self.counters.items()},
+                'buckets': len(self.buckets),
+                'deferred_waiting': sum(1 for at in self._deferred if at > self.clock()),
+            }
+
+
+class RateLimitedDriveBackend(LatencyDriveBackend):
+    """Wraps a backend so every Drive call first takes a token from bucket"""
+
+    def __init__(self, backend, bucket):
+        super().__init__(backend, latency=0)
+        self.bucket = bucket
+
+    def _delay(self):
+        self.calls += 1
+        self.bucket.take()
+
+
+class RateLimitedSummarizer(Summarizer):
+    """Wraps a summarizer so every model call first takes a token from bucket"""
+
+    def __init__(self, summarizer, bucket):
+        self.summarizer = summarizer
+        self.bucket = bucket
+        self.model = summarizer.model
+
+    def summarize(self, text):
+        self.bucket.take()
+        return self.summarizer.summarize(text)
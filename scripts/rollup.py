@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Recursive SUMMARY Rollups
+SUMMARY /folder RECURSIVE summarizes a folder tree bottom-up: each folder's
+rollup combines the summaries of its documents and of its subfolders'
+rollups. Rollups are stored per folder and reused until something below
+them changes; a change invalidates only the rollups on the path from the
+changed item up to the root, so re-running after an edit re-summarizes one
+branch instead of the whole tree.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from drive_backend import DriveError, join_path, parent_path
+from listing_cache import normalize_path
+from summary_pipeline import SummaryReport
+
+
+def _ancestors(path):
+    """path and every folder above it, up to '/'"""
+    path = normalize_path(path)
+    result = [path]
+    while path != '/':
+        path = parent_path(path)
+        result.append(path)
+    return result
+
+
+class FolderRollup:
+    """Summary of a folder tree. items are the folder's direct entries as
+    (name, summary, error, is_folder); documents and folders count the whole
+    tree, and reused is how many of its folder rollups came from the store.
+    Only complete rollups (no folder below failed to list or timed out) are
+    stored."""
+
+    __slots__ = ('path', 'summary', 'items', 'documents', 'folders', 'complete', 'reused')
+
+    def __init__(self, path, summary, items, documents, folders, complete=True, reused=0):
+        self.path = path
+        self.summary = summary
+        self.items = items
+        self.documents = documents
+        self.folders = folders
+        self.complete = complete
+        self.reused = reused
+
+
+class RollupStore:
+    """(folder path, model) -> FolderRollup, stored in SQLite.
+
+    Rollups older than max_age seconds are recomputed, for Drives whose
+    changes are not fed to invalidate(). Every invalidation is also recorded
+    with its time, per folder, in the same database (so in every process
+    sharing it): put() skips a rollup if its folder was invalidated after the
+    rollup's computation started. Records older than keep_invalidations
+    seconds, longer than any computation runs, are pruned.
+    """
+
+    def __init__(self, path=':memory:', max_age=None, keep_invalidations=3600):
+        self.path = path
+        self.max_age = max_age
+        self.keep_invalidations = keep_invalidations
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS rollups (
+                               path TEXT NOT NULL,
+                               model TEXT NOT NULL,
+                               summary TEXT,
+                               items TEXT NOT NULL,
+                               documents INTEGER NOT NULL,
+                               folders INTEGER NOT NULL,
+                               created REAL NOT NULL,
+                               PRIMARY KEY (path, model))''')
+        # tree = 1: the folder and everything below it changed; 0: only the folder's own rollup
+        self.db.execute('''CREATE TABLE IF NOT EXISTS rollup_invalidations (
+                               path TEXT NOT NULL,
+                               tree INTEGER NOT NULL,
+                               invalidated REAL NOT NULL,
+                               PRIMARY KEY (path, tree))''')
+        self._recorded = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, path, model):
+        path = normalize_path(path)
+        with self.lock:
+            row = self.db.execute('SELECT summary, items, documents, folders, created FROM rollups '
+                                  'WHERE path = ? AND model = ?', (path, model)).fetchone()
+            if row is None or (self.max_age is not None and time.time() - row[4] > self.max_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+        summary, items, documents, folders, _created = row
+        return FolderRollup(path, summary, [tuple(item) for item in json.loads(items)],
+                            documents, folders, reused=folders + 1)
+
+    def put(self, rollup, model, started=None):
+        """Store a complete rollup; pass the time.time() read before computing it
+        to skip a rollup made stale by an invalidation since"""
+        if not rollup.complete:
+            return
+        path = normalize_path(rollup.path)
+        ancestors = _ancestors(path)
+        with self.lock:
+            if started is not None:
+                invalidated = self.db.execute(
+                    'SELECT MAX(invalidated) FROM rollup_invalidations WHERE (path = ? AND tree = 0) '
+                    f'OR (tree = 1 AND path IN ({",".join("?" * len(ancestors))}))',
+                    [path] + ancestors).fetchone()[0]
+                if invalidated is not None and invalidated >= started:
+                    return
+            self.db.execute('INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (path, model, rollup.summary, json.dumps(rollup.items),
+                             rollup.documents, rollup.folders, time.time()))
+
+    def _record(self, paths, tree):
+        # Called with the lock held
+        now = time.time()
+        self.db.executemany('INSERT OR REPLACE INTO rollup_invalidations VALUES (?, ?, ?)',
+                            [(path, tree, now) for path in paths])
+        self._recorded += 1
+        if self._recorded % 1000 == 0:
+            self.db.execute('DELETE FROM rollup_invalidations WHERE invalidated < ?',
+                            (now - self.keep_invalidations,))
+
+    def invalidate(self, path):
+        """Drop the rollups of a folder and of every folder above it (something in path changed)"""
+        stale = _ancestors(path)
+        with self.lock:
+            self._record(stale, 0)
+            deleted = self.db.execute(f'DELETE FROM rollups WHERE path IN ({",".join("?" * len(stale))})',
+                                      stale).rowcount
+            self.invalidations += deleted
+
+    def invalidate_tree(self, path):
+        """Drop the rollups of a folder and everything below it (the folder was moved or deleted)"""
+        path = normalize_path(path)
+        prefix = path.rstrip('/') + '/'
+        with self.lock:
+            self._record([path], 1)
+            deleted = self.db.execute("DELETE FROM rollups WHERE path = ? OR substr(path, 1, ?) = ?",
+                                      (path, len(prefix), prefix)).rowcount
+            self.invalidations += deleted
+
+    def clear(self):
+        with self.lock:
+            self._record(['/'], 1)
+            self.db.execute('DELETE FROM rollups')
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM rollups').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class RecursiveSummary:
+    """Builds rollups for a folder tree through a SummaryPipeline.
+
+    The tree is walked top-down one level at a time, stopping at folders
+    with a stored rollup, then the remaining folders are summarized
+    bottom-up, a level at a time so every subfolder's rollup is ready before
+    its parent's. Listing and summarizing folders run on one pool of
+    concurrency threads shared by every RECURSIVE command, which caps the
+    folders being worked on at once across all senders.
+    """
+
+    def __init__(self, pipeline, store, list_folder=None, concurrency=4, metrics=None):
+        self.pipeline = pipeline
+        self.summarizer = pipeline.summarizer
+        self.store = store
+        self.list_folder = list_folder or pipeline.list_folder
+        self.metrics = metrics
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='summary-rollup')
+
+    def _in_pool(self, func, items):
+        if self.metrics is None:
+            return list(self.pool.map(func, items))
+        trace = self.metrics.current()
+
+        def call(item):
+            self.metrics.attach(trace)
+            try:
+                return func(item)
+            finally:
+                self.metrics.attach(None)
+        return list(self.pool.map(call, items))
+
+    def _walk(self, path):
+        """(stored rollup, None, None) or (None, subfolder names, listing error)"""
+        rollup = self.store.get(path, self.summarizer.model)
+        if rollup is not None:
+            return rollup, None, None
+        try:
+            return None, [node.name for node in self.list_folder(path) if node.is_folder], None
+        except DriveError as e:
+            return None, [], str(e)
+
+    def _combine(self, path, report, subfolders, error):
+        """Rollup of one folder from its documents' report and its subfolders' rollups"""
+        items = [(node.name, summary, problem, False) for node, summary, problem in report.items()]
+        items += [(node.name, None, 'not summarized yet', False) for node in report.pending]
+        items += [(name, rollup.summary, None if rollup.complete else 'incomplete', True)
+                  for name, rollup in subfolders]
+        complete = error is None and not report.timed_out \
+            and all(rollup.complete for _name, rollup in subfolders)
+        lines = [f"{name}{'/' if is_folder else ''}: {summary}"
+                 for name, summary, _error, is_folder in items if summary]
+        summary = self.summarizer.summarize('\n'.join(lines)) if lines else None
+        return FolderRollup(path, summary, items,
+                            len(report.documents) + sum(rollup.documents for _name, rollup in subfolders),
+                            len(subfolders) + sum(rollup.folders for _name, rollup in subfolders),
+                            complete, sum(rollup.reused for _name, rollup in subfolders))
+
+    def run(self, folder_path, progress=None):
+        """Rollup of folder_path; raises DriveError if it cannot be listed.
+        progress(done, total) is called as each folder that needed work finishes."""
+        folder_path = normalize_path(folder_path)
+        started = time.time()
+        rollup = self.store.get(folder_path, self.summarizer.model)
+        if rollup is not None:
+            return rollup
+        rollups = {}
+        children = {folder_path: [join_path(folder_path, node.name)
+                                  for node in self.list_folder(folder_path) if node.is_folder]}
+        errors = {folder_path: None}
+        levels = [[folder_path]]
+        frontier = children[folder_path]
+        while frontier:
+            level = []
+            for path, (rollup, names, error) in zip(frontier, self._in_pool(self._walk, frontier)):
+                if rollup is not None:
+                    rollups[path] = rollup
+                    continue
+                children[path] = [join_path(path, name) for name in names]
+                errors[path] = error
+                level.append(path)
+            levels.append(level)
+            frontier = [child for path in level for child in children[path]]
+
+        total = sum(len(level) for level in levels)
+        done = [0]
+        lock = threading.Lock()
+
+        def summarize(path):
+            if errors[path] is not None:
+                report = SummaryReport(path, [])
+            else:
+                try:
+                    report = self.pipeline.run(path)
+                except DriveError as e:
+                    report, errors[path] = SummaryReport(path, []), str(e)
+            subfolders = [(child.rsplit('/', 1)[-1], rollups[child]) for child in children[path]]
+            rollup = self._combine(path, report, subfolders, errors[path])
+            self.store.put(rollup, self.summarizer.model, started)
+            with lock:
+                done[0] += 1
+                if progress is not None:
+                    progress(done[0], total)
+            return rollup
+
+        for level in reversed(levels):
+            for path, rollup in zip(level, self._in_pool(summarize, level)):
+                rollups[path] = rollup
+        return rollups[folder_path]
@@ -7,68 +7,380 @@ This script provides options to run the test in different modes.
 import sys
 import os
 import json
+import math
 import time
+import atexit
+import shutil
+import argparse
+import tempfile
 import threading
+import importlib.util
 from datetime import datetime
 
-# Try to import optional dependencies
-try:
-    import flask
-    from flask import Flask, render_template_string, request, jsonify
-    FLASK_AVAILABLE = True
-except ImportError:
-    FLASK_AVAILABLE = False
+# Optional dependencies are only located here; each mode imports what it
+# needs when it starts, so terminal and server mode never pay for Flask or tkinter
+FLASK_AVAILABLE = importlib.util.find_spec('flask') is not None
+TKINTER_AVAILABLE = importlib.util.find_spec('tkinter') is not None
 
-try:
-    import tkinter as tk
-    from tkinter import ttk, scrolledtext
-    TKINTER_AVAILABLE = True
-except ImportError:
-    TKINTER_AVAILABLE = False
+from audit import AuditLog
+from commands import CommandRegistry, join, parse
+from extract import TextExtractor
+from drive_backend import (
+    DriveError, DriveNotFoundError, crawl, demo_backend, escape_glob, format_size, has_magic, parent_path,
+    split_path,
+)
+from listing_cache import ListingCache
+from chunked_summary import ChunkedSummarizer
+from metrics import InstrumentedDriveBackend, InstrumentedSummarizer, Metrics
+from paging import PageCursor, render_pages
+from idempotency import IdempotencyStore
+from jobs import JobQueue
+from path_index import PathIndex
+from rollup import RecursiveSummary, RollupStore
+from rate_limit import AdmissionController, RateLimitedDriveBackend, RateLimitedSummarizer, TokenBucket, parse_limits
+from search_index import SearchIndex, parse_query
+from sessions import SessionManager
+from shared_drive import SQLiteDriveBackend
+from shared_state import open_store
+from summary_cache import SummaryCache
+from summary_pipeline import ExtractiveSummarizer, SummaryPipeline
+from sync import DriveSnapshot, DriveSync, SyncedDriveBackend
+
+CONFIRMATION_KEYWORD = os.environ.get('CONFIRMATION_KEYWORD', 'CONFIRM').upper()
+CONFIRMATION_WINDOW = 300  # seconds a pending DELETE waits for CONFIRM
+MAX_FILES_PER_OPERATION = int(os.environ.get('MAX_FILES_PER_OPERATION', 50))
+BULK_REPORT_LINES = 10
+SEARCH_RESULT_LIMIT = 50
+INVALIDATION_CHANNEL = 'invalidations'
+LOCK_FREE_COMMANDS = ('STATUS',)  # answered without waiting for the sender's running job
+LOCAL_SENDER = 'local'  # sender of terminal messages and of handlers called directly
+
+def format_duration(seconds):
+    """30 -> '30s', 125 -> '2m 5s'"""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+def _outcome(response):
+    """Outcome label of a reply: error replies start with ❌, queued jobs with ⏳"""
+    if response.startswith('❌'):
+        return 'error'
+    if response.startswith('⏳'):
+        return 'queued'
+    return 'ok'
 
 class WhatsAppDriveAssistant:
-    def __init__(self):
-        self.audit_log = []
+    def __init__(self, backend=None, audit_log=None, sessions=None, listing_cache=None,
+                 summarizer=None, summary_cache=None, sync=None, admission=None,
+                 idempotency=None, metrics=None, store=None):
+        # METRICS_SAMPLE_RATE: share of messages whose per-stage spans are recorded
+        self.metrics = metrics if metrics is not None else Metrics(
+            sample_rate=float(os.environ.get('METRICS_SAMPLE_RATE', 1.0)))
+        # SHARED_STATE: store for what every worker process must see (one worker: in-process);
+        # WORKER_ID: this process's number when run_server starts several
+        self.store = store if store is not None else open_store(os.environ.get('SHARED_STATE', ''))
+        shared = self.store if self.store.shared else None
+        self.worker_id = os.environ.get('WORKER_ID') or None
+        self.origin = f"{os.getpid()}-{id(self):x}"
+        self.remote_invalidations = 0
+        if audit_log is None:
+            audit_log = AuditLog(directory=os.environ.get('AUDIT_LOG_DIR') or None,
+                                 writer=self.worker_id and f"w{self.worker_id}")
+        self.audit_log = audit_log
         self.simulation_mode = True
+        if backend is None and os.environ.get('DRIVE_DEMO_PATH'):
+            # Demo tree in an SQLite file, so every worker process sees the same Drive
+            backend = SQLiteDriveBackend.demo(os.environ['DRIVE_DEMO_PATH'])
+        self.backend = backend if backend is not None else demo_backend()
+        if os.environ.get('DRIVE_RATE_LIMIT'):
+            # Calls per second to Drive, shared by every sender
+            rate = float(os.environ['DRIVE_RATE_LIMIT'])
+            self.backend = RateLimitedDriveBackend(self.backend, TokenBucket(rate, max(rate, 1)))
+        if sync is None and os.environ.get('DRIVE_SNAPSHOT_PATH'):
+            sync = DriveSync(self.backend, DriveSnapshot(os.environ['DRIVE_SNAPSHOT_PATH'],
+                                                         root_id=self.backend.ROOT_ID),
+                             interval=float(os.environ.get('DRIVE_SYNC_INTERVAL', 30)))
+        self.sync = sync
+        if sync is not None:
+            # Reads come from the local snapshot, writes go through to Drive
+            sync.listeners.append(self.apply_drive_changes)
+            self.backend = SyncedDriveBackend(sync)
+        self.backend = InstrumentedDriveBackend(self.backend, self.metrics)
+        self.sessions = sessions if sessions is not None else SessionManager(store=shared)
+        self.idempotency = idempotency if idempotency is not None else IdempotencyStore(
+            ttl=float(os.environ.get('DEDUP_WINDOW', 3600)), store=shared,
+            lease=float(os.environ.get('DEDUP_LEASE', 30)))
+        self.listing_cache = listing_cache if listing_cache is not None else ListingCache(
+            ttl=float(os.environ.get('LIST_CACHE_TTL', 60)))
+        # Edits made in Drive directly reach the index through the change feed; without
+        # one, entries expire. DELETE / MOVE check a cached ID against Drive either way
+        self.path_index = PathIndex(self.backend.lookup_child, self.backend.list_child_names,
+                                    root_id=self.backend.ROOT_ID, get_node=self.backend.get_by_id,
+                                    max_age=(None if sync is not None
+                                             else float(os.environ.get('PATH_INDEX_TTL', 300))))
+        self.search_index = SearchIndex(root_id=self.backend.ROOT_ID)
+        self._local = threading.local()
+        self.summarizer = summarizer if summarizer is not None else ExtractiveSummarizer()
+        if os.environ.get('OPENAI_RATE_LIMIT'):
+            rate = float(os.environ['OPENAI_RATE_LIMIT'])
+            self.summarizer = RateLimitedSummarizer(self.summarizer, TokenBucket(rate, max(rate, 1)))
+        self.summarizer = InstrumentedSummarizer(self.summarizer, self.metrics)
+        if summary_cache is None:
+            summary_cache = SummaryCache(os.environ.get('SUMMARY_CACHE_PATH') or ':memory:')
+        self.summary_cache = summary_cache
+        # Documents over SUMMARY_CHUNK_TOKENS are summarized chunk by chunk, each chunk cached
+        self.summarizer = ChunkedSummarizer(
+            self.summarizer, cache=self.summary_cache,
+            chunk_tokens=int(os.environ.get('SUMMARY_CHUNK_TOKENS', 3000)), metrics=self.metrics)
+        self.admission = admission if admission is not None else AdmissionController(
+            parse_limits(os.environ.get('RATE_LIMITS', '')), store=shared)
+        self.summary_pipeline = SummaryPipeline(
+            self.backend, self.summarizer, list_folder=self.list_folder, cache=self.summary_cache,
+            deadline=float(os.environ.get('SUMMARY_DEADLINE', 60)),
+            text_sink=lambda node, text: self.search_index.add_text(node.id, text), metrics=self.metrics,
+            extractor=TextExtractor(
+                max_tokens=int(os.environ.get('SUMMARY_MAX_TOKENS', 100000)),
+                memory_budget=int(float(os.environ.get('EXTRACT_MEMORY_BUDGET_MB', 8)) * 1024 * 1024)))
+        # SUMMARY /folder RECURSIVE: folder rollups live next to the summary cache
+        max_age = float(os.environ.get('ROLLUP_MAX_AGE', 86400))
+        self.rollups = RecursiveSummary(
+            self.summary_pipeline, RollupStore(self.summary_cache.path, max_age=max_age or None),
+            concurrency=int(os.environ.get('ROLLUP_CONCURRENCY', 4)), metrics=self.metrics)
+        # Other workers' DELETE / MOVE invalidations arrive here
+        self.store.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+        if sync is not None:
+            sync.start()
+        self.jobs = None
+        self.metrics.collectors.append(self.collect_metrics)
+        self.commands = CommandRegistry(unknown_handler=self.handle_unknown)
+        self.register_command('HELP', self.handle_help)
+        self.register_command('LIST', self.handle_list)
+        self.register_command('DELETE', self.handle_delete)
+        self.register_command('MOVE', self.handle_move)
+        self.register_command('SUMMARY', self.handle_summary)
+        self.register_command('SEARCH', self.handle_search,
+                              help_text="SEARCH terms [in /folder] [type:pdf] [modified:>2024-01-01] - Find files")
+        self.register_command('MORE', self.handle_more,
+                              help_text="MORE - Show the next page of a long LIST or SEARCH")
+        self.register_command('STATUS', self.handle_status,
+                              help_text="STATUS [job] - Progress of your long-running commands")
+        self.register_command(CONFIRMATION_KEYWORD, self.handle_confirm,
+                              help_text=f"{CONFIRMATION_KEYWORD} - Confirm your pending DELETE")
+        
+    def start_jobs(self, path=':memory:', notify=None, workers=2):
+        """Run long commands (SUMMARY, bulk MOVE / DELETE) as queued jobs from now on"""
+        self.jobs = JobQueue(path, runner=self.run_job, notify=notify, workers=workers, owner=self.worker_id,
+                             max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+                             retention=float(os.environ.get('JOB_RETENTION_DAYS', 7)) * 86400).start()
+        return self.jobs
+        
+    def close(self):
+        """Shut down cleanly: finish running jobs, stop Drive sync, flush the
+        audit log to disk and close the stores. Safe to call more than once."""
+        if getattr(self, '_closed', False):
+            return
+        self._closed = True
+        if self.jobs is not None:
+            self.jobs.close()
+        if self.sync is not None:
+            self.sync.stop()
+            self.sync.snapshot.close()
+        self.audit_log.close()
+        self.rollups.pool.shutdown()
+        self.rollups.store.close()
+        self.summarizer.pool.shutdown()
+        self.summary_cache.close()
+        self.store.close()
+        
+    def run_job(self, job, progress):
+        """Execute a queued job's command (called on a job worker thread)"""
+        command, args = parse(job.message)
+        label = self.command_label(command)
+        start = time.perf_counter()
+        trace = self.metrics.begin(label, job.sender)
+        outcome = 'exception'
+        # Under the session lock, so the job does not interleave with the
+        # sender's other commands (which wait for it, apart from STATUS)
+        session = self.sessions.get(job.sender)
+        with self.metrics.span('session_wait'):
+            session.lock.acquire()
+        self._local.session = session
+        self._local.progress = progress
+        try:
+            with self.metrics.span('handler'):
+                response = self.commands.dispatch(command, args)
+            outcome = _outcome(response)
+            return response
+        finally:
+            self._local.session = None
+            self._local.progress = None
+            session.lock.release()
+            self._record(trace, label, outcome, time.perf_counter() - start, 'job')
+        
+    def _enqueue(self, tokens):
+        """Queue a long command unless already running as a job; returns the
+        acknowledgement, or None to run it inline"""
+        if self.jobs is None or getattr(self._local, 'progress', None) is not None:
+            return None
+        job_id = self.jobs.submit(self.session.sender, join(tokens))
+        return (f"⏳ Working on it, job #{job_id}. I'll send the result here when it's done "
+                f"(or send STATUS {job_id}).")
+        
+    def _progress(self, text):
+        progress = getattr(self._local, 'progress', None)
+        if progress is not None:
+            progress(text)
+        
+    def register_command(self, verb, handler, help_text=None):
+        """Add (or replace) the handler for a command verb"""
+        return self.commands.register(verb, handler, help_text=help_text)
+        
+    @property
+    def session(self):
+        """Session of the sender whose message is being processed; a handler
+        called directly (outside process_message) gets the local sender's"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.sessions.get(LOCAL_SENDER)
+        return session
         
     def log_operation(self, operation, details):
         """Log an operation for audit purposes"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'operation': operation,
-            'details': details
-        }
-        self.audit_log.append(log_entry)
-        return log_entry
+        return self.audit_log.append(operation, details)
         
     def parse_command(self, message_body):
         """Parse WhatsApp message and extract command"""
-        message_body = message_body.strip().upper()
-        parts = message_body.split()
+        command, args = parse(message_body)
+        return {'command': command, 'args': args}
         
-        if not parts:
-            return {'command': 'UNKNOWN', 'args': []}
-            
-        command = parts[0]
-        args = parts[1:] if len(parts) > 1 else []
+    def _by_id(self, call, path, *related, verify=False):
+        """call(file ID of path), resolved through the path index (with verify, a
+        cached ID is checked first; see PathIndex). If Drive no longer knows a cached
+        ID (the tree changed outside the assistant), path and related are dropped
+        from the index and call is retried once on a fresh resolution."""
+        file_id = self.path_index.resolve(path, verify=verify)
+        try:
+            return call(file_id)
+        except DriveNotFoundError:
+            for stale in (path, *related):
+                self.path_index.invalidate(stale)
+        return call(self.path_index.resolve(path))
         
-        return {'command': command, 'args': args}
+    def _resolve_ids(self, paths):
+        """({path: file ID}, {path: error}) through the path index, checked
+        against Drive before a bulk DELETE or MOVE"""
+        ids, failed = {}, {}
+        for path in paths:
+            try:
+                ids[path] = self.path_index.resolve(path, verify=True)
+            except DriveError as e:
+                failed[path] = e
+        return ids, failed
+        
+    @staticmethod
+    def _by_path(ids, results):
+        """Key a *_many_by_id result by the paths in ids again"""
+        paths = {file_id: path for path, file_id in ids.items()}
+        # "<file ID> not found" means the path is gone
+        return {paths[file_id]: DriveNotFoundError(paths[file_id]) if isinstance(value, DriveNotFoundError)
+                else value for file_id, value in results.items()}
+        
+    def _destination(self, destination):
+        """(folder ID, new name) for a MOVE destination: an existing folder (new name
+        None) or a new name inside one (a rename)"""
+        try:
+            return self.path_index.resolve(destination, verify=True), None
+        except DriveNotFoundError:
+            return (self.path_index.resolve(parent_path(destination), verify=True),
+                    split_path(destination)[-1])
+        
+    def list_folder(self, folder_path):
+        """List a folder through the listing cache"""
+        files = self.listing_cache.get(folder_path)
+        if files is None:
+            generation = self.listing_cache.generation
+            files = self._by_id(self.backend.list_folder_by_id, folder_path)
+            self.listing_cache.put(folder_path, files, generation)
+        return files
+        
+    def apply_drive_changes(self, changes):
+        """Invalidate cached paths and listings for a batch of synced Drive changes"""
+        if changes is None:
+            # Full re-crawl: nothing cached can be trusted
+            self.path_index.invalidate('/')
+            self.listing_cache.clear()
+            self.rollups.store.clear()
+            self.search_index.built = False
+            return
+        if self.search_index.built:
+            self.search_index.apply_changes(changes)
+        for change in changes:
+            self.path_index.invalidate_id(change['file_id'])
+            for path in (change['old_path'], change['path']):
+                if path is None:
+                    continue
+                self.listing_cache.invalidate(parent_path(path))
+                self.rollups.store.invalidate(parent_path(path))
+                if change['is_folder']:
+                    self.listing_cache.invalidate_tree(path)
+                    self.rollups.store.invalidate_tree(path)
+        
+    def iter_folder(self, folder_path, max_cached=1000):
+        """Stream a folder listing; small folders are stored in the listing cache"""
+        files = self.listing_cache.get(folder_path)
+        if files is not None:
+            yield from files
+            return
+        generation = self.listing_cache.generation
+        collected = []
+        for file in self._iter_by_id(folder_path):
+            if collected is not None:
+                collected.append(file)
+                if len(collected) > max_cached:
+                    collected = None
+            yield file
+        if collected is not None:
+            self.listing_cache.put(folder_path, collected, generation)
+        
+    def _iter_by_id(self, folder_path):
+        """Stream folder_path's children by its cached ID (see _by_id)"""
+        def first(folder_id):
+            # Taken inside _by_id so a stale ID fails where it can be retried
+            iterator = iter(self.backend.iter_folder_by_id(folder_id))
+            return next(iterator, None), iterator
+        file, rest = self._by_id(first, folder_path)
+        if file is not None:
+            yield file
+            yield from rest
+        
+    def format_error(self, error):
+        """Reply for a DriveError, suggesting the closest path for typos"""
+        message = f"❌ Error: {error}"
+        if isinstance(error, DriveNotFoundError):
+            try:
+                suggestion = self.path_index.suggest(error.path)
+            except DriveError:
+                suggestion = None
+            if suggestion and suggestion != error.path:
+                message += f"\n💡 Did you mean {suggestion}?"
+        return message
         
     def handle_help(self, args):
         """Handle HELP command"""
-        help_text = """🤖 WhatsApp-Driven Google Drive Assistant
+        extra_commands = ''.join(f"• {text}\n" for text in self.commands.help_texts.values())
+        help_text = f"""🤖 WhatsApp-Driven Google Drive Assistant
 
 Available Commands:
 • LIST /folder - List files in a folder
-• DELETE /path/to/file - Delete a file (requires CONFIRM)
-• MOVE /source /destination - Move a file
-• SUMMARY /folder - Summarize documents in a folder
-• HELP - Show this help message
+• DELETE /path/to/file [...] - Delete files (requires CONFIRM)
+• MOVE /source [...] /destination - Move files
+• SUMMARY /folder [RECURSIVE] - Summarize documents in a folder (and its subfolders)
+{extra_commands}• HELP - Show this help message
 
 Examples:
 • LIST /ProjectX
 • DELETE /ProjectX/report.pdf CONFIRM
 • MOVE /ProjectX/report.pdf /Archive
+• MOVE /ProjectX/*.pdf /Archive
 • SUMMARY /ProjectX"""
         return help_text
         
@@ -78,46 +390,277 @@ Examples:
             return "❌ Error: Please specify a folder path (e.g., LIST /ProjectX)"
             
         folder_path = args[0]
+        page_number = 1
+        if len(args) >= 3 and args[1].upper() == 'PAGE':
+            if not args[2].isdigit() or int(args[2]) < 1:
+                return f"❌ Error: Page must be a positive number (e.g., LIST {folder_path} PAGE 2)"
+            page_number = int(args[2])
+        self._forget_cursor()
+        
+        lines = (f"• {file.name}/ (Folder)" if file.is_folder
+                 else f"• {file.name} ({file.type}, {format_size(file.size)}, {file.modified})"
+                 for file in self.iter_folder(folder_path))
+        cursor = PageCursor(f"LIST {folder_path}", render_pages(f"📁 Files in {folder_path}:", lines))
+        try:
+            cursor.skip_to(page_number)
+            number, page = cursor.next_page()
+        except DriveError as e:
+            return self.format_error(e)
         self.log_operation('LIST', f"Listing files in {folder_path}")
         
-        # Simulate file listing
-        mock_files = [
-            {"name": "report.pdf", "type": "PDF", "size": "2.3MB", "modified": "2024-01-15"},
-            {"name": "presentation.pptx", "type": "PowerPoint", "size": "5.1MB", "modified": "2024-01-14"},
-            {"name": "data.xlsx", "type": "Excel", "size": "1.2MB", "modified": "2024-01-13"},
-            {"name": "notes.txt", "type": "Text", "size": "15KB", "modified": "2024-01-12"}
-        ]
-        
-        response = f"📁 Files in {folder_path}:\n"
-        for file in mock_files:
-            response += f"• {file['name']} ({file['type']}, {file['size']}, {file['modified']})\n"
-            
-        return response.strip()
+        if page is None:
+            if page_number > 1:
+                return f"❌ Error: {folder_path} has only {cursor.returned} page(s)"
+            return f"📁 {folder_path} is empty"
+        self.session.data['cursor'] = cursor
+        return self._with_more_footer(cursor, number, page)
+        
+    def _forget_cursor(self):
+        self.session.data.pop('cursor', None)
+        self.session.discard_shared('page')
+        
+    def _with_more_footer(self, cursor, number, page):
+        if not cursor.has_more():
+            self._forget_cursor()
+            return page if number == 1 else f"{page}\n(page {number}, last)"
+        # The cursor stays on this worker; the position is shared so MORE works on any worker
+        self.session.set_shared('page', {'command': cursor.command, 'next': number + 1})
+        return (f"{page}\n➡️  Page {number}. Reply MORE for page {number + 1} "
+                f"(or {cursor.command} PAGE {number + 1})")
+        
+    def handle_more(self, args):
+        """Handle MORE command (next page of the last paged reply)"""
+        position = self.session.get_shared('page')
+        if position is None:
+            self.session.data.pop('cursor', None)
+            return "❌ Nothing more to show. Send LIST /folder first."
+        cursor = self.session.data.get('cursor')
+        if cursor is None or cursor.command != position['command'] or cursor.returned + 1 != position['next']:
+            # The last page came from another worker: render this one from the command
+            return self.commands.dispatch(*parse(f"{position['command']} PAGE {position['next']}"))
+        try:
+            number, page = cursor.next_page()
+        except DriveError as e:
+            self._forget_cursor()
+            return self.format_error(e)
+        if page is None:
+            self._forget_cursor()
+            return "❌ Nothing more to show."
+        return self._with_more_footer(cursor, number, page)
+        
+    def handle_search(self, args):
+        """Handle SEARCH command"""
+        page_number = 1
+        if len(args) >= 2 and args[-2].upper() == 'PAGE' and args[-1].isdigit():
+            page_number = max(int(args[-1]), 1)
+            args = args[:-2]
+        try:
+            terms, folder, types, modified = parse_query(args)
+        except ValueError as e:
+            return f"❌ Error: {e}"
+        if not terms and not types:
+            return "❌ Error: Please specify what to search for (e.g., SEARCH report in /ProjectX type:pdf)"
+        query = ' '.join(args)
+        self._forget_cursor()
+        
+        try:
+            folder_id = self.path_index.resolve(folder) if folder else None
+            if not self.search_index.built:
+                self.search_index.build(node.to_record() for _path, node in crawl(self.backend))
+        except DriveError as e:
+            return self.format_error(e)
+        results = self.search_index.search(terms, folder_id=folder_id, types=types, modified=modified,
+                                           limit=SEARCH_RESULT_LIMIT)
+        self.log_operation('SEARCH', f"Searching for {query}")
+        
+        if not results:
+            return f"🔍 No files match {query}"
+        lines = (f"• {result.path}/ (Folder)" if result.is_folder
+                 else f"• {result.path} ({format_size(result.size)}, {result.modified})"
+                 for result in results)
+        cursor = PageCursor(f"SEARCH {query}", render_pages(f"🔍 {len(results)} match(es) for {query}:", lines))
+        cursor.skip_to(page_number)
+        number, page = cursor.next_page()
+        if page is None:
+            return f"❌ Error: SEARCH {query} has only {cursor.returned} page(s)"
+        self.session.data['cursor'] = cursor
+        return self._with_more_footer(cursor, number, page)
+        
+    def _resolve_targets(self, patterns):
+        """Expand glob patterns into paths, capped at MAX_FILES_PER_OPERATION.
+        Returns (paths, error message)."""
+        paths = []
+        for pattern in patterns:
+            if not has_magic(pattern):
+                paths.append(pattern)
+                continue
+            try:
+                matches = self.backend.glob(pattern, limit=MAX_FILES_PER_OPERATION + 1)
+            except DriveError as e:
+                return None, f"❌ Error: {e}"
+            if not matches:
+                return None, f"❌ Error: Nothing matches {pattern}"
+            paths.extend(matches)
+        # Drop duplicates and anything inside a folder that is already targeted
+        paths = list(dict.fromkeys(paths))
+        targeted = set(paths)
+        paths = [path for path in paths
+                 if not any(ancestor in targeted for ancestor in self._ancestors(path))]
+        if len(paths) > MAX_FILES_PER_OPERATION:
+            return None, (f"❌ Error: That matches more than {MAX_FILES_PER_OPERATION} items "
+                          f"(MAX_FILES_PER_OPERATION). Please narrow it down.")
+        return paths, None
+        
+    @staticmethod
+    def _ancestors(path):
+        parts = split_path(path)
+        return ['/' + '/'.join(parts[:i]) for i in range(1, len(parts))]
+        
+    def _bulk_report(self, header, done, failed):
+        """Reply for a multi-target operation, listing at most a few paths"""
+        lines = [f"✅ {header}" + (":" if done else "")]
+        lines.extend(f"• {path}" for path in list(done)[:BULK_REPORT_LINES])
+        if len(done) > BULK_REPORT_LINES:
+            lines.append(f"…and {len(done) - BULK_REPORT_LINES} more")
+        if failed:
+            lines.append(f"❌ {len(failed)} failed:")
+            lines.extend(f"• {path}: {error}" for path, error in list(failed.items())[:BULK_REPORT_LINES])
+            if len(failed) > BULK_REPORT_LINES:
+                lines.append(f"…and {len(failed) - BULK_REPORT_LINES} more")
+        return "\n".join(lines)
         
     def handle_delete(self, args):
         """Handle DELETE command"""
         if not args:
             return "❌ Error: Please specify a file path (e.g., DELETE /ProjectX/report.pdf)"
             
-        file_path = args[0]
+        confirmed = len(args) >= 2 and args[-1].upper() == CONFIRMATION_KEYWORD
+        patterns = args[:-1] if confirmed else args
+        paths, error = self._resolve_targets(patterns)
+        if error:
+            return error
         
         # Check for confirmation
-        if len(args) < 2 or args[1] != 'CONFIRM':
-            return f"⚠️  To delete {file_path}, please add 'CONFIRM' to your command.\nExample: DELETE {file_path} CONFIRM"
+        if not confirmed:
+            for path in patterns:
+                if not has_magic(path):
+                    try:
+                        self._by_id(self.backend.get_by_id, path, verify=True)
+                    except DriveError as e:
+                        return self.format_error(e)
+            self.session.set_pending('DELETE', time.time(), paths=paths)
+            target = paths[0] if len(paths) == 1 else f"{len(paths)} items ({', '.join(paths[:3])}{', …' if len(paths) > 3 else ''})"
+            return (f"⚠️  To delete {target}, reply {CONFIRMATION_KEYWORD} within {CONFIRMATION_WINDOW // 60} minutes.\n"
+                    f"Or in one message: DELETE {' '.join(patterns)} {CONFIRMATION_KEYWORD}")
             
-        self.log_operation('DELETE', f"Deleting file {file_path}")
-        return f"✅ Successfully deleted {file_path}"
+        return self._delete(paths)
+        
+    def _invalidate_deleted(self, path, node):
+        self._invalidate({'op': 'deleted', 'path': path, 'id': node.id, 'is_folder': node.is_folder})
+        
+    def _invalidate(self, event):
+        """Drop this worker's cached state made stale by a DELETE or MOVE, and tell the other workers"""
+        self._apply_invalidation(event)
+        self.store.publish(INVALIDATION_CHANNEL, dict(event, origin=self.origin))
+        
+    def _on_invalidation(self, event):
+        if event.get('origin') != self.origin:
+            self._apply_invalidation(event)
+            self.remote_invalidations += 1
+        
+    def _apply_invalidation(self, event):
+        if event['op'] == 'deleted':
+            target = event['path']
+            self.path_index.invalidate(target)
+            self.search_index.remove(event['id'])
+            stale = [target]
+        else:
+            target = event['source']
+            self.path_index.invalidate(target)
+            if self.search_index.built:
+                self.search_index.update(event['record'])
+            stale = [target, event['destination']]
+        for path in stale:
+            self.listing_cache.invalidate(parent_path(path))
+            self.rollups.store.invalidate(parent_path(path))
+        if event['is_folder']:
+            self.listing_cache.invalidate_tree(target)
+            self.rollups.store.invalidate_tree(target)
+        
+    def _delete(self, paths):
+        if len(paths) > 1:
+            # The job parses its command again: escaped so a matched name like a[1].pdf stays literal
+            ack = self._enqueue(['DELETE', *map(escape_glob, paths), CONFIRMATION_KEYWORD])
+            if ack:
+                return ack
+        if len(paths) == 1:
+            file_path = paths[0]
+            try:
+                node = self._by_id(self.backend.delete_by_id, file_path, verify=True)
+            except DriveError as e:
+                return self.format_error(e)
+            self._invalidate_deleted(file_path, node)
+            self.log_operation('DELETE', f"Deleting file {file_path}")
+            return f"✅ Successfully deleted {file_path}"
+        
+        ids, failed = self._resolve_ids(paths)
+        deleted, failed_ids = self.backend.delete_many_by_id(list(ids.values()))
+        deleted = self._by_path(ids, deleted)
+        failed.update(self._by_path(ids, failed_ids))
+        for file_path, node in deleted.items():
+            self._invalidate_deleted(file_path, node)
+            self.log_operation('DELETE', f"Deleting file {file_path}")
+        return self._bulk_report(f"Deleted {len(deleted)} of {len(paths)} items", deleted, failed)
+        
+    def handle_confirm(self, args):
+        """Handle CONFIRM command (second step of a DELETE)"""
+        pending = self.session.take_pending('DELETE', time.time(), CONFIRMATION_WINDOW)
+        if pending is None:
+            return "❌ Nothing to confirm. Send DELETE /path/to/file first."
+        return self._delete(pending['paths'])
+        
+    def _invalidate_moved(self, source, node):
+        self._invalidate({'op': 'moved', 'source': source, 'destination': self.backend.path_of(node),
+                          'is_folder': node.is_folder, 'record': node.to_record()})
         
     def handle_move(self, args):
         """Handle MOVE command"""
         if len(args) < 2:
             return "❌ Error: Please specify source and destination (e.g., MOVE /source/file.pdf /destination)"
             
-        source = args[0]
-        destination = args[1]
+        destination = args[-1]
+        
+        if len(args) == 2 and not has_magic(args[0]):
+            source = args[0]
+            
+            def move(node_id):
+                return self.backend.move_by_id(node_id, *self._destination(destination))
+            try:
+                node = self._by_id(move, source, destination, verify=True)
+            except DriveError as e:
+                return self.format_error(e)
+            self._invalidate_moved(source, node)
+            self.log_operation('MOVE', f"Moving {source} to {destination}")
+            return f"✅ Successfully moved {source} to {destination}"
         
-        self.log_operation('MOVE', f"Moving {source} to {destination}")
-        return f"✅ Successfully moved {source} to {destination}"
+        sources, error = self._resolve_targets(args[:-1])
+        if error:
+            return error
+        ack = self._enqueue(['MOVE', *map(escape_glob, sources), destination])
+        if ack:
+            return ack
+        try:
+            folder_id = self.path_index.resolve(destination, verify=True)
+            ids, failed = self._resolve_ids(sources)
+            moved, failed_ids = self.backend.move_many_by_id(list(ids.values()), folder_id)
+        except DriveError as e:
+            return self.format_error(e)
+        moved = self._by_path(ids, moved)
+        failed.update(self._by_path(ids, failed_ids))
+        for source, node in moved.items():
+            self._invalidate_moved(source, node)
+            self.log_operation('MOVE', f"Moving {source} to {destination}")
+        return self._bulk_report(f"Moved {len(moved)} of {len(sources)} items to {destination}", moved, failed)
         
     def handle_summary(self, args):
         """Handle SUMMARY command"""
@@ -125,48 +668,188 @@ Examples:
             return "❌ Error: Please specify a folder path (e.g., SUMMARY /ProjectX)"
             
         folder_path = args[0]
+        recursive = len(args) > 1 and args[1].upper() == 'RECURSIVE'
+        ack = self._enqueue(['SUMMARY', folder_path] + (['RECURSIVE'] if recursive else []))
+        if ack:
+            return ack
+        if recursive:
+            return self._summary_recursive(folder_path)
+        try:
+            report = self.summary_pipeline.run(
+                folder_path, progress=lambda done, total: self._progress(f"{done}/{total} documents summarized"))
+        except DriveError as e:
+            return self.format_error(e)
         self.log_operation('SUMMARY', f"Summarizing documents in {folder_path}")
         
-        # Simulate AI summarization
-        mock_summaries = {
-            "report.pdf": "Quarterly financial report showing 15% revenue growth and improved profit margins.",
-            "presentation.pptx": "Sales presentation covering Q4 results and Q1 projections.",
-            "data.xlsx": "Customer analytics data with key performance indicators.",
-            "notes.txt": "Meeting notes from the quarterly planning session."
-        }
-        
-        response = f"📊 Summary of documents in {folder_path}:\n"
-        for filename, summary in mock_summaries.items():
-            response += f"• {filename}: {summary}\n"
+        if not report.documents:
+            return f"📊 No documents to summarize in {folder_path}"
+        
+        lines = [f"📊 Summary of documents in {folder_path}:"]
+        for file, summary, error in report.items():
+            lines.append(f"• {file.name}: {summary}" if error is None else f"• {file.name}: ❌ {error}")
+        completed = len(report.summaries) + len(report.errors)
+        if completed:
+            lines.append(f"♻️  {len(report.cached)}/{completed} from cache ({report.cache_hit_ratio:.0%} hit ratio)")
+        if report.timed_out:
+            lines.append(f"⏱️  Stopped after {report.elapsed:.0f}s; {len(report.pending)} documents not summarized yet.")
+            
+        return "\n".join(lines)
+        
+    def _summary_recursive(self, folder_path):
+        """SUMMARY /folder RECURSIVE: rollup of the whole tree, reusing stored folder rollups"""
+        try:
+            rollup = self.rollups.run(
+                folder_path, progress=lambda done, total: self._progress(f"{done}/{total} folders summarized"))
+        except DriveError as e:
+            return self.format_error(e)
+        self.log_operation('SUMMARY', f"Summarizing documents under {folder_path}")
+        
+        if not rollup.documents:
+            return f"📊 No documents to summarize under {folder_path}"
+        
+        lines = [f"📊 Rollup of {folder_path} ({rollup.documents} documents in {rollup.folders + 1} folders):"]
+        if rollup.summary:
+            lines.append(rollup.summary)
+        for name, summary, error, is_folder in rollup.items:
+            name += '/' if is_folder else ''
+            if error is None:
+                lines.append(f"• {name}: {summary or 'no documents'}")
+            else:
+                lines.append(f"• {name}: ❌ {error}" if summary is None else f"• {name}: {summary} (⚠️ {error})")
+        lines.append(f"♻️  {rollup.reused}/{rollup.folders + 1} folder rollups reused")
+        if not rollup.complete:
+            lines.append("⏱️  Some folders could not be fully summarized; the rollup was not stored.")
             
-        return response.strip()
+        return "\n".join(lines)
+        
+    def handle_status(self, args):
+        """Handle STATUS command (progress of the sender's jobs)"""
+        if self.jobs is None:
+            return "ℹ️ No background jobs: commands run straight away in this mode."
+        if args:
+            job_id = args[0].lstrip('#')
+            job = self.jobs.get(int(job_id)) if job_id.isdigit() else None
+            if job is None or job.sender != self.session.sender:
+                return f"❌ Error: No job #{job_id} of yours found"
+            if job.state in ('done', 'failed'):
+                return job.outcome
+            return self._job_line(job)
+        jobs = self.jobs.recent(self.session.sender)
+        if not jobs:
+            return "ℹ️ You have no jobs."
+        return "\n".join(["📋 Your latest jobs:"] + [self._job_line(job) for job in jobs])
+        
+    def _job_line(self, job):
+        if job.state == 'queued':
+            ahead = self.jobs.position(job)
+            detail = f"queued ({ahead} ahead)" if ahead else "queued (next)"
+        elif job.state == 'running':
+            detail = f"running for {format_duration(time.time() - job.started)}"
+            if job.progress:
+                detail += f", {job.progress}"
+        else:
+            detail = job.state
+        return f"• #{job.id} {job.message}: {detail}"
         
     def handle_unknown(self, args):
         """Handle unknown commands"""
         return "❌ Unknown command. Type 'HELP' for available commands."
         
-    def process_message(self, message_body):
-        """Process incoming WhatsApp message"""
-        # Parse command
-        parsed = self.parse_command(message_body)
-        command = parsed['command']
-        args = parsed['args']
-        
-        # Route to appropriate handler
-        if command == 'HELP':
-            response = self.handle_help(args)
-        elif command == 'LIST':
-            response = self.handle_list(args)
-        elif command == 'DELETE':
-            response = self.handle_delete(args)
-        elif command == 'MOVE':
-            response = self.handle_move(args)
-        elif command == 'SUMMARY':
-            response = self.handle_summary(args)
-        else:
-            response = self.handle_unknown(args)
-            
-        return response
+    def admit(self, command, sender):
+        """Rate-limit check for one command; returns (delay in seconds, rejection reply or None)"""
+        admission = self.admission.admit(sender, command)
+        if admission.allowed:
+            return admission.delay, None
+        retry_after = max(1, math.ceil(admission.retry_after))
+        return 0.0, (f"⏳ You're sending {command or 'messages'} faster than we can handle. "
+                     f"Please try again in {format_duration(retry_after)}.")
+        
+    def command_label(self, command):
+        """Metrics label of a command verb (arbitrary verbs would each make a new series)"""
+        return command if command and command in self.commands else 'UNKNOWN'
+        
+    def _record(self, trace, label, outcome, elapsed, kind='message'):
+        """Count a finished message or job and record its latency"""
+        self.metrics.end(trace, outcome)
+        self.metrics.inc(f'{kind}s_total', (('command', label), ('outcome', outcome)),
+                         help_text=f'{kind.capitalize()}s handled by command and outcome')
+        self.metrics.observe(f'{kind}_seconds', (('command', label),), elapsed,
+                             help_text=f'End-to-end {kind} latency by command')
+        
+    def collect_metrics(self):
+        """Cache, rate-limit, dedup and job gauges for the /metrics route"""
+        listing = self.listing_cache.stats()
+        yield ('listing_cache_hits', 'counter', 'LIST cache hits', (), listing['hits'])
+        yield ('listing_cache_misses', 'counter', 'LIST cache misses', (), listing['misses'])
+        yield ('listing_cache_bytes', 'gauge', 'Bytes held by the LIST cache', (), listing['bytes'])
+        yield ('path_index_hits', 'counter', 'Paths resolved without a Drive call', (), self.path_index.hits)
+        yield ('path_index_lookups', 'counter', 'Drive lookups made by path resolution', (),
+               self.path_index.lookups)
+        yield ('summary_cache_hits', 'counter', 'Summary cache hits', (), self.summary_cache.hits)
+        yield ('summary_cache_misses', 'counter', 'Summary cache misses', (), self.summary_cache.misses)
+        yield ('rollup_hits', 'counter', 'Folder rollups reused by SUMMARY RECURSIVE', (), self.rollups.store.hits)
+        yield ('rollup_misses', 'counter', 'Folder rollups recomputed by SUMMARY RECURSIVE', (),
+               self.rollups.store.misses)
+        for name, counters in self.admission.stats()['classes'].items():
+            for result, count in counters.items():
+                yield ('admissions', 'counter', 'Rate-limit decisions by command class', (
+                    ('class', name), ('result', result)), count)
+        yield ('dedup_duplicates', 'counter', 'Redelivered webhooks answered from the dedup store', (),
+               self.idempotency.stats()['duplicates'])
+        yield ('invalidations_received', 'counter', 'Cache invalidations applied for other workers', (),
+               self.remote_invalidations)
+        if self.jobs is not None:
+            for state, count in self.jobs.counts().items():
+                yield ('jobs', 'gauge', 'Jobs by state', (('state', state),), count)
+        
+    def process_message(self, message_body, sender=LOCAL_SENDER, admitted=False, message_id=None):
+        """Process incoming WhatsApp message from sender (the WhatsApp From number).
+        admitted=True skips the rate-limit check (the caller already did it).
+        With a message_id (Twilio's MessageSid) a redelivered message is not run
+        again: it gets the first delivery's response."""
+        if message_id:
+            response, _replayed = self.idempotency.run(message_id, self.process_message,
+                                                       message_body, sender, admitted)
+            return response
+        start = time.perf_counter()
+        command, args = parse(message_body)
+        label = self.command_label(command)
+        trace = self.metrics.begin(label, sender)
+        if trace is not None:
+            trace.add('parse', time.perf_counter() - start)
+        outcome = 'exception'
+        try:
+            if not admitted:
+                with self.metrics.span('admit'):
+                    delay, rejection = self.admit(command, sender)
+                if rejection is not None:
+                    outcome = 'rejected'
+                    return rejection
+                if delay:
+                    with self.metrics.span('deferred'):
+                        time.sleep(delay)
+            session = self.sessions.get(sender)
+            # Messages from one sender run one at a time, and not while one of
+            # their jobs runs; other senders run in parallel. STATUS only reads
+            # the jobs table, so it answers even while a job holds the lock
+            locked = command not in LOCK_FREE_COMMANDS
+            if locked:
+                with self.metrics.span('session_wait'):
+                    session.lock.acquire()
+            try:
+                if command != CONFIRMATION_KEYWORD:
+                    session.clear_pending()
+                self._local.session = session
+                with self.metrics.span('handler'):
+                    response = self.commands.dispatch(command, args)
+            finally:
+                self._local.session = None
+                if locked:
+                    session.lock.release()
+            outcome = _outcome(response)
+            return response
+        finally:
+            self._record(trace, label, outcome, time.perf_counter() - start)
 
 def run_terminal_test():
     """Run the terminal-based test"""
@@ -174,6 +857,8 @@ def run_terminal_test():
     print("=" * 50)
     
     assistant = WhatsAppDriveAssistant()
+    # Flush the audit log however the session ends
+    atexit.register(assistant.close)
     
     # Run test scenarios
     test_cases = [
@@ -207,7 +892,8 @@ def run_terminal_test():
                 response = assistant.process_message(message)
                 print(f"\n📤 Response:\n{response}")
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
+            # EOFError: stdin closed, e.g. --mode terminal in a container
             print("\n👋 Goodbye!")
             break
         except Exception as e:
@@ -221,9 +907,23 @@ def run_web_test():
         return
     
     print("🌐 Starting web-based test...")
+    from flask import Flask, request, jsonify
     
     app = Flask(__name__)
-    assistant = WhatsAppDriveAssistant()
+    # Built in the background while the server starts; the first request waits for it
+    assistant_ready = threading.Event()
+    assistants = []
+    
+    def build_assistant():
+        assistants.append(WhatsAppDriveAssistant())
+        atexit.register(assistants[0].close)
+        assistant_ready.set()
+    
+    threading.Thread(target=build_assistant, daemon=True, name='assistant-init').start()
+    
+    def get_assistant():
+        assistant_ready.wait()
+        return assistants[0]
     
     # HTML template for the web interface
     HTML_TEMPLATE = """
@@ -401,7 +1101,8 @@ def run_web_test():
     
     @app.route('/')
     def index():
-        return render_template_string(HTML_TEMPLATE)
+        # Plain HTML: no template rendering per request
+        return HTML_TEMPLATE, 200, {'Content-Type': 'text/html; charset=utf-8'}
     
     @app.route('/process', methods=['POST'])
     def process_message():
@@ -411,9 +1112,14 @@ def run_web_test():
         if not message:
             return jsonify({'response': '❌ Please enter a message'})
         
-        response = assistant.process_message(message)
+        response = get_assistant().process_message(message, data.get('sender', 'web'),
+                                                   message_id=data.get('message_sid'))
         return jsonify({'response': response})
     
+    @app.route('/metrics')
+    def metrics():
+        return get_assistant().metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    
     print("🌐 Web interface starting...")
     print("🌐 URL: http://localhost:5000")
     print("🛑 Press Ctrl+C to stop the web server")
@@ -423,6 +1129,19 @@ def run_web_test():
     except KeyboardInterrupt:
         print("\n🛑 Stopping web server...")
 
+def run_server_test():
+    """Run the async webhook server (production mode)"""
+    from async_server import run_server
+    
+    print("🚀 Starting async webhook server...")
+    if int(os.environ.get('WORKERS', 1)) > 1 and not os.environ.get('DRIVE_DEMO_PATH'):
+        # Each forked worker would otherwise build a demo Drive of its own
+        directory = tempfile.mkdtemp(prefix='demo-drive-')
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        os.environ['DRIVE_DEMO_PATH'] = os.path.join(directory, 'drive.sqlite3')
+    # Passing the class defers building the assistant until the socket is listening
+    run_server(WhatsAppDriveAssistant)
+
 def run_gui_test():
     """Run the GUI-based test"""
     if not TKINTER_AVAILABLE:
@@ -433,6 +1152,9 @@ def run_gui_test():
     print("🖥️  Starting GUI-based test...")
     
     try:
+        import tkinter as tk
+        from tkinter import ttk, scrolledtext
+        
         class WhatsAppAssistantGUI:
             def __init__(self, root):
                 self.root = root
@@ -454,6 +1176,7 @@ def run_gui_test():
                 self.root.attributes('-topmost', False)
                 
                 self.assistant = WhatsAppDriveAssistant()
+                atexit.register(self.assistant.close)
                 self.create_widgets()
                 
             def create_widgets(self):
@@ -516,7 +1239,7 @@ def run_gui_test():
                     self.add_message(message, "user")
                     
                     try:
-                        response = self.assistant.process_message(message)
+                        response = self.assistant.process_message(message, 'gui')
                         self.add_message(response, "bot")
                     except Exception as e:
                         self.add_message(f"❌ Error: {str(e)}", "bot")
@@ -556,7 +1279,27 @@ def print_banner():
     print("=" * 60)
     print()
 
-def main():
+MODES = {
+    'terminal': run_terminal_test,
+    'web': run_web_test,
+    'gui': run_gui_test,
+    'server': run_server_test,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WhatsApp-Driven Google Drive Assistant - Test Launcher")
+    parser.add_argument('--mode', choices=MODES, default=os.environ.get('RUN_MODE') or None,
+                        help="start this mode straight away instead of showing the menu (or set RUN_MODE)")
+    parser.add_argument('--workers', type=int,
+                        help="server mode: worker processes behind one listener (or set WORKERS)")
+    options = parser.parse_args(argv)
+    if options.workers:
+        os.environ['WORKERS'] = str(options.workers)
+    if options.mode:
+        # Non-interactive: no banner, dependency check or input() menu
+        MODES[options.mode]()
+        return
+    
     print_banner()
     
     # Check dependencies
@@ -579,10 +1322,11 @@ def main():
         print("1. 🖥️  Terminal Mode (Command line interface)")
         print("2. 🌐 Web Mode (Browser interface)" + (" - Requires Flask" if not FLASK_AVAILABLE else ""))
         print("3. 🖥️  GUI Mode (Desktop application)" + (" - Requires tkinter" if not TKINTER_AVAILABLE else ""))
-        print("4. ❌ Exit")
+        print("4. 🚀 Server Mode (Async Twilio webhook)")
+        print("5. ❌ Exit")
         print()
         
-        choice = input("Enter your choice (1-4): ").strip()
+        choice = input("Enter your choice (1-5): ").strip()
         
         if choice == "1":
             run_terminal_test()
@@ -604,10 +1348,13 @@ def main():
             run_gui_test()
             break
         elif choice == "4":
+            run_server_test()
+            break
+        elif choice == "5":
             print("👋 Goodbye!")
             break
         else:
-            print("❌ Invalid choice. Please enter 1, 2, 3, or 4.")
+            print("❌ Invalid choice. Please enter 1, 2, 3, 4, or 5.")
             print()
 
 if __name__ == "__main__":
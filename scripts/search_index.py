@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Search Index
+In-memory inverted index over file names, metadata and the document text
+fetched for SUMMARY, updated incrementally from Drive changes so SEARCH
+never has to walk folders.
+"""
+
+import re
+import math
+import heapq
+import bisect
+import itertools
+import threading
+from collections import Counter
+
+from drive_backend import FILE_TYPES
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Posting weights are small integers so each term's postings can be kept in
+# weight tiers and a query can stop once lower tiers cannot reach the top k
+NAME_WEIGHT = 4
+MAX_TEXT_WEIGHT = 3
+# Tiers at least this long keep a newest-first copy between queries; shorter
+# ones are sorted when a query needs them
+ORDERED_MIN_SIZE = 256
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric words"""
+    return _WORD_RE.findall(text.lower())
+
+
+def type_keys(value):
+    """Index keys for a type filter: an extension (pdf), a type name (excel) or 'folder'"""
+    value = value.lower().lstrip('.')
+    if value in FILE_TYPES or value == 'folder':
+        return [value]
+    return [extension for extension, name in FILE_TYPES.items() if name.lower() == value] or [value]
+
+
+class _Doc:
+    __slots__ = ('name', 'parent', 'is_folder', 'size', 'modified', 'checksum', 'recency', 'terms',
+                 'text_terms')
+
+    def __init__(self, record):
+        self.name = record['name']
+        self.parent = record['parent']
+        self.is_folder = record['is_folder']
+        self.size = record.get('size') or 0
+        self.modified = record.get('modified') or ''
+        self.checksum = record.get('checksum')
+        # Tie-breaker between equal scores: newer first, then by file ID
+        digits = self.modified[:10].replace('-', '')
+        self.recency = int(digits) if len(digits) == 8 and digits.isdigit() else 0
+        self.terms = ()
+        self.text_terms = ()
+
+
+class SearchResult:
+    """One ranked hit"""
+
+    __slots__ = ('id', 'path', 'name', 'is_folder', 'size', 'modified', 'score')
+
+    def __init__(self, file_id, path, doc, score):
+        self.id = file_id
+        self.path = path
+        self.name = doc.name
+        self.is_folder = doc.is_folder
+        self.size = doc.size
+        self.modified = doc.modified
+        self.score = score
+
+
+class SearchIndex:
+    """term -> {weight: set of file IDs} postings plus a file_id -> metadata table.
+
+    Results rank by score, then recency, then file ID, so equal scores come
+    out the same on every run. A query walks its rarest term's tiers newest
+    first (from a sorted copy of the tier, kept up to date once built) and
+    stops as soon as nothing left in a tier can outrank the current top k.
+
+    Documents are fed as DriveNode.to_record() dicts (update / remove, or
+    apply_changes with change-feed entries); add_text adds a document's
+    extracted text, weighted below name matches. Each document keeps its
+    parent ID, so paths and 'in /folder' filters need no Drive calls, and a
+    moved folder is a single update. Documents under a removed folder that
+    was never reported child-by-child are dropped lazily at query time.
+    """
+
+    def __init__(self, root_id='root', max_text_terms=200):
+        self.root_id = root_id
+        self.max_text_terms = max_text_terms
+        self.lock = threading.Lock()
+        self.docs = {}
+        self.postings = {}
+        self.ordered = {}  # (term, weight) -> a long tier's file IDs, oldest first (see _rank)
+        self.built = False
+
+    def __len__(self):
+        return len(self.docs)
+
+    # -- updates -----------------------------------------------------------
+
+    def _post(self, file_id, terms):
+        for term, weight in terms:
+            tiers = self.postings.get(term)
+            if tiers is None:
+                tiers = self.postings[term] = {}
+            ids = tiers.get(weight)
+            if ids is None:
+                ids = tiers[weight] = set()
+            elif file_id in ids:
+                continue
+            ids.add(file_id)
+            order = self.ordered.get((term, weight))
+            if order is not None:
+                bisect.insort(order, file_id, key=self._rank)
+
+    def _unpost(self, file_id, terms, recency):
+        for term, weight in terms:
+            tiers = self.postings.get(term)
+            ids = tiers.get(weight) if tiers else None
+            if ids is None or file_id not in ids:
+                continue
+            ids.discard(file_id)
+            order = self.ordered.get((term, weight))
+            if order is not None:
+                # Looked up by the recency the tier was ordered under
+                index = bisect.bisect_left(order, (recency, file_id), key=self._rank)
+                if index < len(order) and order[index] == file_id:
+                    del order[index]
+            if not ids:
+                self.ordered.pop((term, weight), None)
+                del tiers[weight]
+                if not tiers:
+                    del self.postings[term]
+
+    def _update(self, record):
+        file_id = record['id']
+        old = self.docs.get(file_id)
+        doc = _Doc(record)
+        if file_id != self.root_id:
+            terms = dict.fromkeys(tokenize(doc.name), NAME_WEIGHT)
+            if doc.is_folder:
+                terms['type:folder'] = 0
+            elif '.' in doc.name:
+                terms[f"type:{doc.name.rsplit('.', 1)[-1].lower()}"] = 0
+            doc.terms = tuple(terms.items())
+        repost = ()
+        if old is not None:
+            self._unpost(file_id, old.terms, old.recency)
+            # Text terms survive renames and moves, not content changes
+            if old.text_terms and old.checksum == doc.checksum:
+                doc.text_terms = old.text_terms
+            if old.text_terms and (doc.text_terms is not old.text_terms or old.recency != doc.recency):
+                self._unpost(file_id, old.text_terms, old.recency)
+                repost = doc.text_terms
+        self.docs[file_id] = doc
+        self._post(file_id, doc.terms)
+        # Kept text terms move to their new place in the recency order
+        self._post(file_id, repost)
+
+    def update(self, record):
+        """Add or replace a document from its node record"""
+        with self.lock:
+            self._update(record)
+
+    def remove(self, file_id):
+        with self.lock:
+            self._remove(file_id)
+
+    def _remove(self, file_id):
+        doc = self.docs.get(file_id)
+        if doc is not None:
+            # Unposted while still in docs: the ordered tiers look it up
+            self._unpost(file_id, doc.terms, doc.recency)
+            if doc.text_terms:
+                self._unpost(file_id, doc.text_terms, doc.recency)
+            del self.docs[file_id]
+
+    def build(self, records):
+        """Replace the index contents with records (e.g. from a crawl)"""
+        with self.lock:
+            self.docs = {}
+            self.postings = {}
+            self.ordered = {}
+            for record in records:
+                self._update(record)
+            self.built = True
+
+    def apply_changes(self, changes):
+        """Apply change-feed entries ({'file_id', 'removed', 'file'})"""
+        with self.lock:
+            for change in changes:
+                if change['removed']:
+                    self._remove(change['file_id'])
+                else:
+                    self._update(change['file'])
+
+    def add_text(self, file_id, text):
+        """Index a document's text (its max_text_terms most frequent words)"""
+        counts = Counter(tokenize(text)).most_common(self.max_text_terms)
+        with self.lock:
+            doc = self.docs.get(file_id)
+            if doc is None:
+                return
+            if doc.text_terms:
+                self._unpost(file_id, doc.text_terms, doc.recency)
+            # A name match already carries the higher weight
+            names = {term for term, _weight in doc.terms}
+            doc.text_terms = tuple((term, min(1 + int(math.log2(count)), MAX_TEXT_WEIGHT))
+                                   for term, count in counts if term not in names)
+            self._post(file_id, doc.text_terms)
+
+    # -- queries -----------------------------------------------------------
+
+    def path_of(self, file_id):
+        """Path of an indexed document, or None if it is no longer reachable"""
+        names = []
+        while file_id != self.root_id:
+            doc = self.docs.get(file_id)
+            if doc is None or doc.parent is None:
+                return None
+            names.append(doc.name)
+            file_id = doc.parent
+        return '/' + '/'.join(reversed(names))
+
+    def _within(self, file_id, folder_id):
+        while file_id is not None:
+            doc = self.docs.get(file_id)
+            if doc is None:
+                return False
+            file_id = doc.parent
+            if file_id == folder_id:
+                return True
+        return False
+
+    def _rank(self, file_id):
+        """Order of equal scores: newer first, then the higher file ID"""
+        return self.docs[file_id].recency, file_id
+
+    def _newest_first(self, term, weight, ids, newest=None):
+        """A tier's file IDs in _rank order, best first, starting at recency
+        newest if given"""
+        order = self.ordered.get((term, weight))
+        if order is None:
+            order = sorted(ids, key=self._rank)
+            if len(order) >= ORDERED_MIN_SIZE:
+                self.ordered[(term, weight)] = order
+        skip = 0 if newest is None else len(order) - bisect.bisect_left(order, (newest + 1,), key=self._rank)
+        return itertools.islice(reversed(order), skip, None)
+
+    def search(self, terms, folder_id=None, types=None, modified=None, limit=20):
+        """Rank documents containing every term.
+
+        types is a list of type filter values (see type_keys); modified is
+        (op, value) with op one of > >= < <= = compared on the date prefix.
+        At least one term or type is required. Returns SearchResults, best first.
+        """
+        with self.lock:
+            lists = []
+            for term in dict.fromkeys(terms):
+                tiers = self.postings.get(term)
+                if not tiers:
+                    return []
+                lists.append((term, tiers))
+            type_terms = []
+            if types:
+                type_terms = sorted(f"type:{key}" for key in {key for value in types for key in type_keys(value)}
+                                    if f"type:{key}" in self.postings)
+                sets = [ids for key in type_terms for ids in self.postings[key].values()]
+                if not sets:
+                    return []
+                lists.append((None, {0: sets[0] if len(sets) == 1 else set().union(*sets)}))
+            if not lists:
+                return []
+
+            # Drive the query from the rarest term; the rest are membership checks
+            lists = [(term, sorted(tiers.items(), reverse=True), sum(map(len, tiers.values())))
+                     for term, tiers in lists]
+            lists.sort(key=lambda item: item[2])
+            total = len(self.docs)
+            idf = [math.log(1 + total / size) if term else 0.0 for term, _tiers, size in lists]
+            (first_term, first_tiers, _), rest = lists[0], lists[1:]
+            docs = self.docs
+            newest = _newest_matching(modified)
+
+            top = []  # min-heap of (score, recency, file_id): the lowest ranked is evicted first
+            for weight, ids in first_tiers:
+                # Summed in the same order as a score, so no score in the tier exceeds it
+                bound = weight * idf[0]
+                for index, (_, tiers, _) in enumerate(rest, 1):
+                    bound += tiers[0][0] * idf[index]
+                if len(top) >= limit and top[0][0] > bound:
+                    break
+                if first_term is None and len(type_terms) > 1:
+                    candidates = heapq.merge(*(self._newest_first(key, 0, self.postings[key][0], newest)
+                                               for key in type_terms), key=self._rank, reverse=True)
+                else:
+                    candidates = self._newest_first(type_terms[0] if first_term is None else first_term,
+                                                    weight, ids, newest)
+                for file_id in candidates:
+                    recency = docs[file_id].recency
+                    if len(top) >= limit and top[0] > (bound, recency, file_id):
+                        # The rest of the tier is older or scores no higher
+                        break
+                    score = weight * idf[0]
+                    for index, (_, tiers, _) in enumerate(rest, 1):
+                        for other, other_ids in tiers:
+                            if file_id in other_ids:
+                                score += other * idf[index]
+                                break
+                        else:
+                            break
+                    else:
+                        entry = (score, recency, file_id)
+                        if len(top) >= limit and top[0] > entry:
+                            continue
+                        doc = docs[file_id]
+                        if modified and not _date_matches(doc.modified, modified):
+                            continue
+                        if folder_id is not None and not self._within(file_id, folder_id):
+                            continue
+                        if self.path_of(file_id) is None:
+                            continue
+                        if len(top) < limit:
+                            heapq.heappush(top, entry)
+                        else:
+                            heapq.heapreplace(top, entry)
+
+            return [SearchResult(file_id, self.path_of(file_id), docs[file_id], score)
+                    for score, _, file_id in sorted(top, reverse=True)]
+
+
+def _newest_matching(condition):
+    """Highest recency a modified: condition can match (=, < and <= only), else None"""
+    if not condition or condition[0] not in ('=', '<', '<='):
+        return None
+    op, bound = condition
+    digits = bound.replace('-', '')
+    if op == '<':
+        return int(digits.ljust(8, '0')) - 1
+    return int(digits.ljust(8, '9'))
+
+
+def _date_matches(value, condition):
+    op, bound = condition
+    value = value[:len(bound)]
+    if not value:
+        return False
+    if op == '>':
+        return value > bound
+    if op == '>=':
+        return value >= bound
+    if op == '<':
+        return value < bound
+    if op == '<=':
+        return value <= bound
+    return value == bound
+
+
+def parse_query(args):
+    """Split SEARCH arguments into (terms, folder, types, modified).
+
+    Recognizes 'in /folder', 'type:pdf' and 'modified:>2024-01-01' (also
+    >=, <, <= or a bare date prefix such as modified:2024-01).
+    Raises ValueError for a malformed filter.
+    """
+    terms, types = [], []
+    folder = modified = None
+    args = list(args)
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        lower = arg.lower()
+        if lower == 'in' and index + 1 < len(args) and args[index + 1].startswith('/'):
+            folder = args[index + 1]
+            index += 2
+            continue
+        if lower.startswith('type:'):
+            if not arg[5:]:
+                raise ValueError("type: needs a value (e.g., type:pdf)")
+            types.append(arg[5:])
+        elif lower.startswith('modified:'):
+            match = re.fullmatch(r'(>=|<=|>|<|=)?(\d{4}(?:-\d{2}(?:-\d{2})?)?)', arg[9:])
+            if match is None:
+                raise ValueError(f"Cannot read {arg} (e.g., modified:>2024-01-01)")
+            modified = (match.group(1) or '=', match.group(2))
+        else:
+            terms.extend(tokenize(arg))
+        index += 1
+    return terms, folder, types, modified
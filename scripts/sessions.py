@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Sender Sessions
+Per-sender session state keyed by the WhatsApp From number, with TTL and
+size-capped LRU eviction, plus per-sender serial execution. With a shared
+store, what must survive a sender's next message landing on another worker
+process (a pending confirmation, the MORE position) is kept in the store.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class Session:
+    """State kept for one WhatsApp sender between messages. data holds
+    worker-local objects; get_shared / set_shared / pop_shared values live
+    in the store (seen by every worker) when there is one."""
+
+    __slots__ = ('sender', 'created', 'last_seen', 'data', 'lock', 'store', 'ttl')
+
+    def __init__(self, sender, now, store=None, ttl=None):
+        self.sender = sender
+        self.created = now
+        self.last_seen = now
+        self.data = {}
+        self.lock = threading.Lock()
+        self.store = store
+        self.ttl = ttl
+
+    def _key(self, name):
+        return f"session:{self.sender}:{name}"
+
+    def get_shared(self, name):
+        if self.store is None:
+            return self.data.get(('shared', name))
+        return self.store.get(self._key(name))
+
+    def set_shared(self, name, value):
+        if self.store is None:
+            self.data[('shared', name)] = value
+        else:
+            self.store.set(self._key(name), value, ttl=self.ttl)
+
+    def pop_shared(self, name):
+        if self.store is None:
+            return self.data.pop(('shared', name), None)
+        return self.store.pop(self._key(name))
+
+    def set_pending(self, action, now, **details):
+        """Remember an action waiting for confirmation (e.g. a DELETE); now is wall-clock time"""
+        self.set_shared('pending', {'action': action, 'created': now, **details})
+
+    def take_pending(self, action, now, max_age):
+        """Return and clear the pending action if it matches and is still fresh"""
+        pending = self.pop_shared('pending')
+        if pending is None or pending['action'] != action or now - pending['created'] > max_age:
+            return None
+        return pending
+
+    def discard_shared(self, name):
+        """pop_shared without the result; with a store, only writes if the value is there"""
+        if self.store is None:
+            self.data.pop(('shared', name), None)
+        elif self.store.get(self._key(name)) is not None:
+            # Reads do not take the store's write lock, so most messages never write
+            self.store.delete(self._key(name))
+
+    def clear_pending(self):
+        self.discard_shared('pending')
+
+
+class SessionManager:
+    """Sessions keyed by sender, evicted after ttl seconds idle or LRU past
+    max_sessions. Shared values in store expire after ttl as well."""
+
+    def __init__(self, ttl=1800, max_sessions=10000, clock=time.monotonic, store=None):
+        self.ttl = ttl
+        self.store = store
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.sessions = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, sender):
+        """Return the session for sender, creating it if needed"""
+        now = self.clock()
+        with self.lock:
+            session = self.sessions.get(sender)
+            if session is not None and now - session.last_seen > self.ttl:
+                del self.sessions[sender]
+                self.evictions += 1
+                session = None
+            if session is None:
+                session = Session(sender, now, self.store, self.ttl)
+                self.sessions[sender] = session
+            else:
+                self.sessions.move_to_end(sender)
+            session.last_seen = now
+            self._evict(now)
+            return session
+
+    def _evict(self, now):
+        # Least recently seen sessions are at the front
+        sessions = self.sessions
+        while sessions:
+            sender, oldest = next(iter(sessions.items()))
+            if len(sessions) <= self.max_sessions and now - oldest.last_seen <= self.ttl:
+                break
+            del sessions[sender]
+            self.evictions += 1
+
+    def evict_expired(self):
+        with self.lock:
+            self._evict(self.clock())
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, sender):
+        return sender in self.sessions
+
+
+class SenderQueue:
+    """Async per-sender ordering: one sender's messages run in arrival order,
+    different senders run concurrently. asyncio.Lock wakes waiters FIFO."""
+
+    def __init__(self):
+        self.locks = {}
+
+    async def run(self, sender, coro_func, *args):
+        import asyncio
+        entry = self.locks.get(sender)
+        if entry is None:
+            entry = self.locks[sender] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await coro_func(*args)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[sender]
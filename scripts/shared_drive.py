@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Shared Drive Stand-in
+Writable Drive stand-in kept in an SQLite file, for the demo and benchmarks
+with several worker processes: each worker opens the same file, so a DELETE
+or MOVE made on one worker is what every other worker's next LIST sees (the
+in-memory stand-in would give each forked worker a tree of its own).
+"""
+
+import io
+import json
+import uuid
+import hashlib
+from contextlib import contextmanager
+
+from drive_backend import (
+    DEMO_FILES, DriveConflictError, DriveNode, DriveNotFoundError, DriveTokenError, _as_bytes, join_path,
+    parent_path, split_path,
+)
+from sync import DriveSnapshot, _row
+
+
+class SQLiteDriveBackend(DriveSnapshot):
+    """DriveSnapshot's tables plus content and a change log, with writes.
+
+    Reads are DriveSnapshot's. Every write runs in an IMMEDIATE transaction,
+    so processes sharing the file never interleave a read-modify-write, and
+    appends to the change log served by list_changes (which never expires).
+    """
+
+    def __init__(self, path=':memory:', root_id='root'):
+        super().__init__(path, root_id)
+        self.db.execute('CREATE TABLE IF NOT EXISTS content (id TEXT PRIMARY KEY, data BLOB) WITHOUT ROWID')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS changes (
+                               token INTEGER PRIMARY KEY AUTOINCREMENT,
+                               file_id TEXT NOT NULL,
+                               removed INTEGER NOT NULL,
+                               record TEXT)''')
+        with self._transaction():
+            self.db.execute('INSERT OR IGNORE INTO nodes VALUES (?, ?, NULL, 1, 0, NULL, NULL, NULL)',
+                            (root_id, '/'))
+
+    @classmethod
+    def demo(cls, path):
+        """Open path, filling it with the demo tree if it is new"""
+        backend = cls(path)
+        backend.load_fixture_once({'folders': ['/Archive'], 'files': DEMO_FILES})
+        return backend
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+
+    def _record_change(self, node, removed=False):
+        self.db.execute('INSERT INTO changes (file_id, removed, record) VALUES (?, ?, ?)',
+                        (node.id, int(removed), None if removed else json.dumps(node.to_record())))
+
+    def _put(self, node):
+        self.db.execute('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', _row(node.to_record()))
+        self._record_change(node)
+
+    # -- tree construction -------------------------------------------------
+
+    def load_fixture_once(self, fixture):
+        """Add a fixture's folders and files unless the tree already has more
+        than its root (another worker loaded it first); returns True if loaded"""
+        with self._transaction():
+            if self.db.execute('SELECT COUNT(*) FROM nodes').fetchone()[0] > 1:
+                return False
+            for folder in fixture.get('folders', []):
+                self._add_folder(folder)
+            for entry in fixture.get('files', []):
+                self._add_file(entry['path'], size=entry.get('size', 0), modified=entry.get('modified'),
+                               mime_type=entry.get('mime_type'), content=entry.get('content'),
+                               checksum=entry.get('md5Checksum'))
+        return True
+
+    def add_folder(self, path, modified=None):
+        """Create the folder at path (and any missing parents)"""
+        with self._transaction():
+            return self._add_folder(path, modified)
+
+    def add_file(self, path, size=0, modified=None, mime_type=None, content=None, checksum=None):
+        """Create the file at path, creating parent folders as needed"""
+        with self._transaction():
+            return self._add_file(path, size, modified, mime_type, content, checksum)
+
+    def _add_folder(self, path, modified=None):
+        folder = self._get_id(self.ROOT_ID)
+        for name in split_path(path):
+            child_id = self.lookup_child(folder.id, name)
+            if child_id is None:
+                child = DriveNode(f"f{uuid.uuid4().hex[:16]}", name, folder.id, is_folder=True,
+                                  modified=modified)
+                self._put(child)
+            else:
+                child = self._get_id(child_id)
+                if not child.is_folder:
+                    raise DriveConflictError(f"{name} is a file, not a folder")
+            folder = child
+        return folder
+
+    def _add_file(self, path, size=0, modified=None, mime_type=None, content=None, checksum=None):
+        parts = split_path(path)
+        if not parts:
+            raise DriveConflictError("Cannot create a file at /")
+        if checksum is None and content is not None:
+            checksum = hashlib.md5(_as_bytes(content)).hexdigest()
+        folder = self._add_folder(parent_path(path))
+        if self.lookup_child(folder.id, parts[-1]) is not None:
+            raise DriveConflictError(f"{path} already exists")
+        node = DriveNode(f"f{uuid.uuid4().hex[:16]}", parts[-1], folder.id, size=size, modified=modified,
+                         mime_type=mime_type, checksum=checksum)
+        self._put(node)
+        if content is not None:
+            self.db.execute('INSERT OR REPLACE INTO content VALUES (?, ?)', (node.id, _as_bytes(content)))
+        return node
+
+    # -- writes ------------------------------------------------------------
+
+    def delete(self, path):
+        with self._transaction():
+            return self._delete(self._resolve(path))
+
+    def delete_by_id(self, node_id):
+        with self._transaction():
+            return self._delete(node_id)
+
+    def _delete(self, node_id):
+        if node_id == self.ROOT_ID:
+            raise DriveConflictError("Cannot delete the root folder")
+        node = self._get_id(node_id)
+        if node is None:
+            raise DriveNotFoundError(node_id)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            stack.extend(self._list(current.id) if current.is_folder else ())
+            self.db.execute('DELETE FROM nodes WHERE id = ?', (current.id,))
+            self.db.execute('DELETE FROM content WHERE id = ?', (current.id,))
+            self._record_change(current, removed=True)
+        return node
+
+    def move(self, source, destination):
+        with self._transaction():
+            node_id = self._resolve(source)
+            try:
+                target_id, new_name = self._resolve(destination), None
+            except DriveNotFoundError:
+                # Destination does not exist: treat it as a rename into its parent
+                target_id = self._resolve(parent_path(destination))
+                new_name = split_path(destination)[-1]
+            return self._move(node_id, target_id, new_name)
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        with self._transaction():
+            return self._move(node_id, folder_id, new_name)
+
+    def _move(self, node_id, folder_id, new_name):
+        if node_id == self.ROOT_ID:
+            raise DriveConflictError("Cannot move the root folder")
+        node = self._get_id(node_id)
+        target = self._get_id(folder_id)
+        if node is None or target is None:
+            raise DriveNotFoundError(node_id if node is None else folder_id)
+        new_name = new_name or node.name
+        if not target.is_folder:
+            raise DriveConflictError(f"{self._path_of_id(folder_id)} is not a folder")
+        if self.lookup_child(folder_id, new_name) is not None:
+            raise DriveConflictError(f"{join_path(self._path_of_id(folder_id), new_name)} already exists")
+        ancestor = target
+        while ancestor is not None:
+            if ancestor.id == node_id:
+                raise DriveConflictError(f"Cannot move {self._path_of_id(node_id)} into itself")
+            ancestor = self._get_id(ancestor.parent) if ancestor.parent is not None else None
+        node.parent = folder_id
+        node.name = new_name
+        self._put(node)
+        return node
+
+    # -- content and changes -----------------------------------------------
+
+    def _content(self, node):
+        if node.is_folder:
+            raise DriveConflictError(f"{self.path_of(node)} is a folder")
+        with self.lock:
+            row = self.db.execute('SELECT data FROM content WHERE id = ?', (node.id,)).fetchone()
+        return row[0] if row else b''
+
+    def read_content(self, path):
+        return self._content(self.get(path)).decode('utf-8', errors='replace')
+
+    def read_content_by_id(self, node_id):
+        return self._content(self.get_by_id(node_id)).decode('utf-8', errors='replace')
+
+    def open_content(self, path):
+        return io.BytesIO(self._content(self.get(path)))
+
+    def open_content_by_id(self, node_id):
+        return io.BytesIO(self._content(self.get_by_id(node_id)))
+
+    def get_start_page_token(self):
+        with self.lock:
+            return self.db.execute('SELECT COALESCE(MAX(token), 0) + 1 FROM changes').fetchone()[0]
+
+    def list_changes(self, page_token, page_size=1000):
+        with self.lock:
+            rows = self.db.execute('SELECT token, file_id, removed, record FROM changes WHERE token >= ? '
+                                   'ORDER BY token LIMIT ?', (page_token, page_size)).fetchall()
+            if not rows and page_token > self.get_start_page_token():
+                # Issued by a different tree (e.g. before the file was replaced)
+                raise DriveTokenError(f"Change token {page_token} is not valid")
+        page = [{'token': token, 'file_id': file_id, 'removed': bool(removed),
+                 'file': None if removed else json.loads(record)} for token, file_id, removed, record in rows]
+        return page, (rows[-1][0] + 1 if rows else page_token)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Shared State Store
+State that every worker process must see (pending confirmations, paging
+positions, dedup records, rate-limit buckets) lives in a Store rather than
+in process memory, and cache invalidations are published through it so each
+worker drops its own copies. MemoryStore keeps everything in-process (one
+worker), SQLiteStore shares a file between the worker processes of one host
+and RedisStore shares a Redis server between hosts. All three offer the same
+small Redis-like API; values are JSON and keys may expire.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class Store:
+    """Key-value store with expiry and publish/subscribe.
+
+    update(key, func) is an atomic read-modify-write: func gets the current
+    value (None if missing) and returns the new one. Messages published on a
+    channel reach every subscriber of every store sharing the data, the
+    publisher's own included. shared is True when other processes see the
+    same data.
+    """
+
+    shared = False
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is missing (or expired); True if it was set"""
+        raise NotImplementedError
+
+    def pop(self, key):
+        """Delete key and return its value (None if missing)"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def update(self, key, func, ttl=None):
+        raise NotImplementedError
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        """Call callback(message) for every message published on channel from now on"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryStore(Store):
+    """In-process store; subscribers are called on the publishing thread"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.data = {}
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self._writes = 0
+
+    def _live(self, key, now):
+        # Called with the lock held
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self.data[key]
+            return None
+        return item
+
+    def _store(self, key, value, ttl, now):
+        self.data[key] = (json.dumps(value), None if ttl is None else now + ttl)
+        self._writes += 1
+        if self._writes % 10000 == 0:
+            for stale in [key for key, (_value, expires) in self.data.items()
+                          if expires is not None and expires <= now]:
+                del self.data[stale]
+
+    def get(self, key):
+        with self.lock:
+            item = self._live(key, self.clock())
+        return None if item is None else json.loads(item[0])
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self._store(key, value, ttl, self.clock())
+
+    def add(self, key, value, ttl=None):
+        now = self.clock()
+        with self.lock:
+            if self._live(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def pop(self, key):
+        with self.lock:
+            item = self._live(key, self.clock())
+            if item is not None:
+                del self.data[key]
+        return None if item is None else json.loads(item[0])
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def update(self, key, func, ttl=None):
+        now = self.clock()
+        with self.lock:
+            item = self._live(key, now)
+            value = func(None if item is None else json.loads(item[0]))
+            self._store(key, value, ttl, now)
+            return value
+
+    def publish(self, channel, message):
+        message = json.loads(json.dumps(message))
+        for callback in list(self.subscribers.get(channel, ())):
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        self.subscribers.setdefault(channel, []).append(callback)
+
+
+class SQLiteStore(Store):
+    """Store in an SQLite file shared by the worker processes of one host.
+
+    Published messages are rows of an events table; a daemon thread per
+    process polls it every poll_interval seconds, so a message reaches the
+    other workers within about that time. Events are kept event_ttl seconds.
+    """
+
+    shared = True
+
+    def __init__(self, path, poll_interval=0.05, event_ttl=60.0, clock=time.time):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.event_ttl = event_ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # timeout: how long a write waits for another process's transaction
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS kv (
+                               key TEXT PRIMARY KEY,
+                               value TEXT NOT NULL,
+                               expires REAL)''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS events (
+                               id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               channel TEXT NOT NULL,
+                               message TEXT NOT NULL,
+                               created REAL NOT NULL)''')
+        self.subscribers = {}
+        self.last_event = None
+        self.received = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a read-then-write
+        # cannot interleave with another process's
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+
+    @staticmethod
+    def _read(db, key, now):
+        row = db.execute('SELECT value, expires FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return json.loads(row[0])
+
+    def _write(self, db, key, value, ttl, now):
+        db.execute('INSERT OR REPLACE INTO kv VALUES (?, ?, ?)',
+                   (key, json.dumps(value), None if ttl is None else now + ttl))
+
+    def get(self, key):
+        with self.lock:
+            return self._read(self.db, key, self.clock())
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self._write(self.db, key, value, ttl, self.clock())
+
+    def add(self, key, value, ttl=None):
+        now = self.clock()
+        with self._transaction() as db:
+            if self._read(db, key, now) is not None:
+                return False
+            self._write(db, key, value, ttl, now)
+            return True
+
+    def pop(self, key):
+        now = self.clock()
+        with self._transaction() as db:
+            value = self._read(db, key, now)
+            db.execute('DELETE FROM kv WHERE key = ?', (key,))
+            return value
+
+    def delete(self, key):
+        with self.lock:
+            self.db.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def update(self, key, func, ttl=None):
+        now = self.clock()
+        with self._transaction() as db:
+            value = func(self._read(db, key, now))
+            self._write(db, key, value, ttl, now)
+            return value
+
+    def publish(self, channel, message):
+        with self.lock:
+            self.db.execute('INSERT INTO events (channel, message, created) VALUES (?, ?, ?)',
+                            (channel, json.dumps(message), self.clock()))
+
+    def subscribe(self, channel, callback):
+        with self.lock:
+            if self.last_event is None:
+                self.last_event = self.db.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+            self.subscribers.setdefault(channel, []).append(callback)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, daemon=True, name='shared-state-poller')
+            self._thread.start()
+
+    def poll(self):
+        """Deliver messages published since the last poll; returns how many"""
+        with self.lock:
+            rows = self.db.execute('SELECT id, channel, message FROM events WHERE id > ? ORDER BY id',
+                                   (self.last_event,)).fetchall()
+            if rows:
+                self.last_event = rows[-1][0]
+        for _id, channel, message in rows:
+            for callback in list(self.subscribers.get(channel, ())):
+                try:
+                    callback(json.loads(message))
+                except Exception as e:
+                    print(f"❌ Error handling {channel} message: {e}")
+        self.received += len(rows)
+        return len(rows)
+
+    def purge(self):
+        """Drop expired keys and old events"""
+        now = self.clock()
+        with self.lock:
+            self.db.execute('DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?', (now,))
+            self.db.execute('DELETE FROM events WHERE created < ?', (now - self.event_ttl,))
+
+    def _poll(self):
+        last_purge = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+                if time.monotonic() - last_purge > self.event_ttl:
+                    self.purge()
+                    last_purge = time.monotonic()
+            except sqlite3.Error as e:
+                print(f"❌ Shared state poll failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self.lock:
+            self.db.close()
+
+
+class RedisStore(Store):
+    """Store on a Redis server (needs the redis package), shared across hosts"""
+
+    shared = True
+
+    def __init__(self, url, prefix='wdrive:'):
+        # Imported here: redis is optional and only this store needs it
+        import redis
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.threads = []
+
+    @staticmethod
+    def _ms(ttl):
+        return None if ttl is None else max(1, int(ttl * 1000))
+
+    @staticmethod
+    def _load(raw):
+        return None if raw is None else json.loads(raw)
+
+    def get(self, key):
+        return self._load(self.client.get(self.prefix + key))
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), px=self._ms(ttl))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, json.dumps(value), px=self._ms(ttl), nx=True))
+
+    def pop(self, key):
+        return self._load(self.client.getdel(self.prefix + key))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def update(self, key, func, ttl=None):
+        key = self.prefix + key
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    value = func(self._load(pipe.get(key)))
+                    pipe.multi()
+                    pipe.set(key, json.dumps(value), px=self._ms(ttl))
+                    pipe.execute()
+                    return value
+                except self.redis.WatchError:
+                    continue
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+    def subscribe(self, channel, callback):
+        def handle(message):
+            try:
+                callback(json.loads(message['data']))
+            except Exception as e:
+                print(f"❌ Error handling {channel} message: {e}")
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.prefix + channel: handle})
+        self.threads.append(pubsub.run_in_thread(sleep_time=0.05, daemon=True))
+
+    def close(self):
+        for thread in self.threads:
+            thread.stop()
+        self.client.close()
+
+
+def open_store(url=''):
+    """Store for a SHARED_STATE setting: '' or 'memory' (in-process),
+    'sqlite:///state.sqlite3' (relative; sqlite:////abs/path for an absolute
+    path) or 'redis://host:6379/0'"""
+    if not url or url == 'memory':
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisStore(url)
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError(f"Unknown SHARED_STATE {url!r} (use memory, sqlite:///path or redis://host)")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Summary Cache
+Persistent SQLite cache of document summaries keyed by content identity and
+model, so unchanged documents are never re-summarized.
+"""
+
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+def content_key(node=None, content=None):
+    """Cache key for a document.
+
+    Uses Drive's md5Checksum + modifiedTime when the node has them (no
+    download needed), otherwise a SHA-256 of the fetched content.
+    """
+    if node is not None and getattr(node, 'checksum', None):
+        return f"md5:{node.checksum}:{node.modified}"
+    if content is not None:
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        return f"sha256:{hashlib.sha256(data).hexdigest()}"
+    return None
+
+
+class SummaryCache:
+    """(content key, model) -> summary, stored in SQLite and evicted least
+    recently used once the stored summaries exceed max_bytes."""
+
+    def __init__(self, path=':memory:', max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS summaries (
+                               key TEXT NOT NULL,
+                               model TEXT NOT NULL,
+                               summary TEXT NOT NULL,
+                               size INTEGER NOT NULL,
+                               last_used REAL NOT NULL,
+                               PRIMARY KEY (key, model))''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)')
+        self.bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM summaries').fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, model):
+        with self.lock:
+            row = self.db.execute('SELECT summary FROM summaries WHERE key = ? AND model = ?',
+                                  (key, model)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute('UPDATE summaries SET last_used = ? WHERE key = ? AND model = ?',
+                            (time.time(), key, model))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, summary):
+        size = len(key) + len(model) + len(summary.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.db.execute('SELECT size FROM summaries WHERE key = ? AND model = ?',
+                                  (key, model)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)',
+                            (key, model, summary, size, time.time()))
+            self.bytes += size - (old[0] if old else 0)
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop least recently used rows until back under 90% of the budget
+        target = self.max_bytes * 0.9
+        rows = self.db.execute('SELECT key, model, size FROM summaries ORDER BY last_used')
+        stale = []
+        for key, model, size in rows:
+            if self.bytes <= target:
+                break
+            stale.append((key, model))
+            self.bytes -= size
+        rows.close()
+        self.db.executemany('DELETE FROM summaries WHERE key = ? AND model = ?', stale)
+        self.evictions += len(stale)
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - SUMMARY Pipeline
+Staged list -> filter -> fetch content -> summarize pipeline. Fetch and
+summarize each have their own worker pool fed by a bounded queue, so a slow
+summarizer applies backpressure instead of buffering every document.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from drive_backend import join_path
+from extract import CHARS_PER_TOKEN
+from summary_cache import content_key
+
+SUMMARIZABLE_TYPES = {'pdf', 'docx', 'txt', 'md', 'csv', 'pptx', 'xlsx'}
+
+_DONE = object()
+
+
+class _Cached:
+    """Fetch-stage output for a document whose summary came from the cache"""
+
+    __slots__ = ('summary',)
+
+    def __init__(self, summary):
+        self.summary = summary
+
+
+class Summarizer:
+    """Turns document text into a short summary"""
+
+    model = 'unknown'
+
+    def summarize(self, text):
+        raise NotImplementedError
+
+
+class ExtractiveSummarizer(Summarizer):
+    """Local stand-in for the OpenAI summarizer: returns the first sentence.
+
+    latency (seconds) simulates the model call, so the pipeline can be
+    exercised offline with realistic timings; max_input_tokens, if set,
+    rejects longer inputs like a model's context window would.
+    """
+
+    model = 'extractive'
+
+    def __init__(self, latency=0.0, max_input_tokens=None):
+        self.latency = latency
+        self.max_input_tokens = max_input_tokens
+
+    def summarize(self, text):
+        if self.max_input_tokens is not None and len(text) > self.max_input_tokens * CHARS_PER_TOKEN:
+            raise ValueError(f"input of ~{len(text) // CHARS_PER_TOKEN} tokens exceeds the "
+                             f"{self.max_input_tokens}-token context")
+        if self.latency:
+            time.sleep(self.latency)
+        text = ' '.join(text.split())
+        end = text.find('. ')
+        return text if end == -1 else text[:end + 1]
+
+
+def is_summarizable(node):
+    """Filter stage: files of a type the summarizer can read"""
+    if node.is_folder or '.' not in node.name:
+        return False
+    return node.name.rsplit('.', 1)[-1].lower() in SUMMARIZABLE_TYPES
+
+
+class SummaryReport:
+    """Outcome of one pipeline run; results keep the folder listing order"""
+
+    def __init__(self, folder_path, documents):
+        self.folder_path = folder_path
+        self.documents = documents
+        self.summaries = {}
+        self.errors = {}
+        self.cached = set()
+        self.timed_out = False
+        self.elapsed = 0.0
+
+    @property
+    def pending(self):
+        """Documents that had no result when the deadline hit"""
+        return [node for index, node in enumerate(self.documents)
+                if index not in self.summaries and index not in self.errors]
+
+    @property
+    def cache_hit_ratio(self):
+        done = len(self.summaries) + len(self.errors)
+        return len(self.cached) / done if done else 0.0
+
+    def items(self):
+        """Yield (node, summary, error) in listing order"""
+        for index, node in enumerate(self.documents):
+            if index in self.summaries:
+                yield node, self.summaries[index], None
+            elif index in self.errors:
+                yield node, None, self.errors[index]
+
+
+class SummaryPipeline:
+    """Runs SUMMARY for one folder through bounded, parallel stages.
+
+    fetch_timeout / summarize_timeout bound a single call in that stage: the
+    call runs on its own thread and the stage worker waits at most that long
+    for it, reporting the document as timed out and moving on (a Python
+    thread cannot be killed, so the call itself finishes in the background).
+    Each stage runs at most as many calls at once as it has workers, across
+    concurrent runs; a timed-out call keeps its slot until it returns, so a
+    hung Drive or model call cannot pile up threads. deadline bounds the
+    whole run, after which whatever has finished is returned. With a
+    SummaryCache, documents whose content key and model are already cached
+    skip the summarize stage (and the download, when Drive gives a checksum).
+    text_sink(node, text) is called with every downloaded document's text.
+    With metrics, the worker threads continue the caller's trace so their
+    Drive and model calls show up as spans of the SUMMARY command. With an
+    extractor (extract.TextExtractor), documents are streamed from
+    backend.open_content_by_id and only as much text as the summarizer takes
+    is read; otherwise backend.read_content_by_id loads each file whole.
+    """
+
+    def __init__(self, backend, summarizer, list_folder=None, cache=None, fetch_workers=8,
+                 summarize_workers=4, queue_size=16, fetch_timeout=10.0, summarize_timeout=30.0,
+                 deadline=60.0, text_sink=None, metrics=None, extractor=None):
+        self.backend = backend
+        self.summarizer = summarizer
+        self.cache = cache
+        self.list_folder = list_folder or backend.list_folder
+        self.fetch_workers = fetch_workers
+        self.summarize_workers = summarize_workers
+        self.queue_size = queue_size
+        self.fetch_timeout = fetch_timeout
+        self.summarize_timeout = summarize_timeout
+        self.deadline = deadline
+        self.text_sink = text_sink
+        self.metrics = metrics
+        self.extractor = extractor
+        self.slots = {'fetch': threading.BoundedSemaphore(fetch_workers),
+                      'summarize': threading.BoundedSemaphore(summarize_workers)}
+
+    @staticmethod
+    def _put(target, item, cancel):
+        while not cancel.is_set():
+            try:
+                target.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _call(self, func, args, timeout, stage, trace, cancel):
+        """func(*args) on a thread of its own once the stage has a free slot;
+        raises TimeoutError if it takes longer than timeout, leaving it
+        running (and holding the slot)"""
+        slots = self.slots[stage]
+        # Waiting for a slot is bounded by the run's deadline, not the call timeout
+        while not slots.acquire(timeout=0.05):
+            if cancel.is_set():
+                raise TimeoutError()
+        future = Future()
+
+        def target():
+            if self.metrics is not None:
+                self.metrics.attach(trace)
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                slots.release()
+
+        try:
+            threading.Thread(target=target, daemon=True, name=f'summary-{stage}-call').start()
+        except BaseException:
+            slots.release()
+            raise
+        return future.result(timeout)
+
+    def _stage(self, inbox, outbox, func, timeout, stage, results, cancel, finished, trace=None):
+        """Worker loop shared by the fetch and summarize stages"""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                finished()
+                return
+            if cancel.is_set():
+                continue
+            index, node, path, payload = item
+            try:
+                output = self._call(func, (node, path, payload), timeout, stage, trace, cancel)
+            except TimeoutError:
+                results.put((index, None, f"{stage} timed out", False))
+                continue
+            except Exception as e:
+                results.put((index, None, f"{stage} failed: {e}", False))
+                continue
+            if isinstance(output, _Cached):
+                results.put((index, output.summary, None, True))
+            elif outbox is None:
+                results.put((index, output, None, False))
+            else:
+                self._put(outbox, (index, node, path, output), cancel)
+
+    def _cached(self, key):
+        summary = self.cache.get(key, self.summarizer.model) if key else None
+        return None if summary is None else _Cached(summary)
+
+    def _fetch(self, node, _path, _payload):
+        key = content_key(node) if self.cache is not None else None
+        hit = key and self._cached(key)
+        if hit:
+            return hit
+        # By ID: the listing already resolved it, so no per-segment path lookups
+        if self.extractor is not None:
+            with self.backend.open_content_by_id(node.id) as stream:
+                text = self.extractor.extract(stream, node.name).text
+        else:
+            text = self.backend.read_content_by_id(node.id)
+        if self.text_sink is not None:
+            self.text_sink(node, text)
+        if self.cache is not None and key is None:
+            key = content_key(content=text)
+            hit = self._cached(key)
+            if hit:
+                return hit
+        return key, text
+
+    def _summarize(self, _node, _path, payload):
+        key, text = payload
+        if not text or not text.strip():
+            raise ValueError("no text content")
+        summary = self.summarizer.summarize(text)
+        if key:
+            self.cache.put(key, self.summarizer.model, summary)
+        return summary
+
+    def run(self, folder_path, progress=None):
+        """Summarize the documents in folder_path; raises DriveError if it cannot be listed.
+        progress(done, total) is called as each document finishes."""
+        start = time.monotonic()
+        deadline = start + self.deadline
+
+        # List + filter stages
+        documents = [node for node in self.list_folder(folder_path) if is_summarizable(node)]
+        report = SummaryReport(folder_path, documents)
+        if not documents:
+            return report
+
+        cancel = threading.Event()
+        fetch_queue = queue.Queue(self.queue_size)
+        summarize_queue = queue.Queue(self.queue_size)
+        results = queue.Queue()
+        fetch_workers = min(self.fetch_workers, len(documents))
+        summarize_workers = min(self.summarize_workers, len(documents))
+        remaining_fetchers = [fetch_workers]
+        lock = threading.Lock()
+        trace = self.metrics.current() if self.metrics is not None else None
+
+        def fetcher_finished():
+            with lock:
+                remaining_fetchers[0] -= 1
+                last = remaining_fetchers[0] == 0
+            if last:
+                for _ in range(summarize_workers):
+                    summarize_queue.put(_DONE)
+
+        threads = [threading.Thread(target=self._stage, daemon=True, name='summary-fetch',
+                                    args=(fetch_queue, summarize_queue, self._fetch, self.fetch_timeout,
+                                          'fetch', results, cancel, fetcher_finished, trace))
+                   for _ in range(fetch_workers)]
+        threads += [threading.Thread(target=self._stage, daemon=True, name='summary-summarize',
+                                     args=(summarize_queue, None, self._summarize, self.summarize_timeout,
+                                           'summarize', results, cancel, lambda: None, trace))
+                    for _ in range(summarize_workers)]
+
+        def produce():
+            for index, node in enumerate(documents):
+                if not self._put(fetch_queue, (index, node, join_path(folder_path, node.name), None), cancel):
+                    break
+            for _ in range(fetch_workers):
+                fetch_queue.put(_DONE)
+
+        threads.append(threading.Thread(target=produce, daemon=True, name='summary-list'))
+        for thread in threads:
+            thread.start()
+
+        received = 0
+        while received < len(documents):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                report.timed_out = True
+                break
+            try:
+                index, summary, error, cached = results.get(timeout=remaining)
+            except queue.Empty:
+                report.timed_out = True
+                break
+            received += 1
+            if progress is not None:
+                progress(received, len(documents))
+            if cached:
+                report.cached.add(index)
+            if error is None:
+                report.summaries[index] = summary
+            else:
+                report.errors[index] = error
+
+        # Let workers drain and exit; nothing waits for them after a timeout
+        cancel.set()
+        report.elapsed = time.monotonic() - start
+        return report
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - Drive Snapshot Sync
+Keeps a local SQLite snapshot of the Drive tree's metadata current by
+polling the change feed (changes.list) instead of re-crawling. The snapshot
+and its page token are persisted, so a restart reopens the file and resumes
+from the saved token in milliseconds.
+"""
+
+import time
+import sqlite3
+import threading
+
+from drive_backend import (
+    DriveBackend, DriveConflictError, DriveError, DriveNode, DriveNotFoundError, DriveTokenError,
+    crawl, split_path,
+)
+
+_COLUMNS = ('id', 'name', 'parent', 'is_folder', 'size', 'modified', 'mime_type', 'checksum')
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM nodes"
+
+
+def _row(record):
+    return tuple(int(record[column]) if column == 'is_folder' else record.get(column)
+                 for column in _COLUMNS)
+
+
+def _node(row):
+    node_id, name, parent, is_folder, size, modified, mime_type, checksum = row
+    return DriveNode(node_id, name, parent, is_folder=bool(is_folder), size=size,
+                     modified=modified, mime_type=mime_type, checksum=checksum)
+
+
+class DriveSnapshot(DriveBackend):
+    """Read-only, SQLite-backed copy of the Drive tree's metadata.
+
+    Serves the read half of the backend interface (get, list_folder,
+    iter_folder and their *_by_id forms, lookup_child, path_of, glob); file
+    content stays in Drive.
+    Rows are keyed by file ID with a (parent, name) index, so applying a
+    change is a single-row upsert or delete.
+    """
+
+    def __init__(self, path=':memory:', root_id='root'):
+        self.path = path
+        self.ROOT_ID = root_id
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        if path != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS nodes (
+                               id TEXT PRIMARY KEY,
+                               name TEXT NOT NULL,
+                               parent TEXT,
+                               is_folder INTEGER NOT NULL,
+                               size INTEGER,
+                               modified TEXT,
+                               mime_type TEXT,
+                               checksum TEXT) WITHOUT ROWID''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS nodes_parent_name ON nodes (parent, name)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    # -- state -------------------------------------------------------------
+
+    @property
+    def page_token(self):
+        """Change-feed token the snapshot is current up to (None before the first sync)"""
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'page_token'").fetchone()
+        return None if row is None else int(row[0])
+
+    def _set_token(self, token):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('page_token', ?)", (str(token),))
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+
+    def replace_all(self, records, token):
+        """Replace the whole snapshot with records (a full crawl) as of token"""
+        with self.lock:
+            self.db.execute('BEGIN')
+            try:
+                self.db.execute('DELETE FROM nodes')
+                self.db.executemany('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (_row(record) for record in records))
+                self._set_token(token)
+                self.db.execute('COMMIT')
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+
+    def apply(self, changes, token):
+        """Apply a page of change-feed entries in one transaction.
+
+        Returns the changes annotated with 'old_path' (where the file was, or
+        None if it is new to the snapshot), 'path' (where it is now, or None
+        if removed) and 'is_folder', for invalidating path-keyed caches.
+        """
+        applied = []
+        with self.lock:
+            self.db.execute('BEGIN')
+            try:
+                # Old paths are taken before any change lands, so a removed
+                # folder's children still resolve through it
+                for change in changes:
+                    old = self._get_id(change['file_id'])
+                    applied.append(dict(change, old_path=self._path_of_id(old.id) if old else None,
+                                        is_folder=old.is_folder if old else False))
+                for change in changes:
+                    if change['removed']:
+                        self.db.execute('DELETE FROM nodes WHERE id = ?', (change['file_id'],))
+                    else:
+                        self.db.execute('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                        _row(change['file']))
+                for change in applied:
+                    if not change['removed']:
+                        change['is_folder'] = bool(change['file']['is_folder'])
+                        change['path'] = self._path_of_id(change['file_id'])
+                    else:
+                        change['path'] = None
+                self._set_token(token)
+                self.db.execute('COMMIT')
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+        return applied
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # -- reads -------------------------------------------------------------
+
+    def _get_id(self, node_id):
+        row = self.db.execute(f"{_SELECT} WHERE id = ?", (node_id,)).fetchone()
+        return _node(row) if row else None
+
+    def _resolve(self, path):
+        node_id = self.ROOT_ID
+        for name in split_path(path):
+            node_id = self.lookup_child(node_id, name)
+            if node_id is None:
+                raise DriveNotFoundError(path)
+        return node_id
+
+    def get(self, path):
+        with self.lock:
+            node = self._get_id(self._resolve(path))
+        if node is None:
+            raise DriveNotFoundError(path)
+        return node
+
+    def get_by_id(self, node_id):
+        with self.lock:
+            node = self._get_id(node_id)
+        if node is None:
+            raise DriveNotFoundError(node_id)
+        return node
+
+    def lookup_child(self, parent_id, name):
+        with self.lock:
+            row = self.db.execute('SELECT id FROM nodes WHERE parent = ? AND name = ?',
+                                  (parent_id, name)).fetchone()
+        return row[0] if row else None
+
+    def list_child_names(self, parent_id):
+        with self.lock:
+            return [row[0] for row in self.db.execute('SELECT name FROM nodes WHERE parent = ?',
+                                                      (parent_id,))]
+
+    def _folder_id(self, path=None, node_id=None):
+        node = self.get(path) if path is not None else self.get_by_id(node_id)
+        if not node.is_folder:
+            raise DriveConflictError(f"{path or self._path_of_id(node_id)} is not a folder")
+        return node.id
+
+    def _list(self, folder_id):
+        rows = self.db.execute(f"{_SELECT} WHERE parent = ? ORDER BY name", (folder_id,)).fetchall()
+        return [_node(row) for row in rows]
+
+    def list_folder(self, path):
+        with self.lock:
+            return self._list(self._folder_id(path))
+
+    def list_folder_by_id(self, folder_id):
+        with self.lock:
+            return self._list(self._folder_id(node_id=folder_id))
+
+    def iter_folder(self, path, page_size=100):
+        with self.lock:
+            folder_id = self._folder_id(path)
+        yield from self._pages(folder_id, page_size)
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        with self.lock:
+            self._folder_id(node_id=folder_id)
+        yield from self._pages(folder_id, page_size)
+
+    def _pages(self, folder_id, page_size):
+        # Keyset paging on (parent, name): each page is one indexed range scan
+        after = ''
+        while True:
+            with self.lock:
+                rows = self.db.execute(f"{_SELECT} WHERE parent = ? AND name > ? ORDER BY name LIMIT ?",
+                                       (folder_id, after, page_size)).fetchall()
+            yield from (_node(row) for row in rows)
+            if len(rows) < page_size:
+                return
+            after = rows[-1][1]
+
+    def _path_of_id(self, node_id):
+        names = []
+        while node_id != self.ROOT_ID:
+            row = self.db.execute('SELECT name, parent FROM nodes WHERE id = ?', (node_id,)).fetchone()
+            if row is None or row[1] is None:
+                break
+            names.append(row[0])
+            node_id = row[1]
+        return '/' + '/'.join(reversed(names))
+
+    def path_of(self, node):
+        with self.lock:
+            return self._path_of_id(node.id)
+
+    def delete(self, path):
+        raise DriveError("The Drive snapshot is read-only")
+
+    def move(self, source, destination):
+        raise DriveError("The Drive snapshot is read-only")
+
+    def delete_by_id(self, node_id):
+        raise DriveError("The Drive snapshot is read-only")
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        raise DriveError("The Drive snapshot is read-only")
+
+    def read_content(self, path):
+        raise DriveError("The Drive snapshot holds metadata only")
+
+    def read_content_by_id(self, node_id):
+        raise DriveError("The Drive snapshot holds metadata only")
+
+
+class DriveSync:
+    """Pulls the source backend's change feed into a DriveSnapshot.
+
+    sync_once() applies every change since the snapshot's saved token,
+    falling back to full_sync() only when there is no token or Drive
+    rejects it as invalid or expired. Other errors (5xx, 429) are retried
+    up to retries times, waiting retry_delay seconds and doubling it after
+    each attempt, then raised. Each applied batch is passed to the listeners (e.g. to invalidate the
+    path index and listing cache). start() polls every interval seconds
+    on a background thread.
+    """
+
+    def __init__(self, source, snapshot, interval=30.0, page_size=1000, listeners=None, retries=3,
+                 retry_delay=0.5):
+        self.source = source
+        self.snapshot = snapshot
+        self.interval = interval
+        self.page_size = page_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.listeners = list(listeners or [])
+        self.lock = threading.Lock()
+        self.full_syncs = 0
+        self.retried = 0
+        self.changes_applied = 0
+        self.last_sync = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def full_sync(self):
+        """Crawl the whole tree into the snapshot; returns the number of nodes"""
+        with self.lock:
+            # Take the token first so changes made during the crawl are replayed after it
+            token = self.source.get_start_page_token()
+            records = [node.to_record() for _path, node in crawl(self.source, self.page_size)]
+            self.snapshot.replace_all(records, token)
+            self.full_syncs += 1
+        self._notify(None)
+        # Replay the changes made during the crawl. Not through sync_once: a
+        # failure here must not start another crawl, the next sync catches up
+        try:
+            with self.lock:
+                self._pull(token)
+        except DriveError as e:
+            print(f"⚠️  Drive sync could not catch up after the crawl: {e}")
+        return len(records)
+
+    def sync_once(self):
+        """Apply pending changes; returns how many were applied"""
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            with self.lock:
+                token = self.snapshot.page_token
+                if token is None:
+                    break
+                try:
+                    return self._pull(token)
+                except DriveTokenError:
+                    break
+                except DriveError as e:
+                    error = e
+            # Transient: back off without the lock, then resume from the token
+            # of the last page applied. stop() cuts the wait short
+            if attempt == self.retries or self._stop.wait(delay):
+                raise error
+            self.retried += 1
+            delay *= 2
+        # No snapshot yet or the token is no longer valid: re-crawl
+        self.full_sync()
+        return 0
+
+    def _pull(self, token):
+        total = 0
+        while True:
+            changes, token = self.source.list_changes(token, self.page_size)
+            if not changes:
+                break
+            applied = self.snapshot.apply(changes, token)
+            total += len(applied)
+            self._notify(applied)
+        self.changes_applied += total
+        self.last_sync = time.time()
+        return total
+
+    def _notify(self, applied):
+        # applied is None after a full crawl: listeners should drop everything
+        for listener in self.listeners:
+            listener(applied)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync_once()
+            except Exception as e:
+                print(f"⚠️  Drive sync failed: {e}")
+
+    def start(self):
+        """Sync now, then keep polling the change feed in the background"""
+        self.sync_once()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='drive-sync')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class SyncedDriveBackend(DriveBackend):
+    """Backend that reads from the snapshot and writes through to Drive.
+
+    After every write the change feed is pulled, so a LIST right after a
+    MOVE or DELETE sees the result (read-your-writes).
+    """
+
+    def __init__(self, sync):
+        self.sync = sync
+        self.source = sync.source
+        self.snapshot = sync.snapshot
+
+    @property
+    def ROOT_ID(self):
+        return self.snapshot.ROOT_ID
+
+    def get(self, path):
+        return self.snapshot.get(path)
+
+    def get_by_id(self, node_id):
+        return self.snapshot.get_by_id(node_id)
+
+    def lookup_child(self, parent_id, name):
+        return self.snapshot.lookup_child(parent_id, name)
+
+    def list_child_names(self, parent_id):
+        return self.snapshot.list_child_names(parent_id)
+
+    def list_folder(self, path):
+        return self.snapshot.list_folder(path)
+
+    def iter_folder(self, path, page_size=100):
+        return self.snapshot.iter_folder(path, page_size)
+
+    def list_folder_by_id(self, folder_id):
+        return self.snapshot.list_folder_by_id(folder_id)
+
+    def iter_folder_by_id(self, folder_id, page_size=100):
+        return self.snapshot.iter_folder_by_id(folder_id, page_size)
+
+    def path_of(self, node):
+        return self.snapshot.path_of(node)
+
+    def read_content(self, path):
+        return self.source.read_content(path)
+
+    def read_content_by_id(self, node_id):
+        return self.source.read_content_by_id(node_id)
+
+    def open_content(self, path):
+        return self.source.open_content(path)
+
+    def open_content_by_id(self, node_id):
+        return self.source.open_content_by_id(node_id)
+
+    def delete(self, path):
+        node = self.source.delete(path)
+        self.sync.sync_once()
+        return node
+
+    def move(self, source, destination):
+        node = self.source.move(source, destination)
+        self.sync.sync_once()
+        return node
+
+    def delete_by_id(self, node_id):
+        node = self.source.delete_by_id(node_id)
+        self.sync.sync_once()
+        return node
+
+    def move_by_id(self, node_id, folder_id, new_name=None):
+        node = self.source.move_by_id(node_id, folder_id, new_name)
+        self.sync.sync_once()
+        return node
+
+    def delete_many(self, paths):
+        # One change-feed pull per bulk operation rather than per item
+        deleted, failed = self.source.delete_many(paths)
+        self.sync.sync_once()
+        return deleted, failed
+
+    def move_many(self, sources, destination):
+        moved, failed = self.source.move_many(sources, destination)
+        self.sync.sync_once()
+        return moved, failed
+
+    def delete_many_by_id(self, node_ids):
+        deleted, failed = self.source.delete_many_by_id(node_ids)
+        self.sync.sync_once()
+        return deleted, failed
+
+    def move_many_by_id(self, node_ids, folder_id):
+        moved, failed = self.source.move_many_by_id(node_ids, folder_id)
+        self.sync.sync_once()
+        return moved, failed
+
+    def get_start_page_token(self):
+        return self.source.get_start_page_token()
+
+    def list_changes(self, page_token, page_size=1000):
+        return self.source.list_changes(page_token, page_size)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+WhatsApp-Driven Google Drive Assistant - SUMMARY Pipeline Tests
+Runs the pipeline against the in-memory Drive stand-in and the local
+extractive summarizer; no network or API keys needed.
+
+Usage: python -m unittest test_summary_pipeline
+"""
+
+import time
+import threading
+import unittest
+
+from drive_backend import DriveNotFoundError, InMemoryDriveBackend
+from summary_cache import SummaryCache
+from summary_pipeline import ExtractiveSummarizer, SummaryPipeline
+
+
+def build_backend(n_files):
+    backend = InMemoryDriveBackend()
+    for i in range(n_files):
+        backend.add_file(f"/Docs/doc{i}.txt", size=64, modified='2024-01-15',
+                         content=f"Document {i} is about topic {i}. More detail follows.")
+    backend.add_file('/Docs/photo.jpg', size=64, content=b'\xff\xd8')
+    return backend
+
+
+class CountingSummarizer(ExtractiveSummarizer):
+    """ExtractiveSummarizer that records how many calls run at once"""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.calls = 0
+
+    def summarize(self, text):
+        with self.lock:
+            self.running += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            return super().summarize(text)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class SummaryPipelineTest(unittest.TestCase):
+
+    def test_summarizes_documents_in_listing_order(self):
+        pipeline = SummaryPipeline(build_backend(5), ExtractiveSummarizer())
+        report = pipeline.run('/Docs')
+        self.assertEqual([node.name for node, _summary, _error in report.items()],
+                         [f"doc{i}.txt" for i in range(5)])
+        self.assertEqual(report.summaries[0], "Document 0 is about topic 0.")
+        self.assertFalse(report.errors)
+        self.assertFalse(report.timed_out)
+
+    def test_missing_folder_raises(self):
+        pipeline = SummaryPipeline(build_backend(1), ExtractiveSummarizer())
+        with self.assertRaises(DriveNotFoundError):
+            pipeline.run('/Missing')
+
+    def test_slow_call_times_out_and_run_moves_on(self):
+        pipeline = SummaryPipeline(build_backend(3), ExtractiveSummarizer(latency=0.3),
+                                   summarize_workers=3, summarize_timeout=0.05)
+        report = pipeline.run('/Docs')
+        self.assertEqual(set(report.errors.values()), {"summarize timed out"})
+        self.assertFalse(report.summaries)
+
+    def test_abandoned_calls_keep_their_slot(self):
+        summarizer = CountingSummarizer(latency=0.2)
+        pipeline = SummaryPipeline(build_backend(8), summarizer, summarize_workers=2,
+                                   summarize_timeout=0.01, deadline=5.0)
+        report = pipeline.run('/Docs')
+        self.assertEqual(len(report.errors), 8)
+        # Each timed-out call held its slot, so no more than two ever ran at once
+        self.assertLessEqual(summarizer.peak, 2)
+        self.assertEqual(summarizer.calls, 8)
+
+    def test_deadline_returns_partial_report(self):
+        pipeline = SummaryPipeline(build_backend(6), ExtractiveSummarizer(latency=0.2),
+                                   summarize_workers=1, deadline=0.3)
+        start = time.monotonic()
+        report = pipeline.run('/Docs')
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertTrue(report.timed_out)
+        self.assertTrue(report.pending)
+
+    def test_warm_run_uses_cache(self):
+        summarizer = CountingSummarizer()
+        pipeline = SummaryPipeline(build_backend(4), summarizer, cache=SummaryCache())
+        pipeline.run('/Docs')
+        report = pipeline.run('/Docs')
+        self.assertEqual(summarizer.calls, 4)
+        self.assertEqual(len(report.cached), 4)
+        self.assertEqual(len(report.summaries), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()